@@ -1,30 +1,120 @@
+import asyncio
+import bisect
+import concurrent.futures
+import contextvars
+import cProfile
+import gzip
+import hashlib
+import hmac
+import io
+import json
 import logging
+import math
+import mimetypes
 import os
 import re
 import threading
+import time
+import zlib
+from types import MappingProxyType
+from typing import NamedTuple
 
-from cachetools import TTLCache
-from flask import Flask, jsonify, render_template, request
+from flask import (
+    Flask,
+    Response,
+    g,
+    jsonify,
+    render_template,
+    request,
+    send_from_directory,
+    stream_with_context,
+)
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
-from config import CACHE_MAX_SIZE, CACHE_TTL_SECONDS, GEMINI_API_KEY
+import storage
+import youtube
+from assets import DIST_DIR, STATIC_DIR, asset_url, load_manifest
+from cache import TinyLFUCache
+from config import (
+    ADMIN_TOKEN,
+    ANALYSIS_HTTP_MAX_AGE,
+    ANALYSIS_VERSION,
+    ANALYZE_IP_LIMIT,
+    ANALYZE_SESSION_LIMIT,
+    CACHE_COMPRESS,
+    CACHE_HIT_COST,
+    CACHE_MAX_BYTES,
+    CACHE_SKETCH_WIDTH,
+    CACHE_TTL_SECONDS,
+    COLD_ANALYSIS_COST,
+    COMMENTS_MAX_PAGE_SIZE,
+    COMMENTS_PAGE_SIZE,
+    GEMINI_API_KEY,
+    HISTORY_MAX_PAGE_SIZE,
+    HISTORY_PAGE_SIZE,
+    MAX_COMMENTS,
+    PRUNE_INTERVAL_SECONDS,
+    RATELIMIT_STORAGE_URI,
+    REFRESH_CLAIM_SECONDS,
+    RESULT_STORE_TTL_SECONDS,
+    SAMPLE_MAX_COMMENTS,
+    SAMPLE_SIZE,
+    SEARCH_MAX_OFFSET,
+    SEARCH_MAX_PAGE_SIZE,
+    SEARCH_PAGE_SIZE,
+    TIMELINE_RESOLUTION,
+    WARMUP_CONCURRENCY,
+    WARMUP_HOUR,
+    WARMUP_LOOKBACK_DAYS,
+    WARMUP_QUOTA_UNITS,
+    WARMUP_TOP_N,
+    WARMUP_WATCHLIST,
+)
 from gemini import (
     GeminiQuotaError,
-    analyze_sentiment_gemini,
-    generate_highlights_gemini,
-    generate_insights_gemini,
+    analyze_sentiment_gemini_async,
+    generate_highlights_gemini_async,
+    generate_insights_gemini_async,
 )
+from metrics import ANALYSES, CACHE_LOOKUPS, QUOTA_ERRORS, collect_timings, render, timed
+from ratelimit import default_uri
+from sampling import sentiment_confidence_intervals, stratified_sample
 from sentiment import (
     analyze_sentiment_fallback,
-    compute_sentiment_timeline,
-    compute_stats,
-    compute_word_frequencies,
+    build_aggregate_state,
     generate_insights_fallback,
+    stats_from_state,
+    timeline_from_state,
+    word_frequencies_from_state,
 )
-from storage import get_history, init_db, save_analysis
+from storage import (
+    claim_refresh,
+    claim_warmup_slot,
+    encode_history_cursor,
+    get_history,
+    get_history_version,
+    get_popular_videos,
+    get_sentiment_trend,
+    has_stored_result,
+    import_records,
+    index_search_documents,
+    init_db,
+    iter_analyses,
+    iter_comments,
+    load_result_entry,
+    prune,
+    record_rollup,
+    release_refresh,
+    save_aggregate_state,
+    save_analysis,
+    save_result,
+    search_documents,
+)
+from transfer import FORMATS, MIMETYPES, decode_csv, decode_ndjson, encode_csv, encode_ndjson
 from youtube import build_youtube_service, fetch_video_title, fetch_youtube_comments, get_video_id
 
+_VIDEO_ID_RE = re.compile(r"[\w-]{11}")
 _UUID_RE = re.compile(
     r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$",
     re.IGNORECASE,
@@ -43,100 +133,721 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 
 # ---------------------------------------------------------------------------
-# Rate limiting — 5 analysis requests per minute per IP
+# Rate limiting — cost-weighted, per IP and per session, shared by workers
 # ---------------------------------------------------------------------------
 limiter = Limiter(
     get_remote_address,
     app=app,
     default_limits=[],
-    storage_uri="memory://",
+    storage_uri=RATELIMIT_STORAGE_URI or default_uri(),
 )
 
+
+def _session_or_ip() -> str:
+    """Rate-limit bucket for the browser session; clients without one share their IP's."""
+    session_id = _get_session_id()
+    return f"session:{session_id}" if session_id else f"ip:{get_remote_address()}"
+
+
 # ---------------------------------------------------------------------------
-# In-memory analysis cache — keyed by video_id, 1-hour TTL
+# In-memory analysis cache — keyed by video_id, stale-while-revalidate
+#
+# An entry is fresh for CACHE_TTL_SECONDS (the soft TTL). After that it is
+# still served, marked "refreshing", while one background re-analysis per
+# video replaces it. Only past RESULT_STORE_TTL_SECONDS (the hard TTL) is
+# it dropped and the next request pays for a cold analysis.
+#
+# Entries are weighed in bytes (CACHE_MAX_BYTES per worker) and admitted by
+# TinyLFU — see cache.py.
 # ---------------------------------------------------------------------------
-_cache: TTLCache = TTLCache(maxsize=CACHE_MAX_SIZE, ttl=CACHE_TTL_SECONDS)
+
+# Live Python dicts and strings take about 3× the bytes of their JSON.
+_LIVE_OBJECT_OVERHEAD = 3
+
+class CachedResponse(NamedTuple):
+    """
+    An immutable cache entry: the result split into its summary (read-only —
+    save_analysis reads it on every hit) and its comments_data list (the
+    comments endpoint pages through it; zlib-compressed JSON when
+    CACHE_COMPRESS is on, None if the result had none), plus the hit
+    response body, encoded once with "cached": true and gzipped once. Cache
+    hits copy these bytes out instead of re-serialising the result. etag is
+    a strong validator for body, derived from ANALYSIS_VERSION and the body
+    hash. created is when the analysis ran (epoch seconds); size is the
+    entry's approximate resident bytes, its weight in the cache.
+    """
+    summary:   MappingProxyType
+    comments:  list | bytes | None
+    body:      bytes
+    gzip_body: bytes
+    etag:      str
+    created:   float
+    size:      int
+
+    @property
+    def comments_data(self) -> list[dict]:
+        if isinstance(self.comments, bytes):
+            return json.loads(zlib.decompress(self.comments))
+        return self.comments or []
+
+    @property
+    def result(self) -> MappingProxyType:
+        """The full result, read-only. Inflates the comments when compressed."""
+        if self.comments is None:
+            return self.summary
+        return MappingProxyType({**self.summary, "comments_data": self.comments_data})
+
+
+def _comments_page(
+    comments: list[dict],
+    sentiment: str = "",
+    category: str = "",
+    cursor: int = 0,
+    limit: int = COMMENTS_PAGE_SIZE,
+) -> dict:
+    """
+    One page of comments matching the optional sentiment/category filters.
+
+    cursor is the index in comments to resume from (0 for the first page);
+    next_cursor is None on the last page. total counts all matches.
+    """
+    matches = [
+        i for i, c in enumerate(comments)
+        if (not sentiment or c["sentiment"] == sentiment)
+        and (not category or c["category"] == category)
+    ]
+    start = bisect.bisect_left(matches, cursor)
+    page  = matches[start : start + limit]
+    more  = start + limit < len(matches)
+    return {
+        "comments":    [comments[i] for i in page],
+        "total":       len(matches),
+        "next_cursor": str(matches[start + limit]) if more else None,
+    }
+
+
+def _response_view(result: dict) -> dict:
+    """The /analyze response: aggregates plus only the first page of comments."""
+    page = _comments_page(result.get("comments_data", []))
+    return {
+        **result,
+        "comments_data":        page["comments"],
+        "comments_total":       page["total"],
+        "comments_next_cursor": page["next_cursor"],
+    }
+
+
+def _encode_cached(result: dict, created: float | None = None) -> CachedResponse:
+    with timed("json_encode"):
+        body = app.json.dumps({**_response_view(result), "cached": True}).encode()
+        gzip_body = gzip.compress(body, compresslevel=6, mtime=0)
+        comments = result.get("comments_data")
+        comments_size = 0
+        if comments is not None:
+            encoded = json.dumps(comments, separators=(",", ":")).encode()
+            if CACHE_COMPRESS:
+                comments = zlib.compress(encoded, 1)
+                comments_size = len(comments)
+            else:
+                comments_size = len(encoded) * _LIVE_OBJECT_OVERHEAD
+    return CachedResponse(
+        summary=MappingProxyType({k: v for k, v in result.items() if k != "comments_data"}),
+        comments=comments,
+        body=body,
+        gzip_body=gzip_body,
+        etag=f"v{ANALYSIS_VERSION}-{hashlib.blake2b(body, digest_size=16).hexdigest()}",
+        created=time.time() if created is None else created,
+        # body ≈ the live summary it was encoded from, so it counts twice.
+        size=2 * len(body) + len(gzip_body) + comments_size,
+    )
+
+
+def _is_stale(entry: CachedResponse) -> bool:
+    return time.time() - entry.created >= CACHE_TTL_SECONDS
+
+
+_cache = TinyLFUCache(CACHE_MAX_BYTES, weigher=lambda entry: entry.size, sketch_width=CACHE_SKETCH_WIDTH)
 _cache_lock = threading.Lock()
 
 
-def _get_cached(video_id: str) -> dict | None:
+def _get_cached(video_id: str) -> CachedResponse | None:
+    """
+    L1 in-memory lookup, reading through to the SQLite result store on a
+    miss. Entries analysed longer than the hard TTL ago count as misses.
+    """
+    with _cache_lock:
+        entry = _cache.get(video_id)
+        if entry is not None and time.time() - entry.created >= RESULT_STORE_TTL_SECONDS:
+            _cache.pop(video_id, None)
+            entry = None
+    if entry is not None:
+        return entry
+
+    stored = load_result_entry(video_id)
+    if stored is None:
+        return None
+    entry = _encode_cached(*stored)
     with _cache_lock:
-        return _cache.get(video_id)
+        _cache[video_id] = entry
+    return entry
 
 
 def _set_cached(video_id: str, result: dict) -> None:
+    entry = _encode_cached(result)
     with _cache_lock:
-        _cache[video_id] = result
+        _cache[video_id] = entry
+    with timed("sqlite_write"):
+        save_result(video_id, result)
+
+
+def _cached_response(entry: CachedResponse, refreshing: bool = False) -> Response:
+    """
+    Serve a cache hit as a straight byte copy, gzipped when the client
+    accepts it. Each encoding gets its own strong ETag; on GET a matching
+    If-None-Match turns the response into a body-less 304.
+
+    refreshing=True serves a stale entry with "refreshing": true spliced into
+    the body (X-Cache: STALE) while a background re-analysis runs.
+    """
+    gzip_ok = request.accept_encodings["gzip"] > 0
+    body, gzip_body, etag = entry.body, entry.gzip_body, entry.etag
+    if refreshing:
+        body = b'{"refreshing":true,' + body[1:]
+        gzip_body = gzip.compress(body, compresslevel=1, mtime=0) if gzip_ok else b""
+        etag = f"{etag}-stale"
+    response = Response(gzip_body if gzip_ok else body, mimetype="application/json")
+    if gzip_ok:
+        response.headers["Content-Encoding"] = "gzip"
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["X-Cache"] = "STALE" if refreshing else "HIT"
+    response.set_etag(f"{etag}-gz" if gzip_ok else etag)
+    if request.method in ("GET", "HEAD"):
+        response.make_conditional(request)
+    return response
 
 
 # ---------------------------------------------------------------------------
-# Database — initialise on startup
+# Static assets — fingerprinted bundle built by assets.py
+# ---------------------------------------------------------------------------
+_asset_manifest = load_manifest()
+_DIST_PATH = STATIC_DIR / DIST_DIR
+_PRECOMPRESSED = (("br", ".br"), ("gzip", ".gz"))
+
+app.jinja_env.globals["asset_url"] = lambda name: asset_url(name, _asset_manifest)
+
+# The index page has no per-request state, so it is rendered once per
+# process (every request in debug mode, so template edits show up).
+_index_page: dict[str, CachedResponse] = {}
+
+
+def _render_index() -> CachedResponse:
+    body = render_template("index.html").encode()
+    gzip_body = gzip.compress(body, compresslevel=9, mtime=0)
+    return CachedResponse(
+        summary=MappingProxyType({}),
+        comments=None,
+        body=body,
+        gzip_body=gzip_body,
+        etag=hashlib.blake2b(body, digest_size=16).hexdigest(),
+        created=time.time(),
+        size=len(body) + len(gzip_body),
+    )
+
+
+
 # ---------------------------------------------------------------------------
 with app.app_context():
     init_db()
 
 
+# ---------------------------------------------------------------------------
+# Retention — background pruner, one daemon thread per worker process
+# (started by start_background_threads, never at import)
+# ---------------------------------------------------------------------------
+_pruner_stop = threading.Event()
+
+
+def _prune_loop() -> None:
+    while not _pruner_stop.wait(PRUNE_INTERVAL_SECONDS):
+        prune()
+
+
+def start_pruner() -> threading.Thread | None:
+    """Starts the retention pruner unless PRUNE_INTERVAL_SECONDS is 0."""
+    if PRUNE_INTERVAL_SECONDS <= 0:
+        return None
+    thread = threading.Thread(target=_prune_loop, name="vidalyze-pruner", daemon=True)
+    thread.start()
+    return thread
+
+
+# ---------------------------------------------------------------------------
+# Event loop — one per worker process, shared by its request threads
+# ---------------------------------------------------------------------------
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="vidalyze-loop", daemon=True).start()
+        return _loop
+
+
+def _run_coroutine(coro):
+    """
+    Runs coro on the worker's event loop from a request thread and blocks
+    until it finishes. The coroutine runs in a copy of the caller's context,
+    so the Flask request stays visible to it; blocking calls inside it must
+    go through asyncio.to_thread.
+    """
+    loop = _get_loop()
+    context = contextvars.copy_context()
+    done: concurrent.futures.Future = concurrent.futures.Future()
+
+    def copy_outcome(task: asyncio.Task) -> None:
+        if task.cancelled():
+            done.cancel()
+        elif task.exception() is not None:
+            done.set_exception(task.exception())
+        else:
+            done.set_result(task.result())
+
+    def start() -> None:
+        # Creating the task inside context makes the task copy it (create_task's
+        # context= argument is 3.11+).
+        context.run(loop.create_task, coro).add_done_callback(copy_outcome)
+
+    loop.call_soon_threadsafe(start)
+    return done.result()
+
+
+def after_fork() -> None:
+    """
+    Re-initialises per-process state in a freshly forked worker (gunicorn
+    post_fork with --preload). Threads don't survive fork() and locks,
+    sockets and SQLite handles must not be shared with the parent.
+    """
+    global _loop, _loop_lock, _cache_lock, _refreshing
+    storage.reset_after_fork()
+    youtube.reset_after_fork()
+    _loop, _loop_lock, _cache_lock = None, threading.Lock(), threading.Lock()
+    _refreshing = {}
+    start_background_threads()
+
+
+def start_background_threads() -> None:
+    """
+    Starts this process's pruner and cache warmer. Called by whatever serves
+    requests — after_fork in a gunicorn worker, the ASGI lifespan, the dev
+    server — and never at import, so a preloading gunicorn master runs
+    neither and never forks mid-transaction.
+    """
+    start_pruner()
+    start_warmer()
+
+
 # ---------------------------------------------------------------------------
 # Routes
 # ---------------------------------------------------------------------------
 
 @app.route("/", methods=["GET"])
 def index():
-    return render_template("index.html")
+    if app.debug or "page" not in _index_page:
+        _index_page["page"] = _render_index()
+    entry = _index_page["page"]
+    gzip_ok = request.accept_encodings["gzip"] > 0
+    response = Response(entry.gzip_body if gzip_ok else entry.body, mimetype="text/html")
+    if gzip_ok:
+        response.headers["Content-Encoding"] = "gzip"
+    response.headers["Vary"] = "Accept-Encoding"
+    # Revalidate every time: the page names the current asset hashes.
+    response.headers["Cache-Control"] = "no-cache"
+    response.set_etag(f"{entry.etag}-gz" if gzip_ok else entry.etag)
+    return response.make_conditional(request)
+
+
+@app.route(f"/static/{DIST_DIR}/<path:filename>", methods=["GET"])
+def dist_asset(filename: str):
+    """
+    Serves a fingerprinted asset, picking its precompressed .br/.gz variant
+    when the client accepts one. Names change with content, so responses
+    are cacheable forever.
+    """
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    encoding = ""
+    for name, suffix in _PRECOMPRESSED:
+        if request.accept_encodings[name] > 0 and (_DIST_PATH / (filename + suffix)).is_file():
+            encoding, filename = name, filename + suffix
+            break
+    response = send_from_directory(_DIST_PATH, filename, mimetype=mimetype, max_age=0)
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
 
 
 @app.route("/history", methods=["GET"])
 def history():
-    """Returns the 20 most recent analyses for the requesting session."""
-    records = get_history(limit=20, session_id=_get_session_id())
-    return jsonify(records)
+    """
+    Returns one page of the requesting session's analyses, newest first.
+
+    ?limit= sets the page size (capped at HISTORY_MAX_PAGE_SIZE) and
+    ?before= takes the cursor from a previous page's X-Next-Cursor header.
+    X-Next-Cursor is only set when the page was full, i.e. more may follow.
+    """
+    limit      = request.args.get("limit", HISTORY_PAGE_SIZE, type=int)
+    limit      = max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+    before     = request.args.get("before", "").strip() or None
+    session_id = _get_session_id()
+
+    # The ETag is checked before the page is read, so an unchanged sidebar
+    # costs two index seeks and an empty 304.
+    version = get_history_version(session_id)
+    etag = hashlib.blake2b(
+        f"{session_id}|{limit}|{before}|{version}".encode(), digest_size=16
+    ).hexdigest()
+    if version and request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        try:
+            records = get_history(limit=limit, session_id=session_id, before=before)
+        except ValueError:
+            return jsonify({"error": "Invalid history cursor."}), 400
+        response = jsonify(records)
+        if len(records) == limit:
+            response.headers["X-Next-Cursor"] = encode_history_cursor(records[-1])
+
+    if version:
+        response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.headers["Vary"] = "X-Session-Id"
+    return response
+
+
+@app.route("/videos/<video_id>/trend", methods=["GET"])
+def video_trend(video_id: str):
+    """
+    Returns how a video's sentiment moved across re-analyses, one point per
+    UTC day (mean shares, analysis count, comments analysed), oldest first.
+    ?days= limits the response to the most recent N days with data.
+    """
+    if not _VIDEO_ID_RE.fullmatch(video_id):
+        return jsonify({"error": "Invalid video ID."}), 400
+    days = request.args.get("days", type=int)
+    if days is not None and days < 1:
+        return jsonify({"error": "days must be a positive integer."}), 400
+    return jsonify({"video_id": video_id, "trend": get_sentiment_trend(video_id, days)})
+
+
+@app.route("/analysis/<video_id>", methods=["GET"])
+def get_analysis(video_id: str):
+    """
+    Returns a cached or stored analysis without re-running it (404 if there
+    is none) — the same body a cache hit on /analyze would return, but
+    cacheable by browsers and proxies and answered with 304 when unchanged.
+    ?mode=sample selects the sampled analysis. Does not touch history.
+    """
+    if not _VIDEO_ID_RE.fullmatch(video_id):
+        return jsonify({"error": "Invalid video ID."}), 400
+    sample_mode = request.args.get("mode", "").strip().lower() == "sample"
+    entry = _get_cached(f"{video_id}:sample" if sample_mode else video_id)
+    if entry is None:
+        return jsonify({"error": "Analysis not found. Please analyze the video first."}), 404
+
+    response = _cached_response(entry)
+    response.headers["Cache-Control"] = f"public, max-age={ANALYSIS_HTTP_MAX_AGE}"
+    return response
+
+
+@app.route("/analysis/<video_id>/comments", methods=["GET"])
+def analysis_comments(video_id: str):
+    """
+    Serves pages of a cached or stored analysis's comments, filtered
+    server-side. ?sentiment= and ?category= filter, ?cursor= continues from
+    a previous page's next_cursor, ?limit= is capped at COMMENTS_MAX_PAGE_SIZE
+    and ?mode=sample selects the sampled analysis.
+    """
+    if not _VIDEO_ID_RE.fullmatch(video_id):
+        return jsonify({"error": "Invalid video ID."}), 400
+    cursor = request.args.get("cursor", "0")
+    if not cursor.isdigit():
+        return jsonify({"error": "Invalid cursor."}), 400
+    limit = max(1, min(request.args.get("limit", COMMENTS_PAGE_SIZE, type=int), COMMENTS_MAX_PAGE_SIZE))
+
+    sample_mode = request.args.get("mode", "").strip().lower() == "sample"
+    entry = _get_cached(f"{video_id}:sample" if sample_mode else video_id)
+    if entry is None:
+        return jsonify({"error": "Analysis not found. Please analyze the video again."}), 404
+
+    return jsonify(_comments_page(
+        entry.comments_data,
+        sentiment=request.args.get("sentiment", "").strip(),
+        category=request.args.get("category", "").strip(),
+        cursor=int(cursor),
+        limit=limit,
+    ))
+
+
+@app.route("/search", methods=["GET"])
+def search():
+    """
+    Full-text search over indexed comments and insights of past analyses.
+
+    ?q= is free text (all words must match; a trailing * searches by prefix),
+    ?page= is 1-based, ?limit= is capped at SEARCH_MAX_PAGE_SIZE and
+    ?video_id= restricts results to one video. Results are BM25-ranked and
+    carry HTML-safe snippets with matches in <mark>. Only videos the
+    requesting session has analysed are searched, as with /history.
+    """
+    query = request.args.get("q", "").strip()
+    if not query:
+        return jsonify({"error": "Search query is required."}), 400
+
+    limit  = max(1, min(request.args.get("limit", SEARCH_PAGE_SIZE, type=int), SEARCH_MAX_PAGE_SIZE))
+    page   = max(1, request.args.get("page", 1, type=int))
+    offset = (page - 1) * limit
+    if offset > SEARCH_MAX_OFFSET:
+        return jsonify({"error": "Page is too deep — refine the search instead."}), 400
+
+    video_id = request.args.get("video_id", "").strip()
+    if video_id and not _VIDEO_ID_RE.fullmatch(video_id):
+        return jsonify({"error": "Invalid video ID."}), 400
+
+    # Fetch one extra row to know whether another page exists.
+    results = search_documents(
+        query, limit=limit + 1, offset=offset, video_id=video_id, session_id=_get_session_id()
+    )
+    return jsonify({
+        "query":    query,
+        "page":     page,
+        "results":  results[:limit],
+        "has_more": len(results) > limit,
+    })
+
+
+def _cache_key(video_id: str, sample_mode: bool) -> str:
+    return f"{video_id}:sample" if sample_mode else video_id
+
+
+def _analysis_cost() -> int:
+    """
+    Rate-limit units this /analyze request costs: CACHE_HIT_COST when the
+    result is already cached — in this worker's memory or the shared result
+    store — (or the URL is rejected anyway), COLD_ANALYSIS_COST when it
+    means a YouTube + Gemini run.
+    """
+    if "analysis_cost" not in g:
+        youtube_url = request.form.get("youtube_url", "").strip()
+        video_id = get_video_id(youtube_url) if youtube_url else None
+        cost = CACHE_HIT_COST
+        if video_id:
+            sample_mode = request.form.get("mode", "").strip().lower() == "sample"
+            cache_key = _cache_key(video_id, sample_mode)
+            with _cache_lock:
+                warm = cache_key in _cache
+            if not warm:
+                warm = has_stored_result(cache_key)
+            cost = CACHE_HIT_COST if warm else COLD_ANALYSIS_COST
+        g.analysis_cost = cost
+    return g.analysis_cost
 
 
 @app.route("/analyze", methods=["POST"])
-@limiter.limit("5 per minute")
+@limiter.limit(ANALYZE_IP_LIMIT, cost=_analysis_cost)
+@limiter.limit(ANALYZE_SESSION_LIMIT, key_func=_session_or_ip, cost=_analysis_cost)
 def analyze():
+    """
+    Sync (WSGI) entry point for /analyze: runs _analyze_async on this
+    worker's event loop. asgi.py awaits the coroutine directly instead.
+    """
+    return _run_coroutine(_analyze_async())
+
+
+async def _analyze_async():
     """
     Fetches YouTube comments, runs sentiment analysis (Gemini preferred,
     TextBlob fallback), and returns structured JSON for the frontend.
 
-    Results are cached in memory by video_id (1-hour TTL) and persisted
-    to SQLite for the history panel.
+    Results are cached by video_id (stale-while-revalidate, see above) and
+    persisted to SQLite for the history panel.
+
+    mode=sample fetches up to SAMPLE_MAX_COMMENTS comments but classifies
+    only a stratified sample of SAMPLE_SIZE; the response is marked
+    sampled=true and carries 95% confidence_intervals per sentiment.
+
+    Diagnostics: X-Debug-Timings: 1 adds a "timings" object (per-stage
+    milliseconds and counts) to the response. X-Profile: 1, with a valid
+    X-Admin-Token, also writes a cProfile capture of the request under
+    DB_DIR/profiles and names it in X-Profile-File.
     """
+    want_timings = request.headers.get("X-Debug-Timings") == "1"
+    want_profile = request.headers.get("X-Profile") == "1"
+    if not (want_timings or want_profile):
+        return await _analyze_request()
+
+    if want_profile and (denied := _admin_denied()):
+        return denied
+    with collect_timings() as timings:
+        if want_profile:
+            profile_name, rv = await asyncio.to_thread(_profiled, _analyze_request)
+        else:
+            rv = await _analyze_request()
+    response = app.make_response(rv)
+    if want_timings:
+        _add_timings(response, timings)
+    if want_profile:
+        response.headers["X-Profile-File"] = profile_name
+    return response
+
+
+async def _analyze_request():
     session_id  = _get_session_id()
     youtube_url = request.form.get("youtube_url", "").strip()
+    sample_mode = request.form.get("mode", "").strip().lower() == "sample"
 
     if not youtube_url:
         return jsonify({"error": "YouTube URL is required."}), 400
 
-    video_id = get_video_id(youtube_url)
+    with timed("url_parse"):
+        video_id = get_video_id(youtube_url)
     if not video_id:
         return jsonify({"error": "Invalid YouTube URL. Please check the format and try again."}), 400
 
     # Return cached result if available (avoids redundant API calls).
     # Still record in this user's history so their sidebar stays accurate.
-    cached = _get_cached(video_id)
+    cache_key = _cache_key(video_id, sample_mode)
+    cached = await asyncio.to_thread(_get_cached, cache_key)
     if cached:
         logger.info("Cache hit for video %s.", video_id)
-        save_analysis(video_id, cached, session_id)
-        cached["cached"] = True
-        return jsonify(cached)
+        await asyncio.to_thread(save_analysis, video_id, cached.summary, session_id, cache_hit=True)
+        stale = _is_stale(cached)
+        CACHE_LOOKUPS.labels("stale" if stale else "hit").inc()
+        if stale:
+            _schedule_refresh(cache_key, video_id, youtube_url, sample_mode)
+        return _cached_response(cached, refreshing=stale)
+    CACHE_LOOKUPS.labels("miss").inc()
+
+    try:
+        result, state = await _run_analysis(video_id, youtube_url, sample_mode)
+    except AnalysisError as e:
+        return jsonify(e.payload), e.status
+
+    await asyncio.to_thread(_persist_analysis, cache_key, result, session_id, state)
+    with timed("json_encode"):
+        return jsonify(_response_view(result))
+
+
+# ---------------------------------------------------------------------------
+# Request diagnostics — timings breakdown and opt-in profiling
+# ---------------------------------------------------------------------------
+
+class _InlineExecutor(concurrent.futures.ThreadPoolExecutor):
+    """Runs each submitted call at once on the submitting thread."""
+
+    def submit(self, fn, /, *args, **kwargs):
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+def _profiled(request_coro_fn) -> tuple[str, object]:
+    """
+    Runs request_coro_fn() under cProfile on a private event loop in this
+    thread and returns (profile file name, its result). asyncio.to_thread
+    calls run inline, so blocking work (YouTube paging, TextBlob, SQLite)
+    lands in the same profile instead of on pool threads it can't see.
+    """
+    profiles = storage.DB_PATH.parent / "profiles"
+    profiles.mkdir(parents=True, exist_ok=True)
+    name = f"analyze-{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{os.getpid()}-{threading.get_ident()}.prof"
+    profiler = cProfile.Profile()
+    loop = asyncio.new_event_loop()
+    loop.set_default_executor(_InlineExecutor(max_workers=1))
+    try:
+        profiler.enable()
+        try:
+            rv = loop.run_until_complete(request_coro_fn())
+        finally:
+            profiler.disable()
+            profiler.dump_stats(profiles / name)
+        # Anything the request left running (a stale-entry refresh) dies with the loop.
+        pending = asyncio.all_tasks(loop)
+        for task in pending:
+            task.cancel()
+        if pending:
+            loop.run_until_complete(asyncio.wait(pending))
+        loop.run_until_complete(loop.shutdown_asyncgens())
+    finally:
+        loop.close()
+    logger.info("Wrote request profile %s.", profiles / name)
+    return f"profiles/{name}", rv
+
+
+def _add_timings(response: Response, timings: dict) -> None:
+    """Adds "timings" to a JSON object response, undoing gzip, and makes it uncacheable."""
+    if not response.is_json:
+        return
+    body = response.get_data()
+    if response.headers.get("Content-Encoding") == "gzip":
+        body = gzip.decompress(body)
+        del response.headers["Content-Encoding"]
+    payload = json.loads(body)
+    if not isinstance(payload, dict):
+        return
+    payload["timings"] = timings
+    response.set_data(app.json.dumps(payload))
+    response.headers["Cache-Control"] = "no-store"
+    response.headers.pop("ETag", None)
+
+
+class AnalysisError(Exception):
+    """An analysis that can't complete; payload and status form the error response."""
+
+    def __init__(self, status: int, **payload) -> None:
+        super().__init__(payload["error"])
+        self.status = status
+        self.payload = payload
 
+
+async def _run_analysis(video_id: str, youtube_url: str, sample_mode: bool) -> tuple[dict, dict]:
+    """
+    Fetches and classifies one video's comments. Returns (result, aggregate
+    state); raises AnalysisError. Independent of the request, so background
+    refreshes run it too.
+    """
     # Build YouTube service — fail fast if key is missing
     try:
-        youtube_service = build_youtube_service()
+        video_title = await asyncio.to_thread(_fetch_title, video_id)
     except ValueError as e:
-        return jsonify({"error": str(e)}), 500
-    except Exception:
+        raise AnalysisError(500, error=str(e)) from e
+    except Exception as e:
         logger.exception("Failed to initialize YouTube API service")
-        return jsonify({"error": "Failed to connect to YouTube API. Check your YOUTUBE_API_KEY."}), 500
+        raise AnalysisError(
+            500, error="Failed to connect to YouTube API. Check your YOUTUBE_API_KEY."
+        ) from e
 
-    video_title = fetch_video_title(youtube_service, video_id)
-
-    comments, fetch_error = fetch_youtube_comments(video_id)
+    max_results = SAMPLE_MAX_COMMENTS if sample_mode else MAX_COMMENTS
+    # Each page is timed as youtube_comments_page inside fetch_youtube_comments.
+    comments, fetch_error = await asyncio.to_thread(fetch_youtube_comments, video_id, max_results)
     if fetch_error:
-        return jsonify({"error": fetch_error, "video_title": video_title}), 400
+        raise AnalysisError(400, error=fetch_error, video_title=video_title)
     if not comments:
-        return jsonify({"error": "No comments found for this video.", "video_title": video_title}), 400
+        raise AnalysisError(400, error="No comments found for this video.", video_title=video_title)
+
+    total_comments = len(comments)
+    sampled = sample_mode and total_comments > SAMPLE_SIZE
+    if sampled:
+        comments = [comments[i] for i in stratified_sample(total_comments, SAMPLE_SIZE)]
+        logger.info("Sampled %d of %d comments for video %s.", len(comments), total_comments, video_id)
+    texts = [c["comment"] for c in comments]
 
     # --- Analysis ---
     categorized_comments: list[dict] = []
@@ -147,10 +858,13 @@ def analyze():
     if GEMINI_API_KEY:
         try:
             logger.info("Attempting Gemini analysis for video %s...", video_id)
-            categorized_comments = analyze_sentiment_gemini(comments)
+            with timed("gemini_classify"):
+                categorized_comments = await analyze_sentiment_gemini_async(texts)
             if categorized_comments:
-                overall_insights = generate_insights_gemini(categorized_comments)
-                highlights = generate_highlights_gemini(categorized_comments)
+                overall_insights, highlights = await asyncio.gather(
+                    _timed_async("gemini_insights", generate_insights_gemini_async(categorized_comments)),
+                    _timed_async("gemini_highlights", generate_highlights_gemini_async(categorized_comments)),
+                )
                 analysis_method = "Gemini"
                 logger.info("Gemini analysis successful for video %s.", video_id)
             else:
@@ -158,6 +872,7 @@ def analyze():
                 analysis_method = "TextBlob Fallback (Gemini returned no results)"
         except GeminiQuotaError as e:
             logger.warning("Gemini quota exceeded for video %s: %s", video_id, e)
+            QUOTA_ERRORS.labels("gemini").inc()
             analysis_method = "TextBlob Fallback (Gemini quota exceeded — see README)"
         except Exception:
             logger.exception("Gemini analysis failed; falling back to TextBlob.")
@@ -165,29 +880,348 @@ def analyze():
 
     if analysis_method != "Gemini":
         logger.info("Running TextBlob fallback for video %s.", video_id)
-        categorized_comments = analyze_sentiment_fallback(comments)
-        overall_insights = generate_insights_fallback(categorized_comments)
+        with timed("textblob"):
+            categorized_comments = await asyncio.to_thread(analyze_sentiment_fallback, texts)
+            overall_insights = generate_insights_fallback(categorized_comments)
+
+    for item, fetched in zip(categorized_comments, comments, strict=True):
+        item["published_at"] = fetched["published_at"]
 
-    overall_sentiment, comment_categories = compute_stats(categorized_comments)
+    # One pass builds the mergeable counts; every summary below is a view of it.
+    # The timeline is bucketed by real publish time whenever every comment has one.
+    with timed("aggregation"):
+        has_times = all(c["published_at"] for c in comments)
+        state = build_aggregate_state(
+            categorized_comments, resolution=TIMELINE_RESOLUTION if has_times else None
+        )
+        overall_sentiment, comment_categories = stats_from_state(state)
+        word_frequencies = word_frequencies_from_state(state)
+        sentiment_over_time = timeline_from_state(state)
 
     result = {
+        "video_id":            video_id,
         "youtube_url":         youtube_url,
         "video_title":         video_title,
-        "total_comments":      len(comments),
+        "total_comments":      total_comments,
         "overall_sentiment":   overall_sentiment,
         "comment_categories":  comment_categories,
         "comments_data":       categorized_comments,
         "overall_insights":    overall_insights,
         "highlights":          highlights,
         "analysis_method":     analysis_method,
-        "word_frequencies":    compute_word_frequencies(categorized_comments),
-        "sentiment_over_time": compute_sentiment_timeline(categorized_comments),
+        "word_frequencies":    word_frequencies,
+        "sentiment_over_time": sentiment_over_time,
+        "timeline_resolution": state["resolution"],     # None: chunked by arrival order
+        "sampled":             sampled,
+        # Which cache entry (and /comments ?mode=) this is; a sample-mode
+        # request for a small video is cached as "sample" but not sampled.
+        "mode":                "sample" if sample_mode else "full",
         "cached":              False,
     }
+    if sampled:
+        result["sample_size"] = len(comments)
+        result["confidence_intervals"] = sentiment_confidence_intervals(
+            state["sentiment"], state["total"], total_comments
+        )
+
+    ANALYSES.labels(analysis_method).inc()
+    return result, state
+
+
+async def _timed_async(stage: str, coro):
+    """Awaits coro, timing it as stage — for coroutines run side by side in gather()."""
+    with timed(stage):
+        return await coro
+
+
+
+
+# ---------------------------------------------------------------------------
+# Background refresh — one in flight per cache key: _refreshing dedupes
+# within this process, a refresh_claims row across workers
+# ---------------------------------------------------------------------------
+_refreshing: dict[str, asyncio.Task] = {}
+
+
+def _schedule_refresh(cache_key: str, video_id: str, youtube_url: str, sample_mode: bool) -> None:
+    """Starts a re-analysis of a stale entry unless one is already running. Call on the event loop."""
+    if cache_key in _refreshing:
+        return
+    # A blank context: the refresh outlives this request and must not hold on to it.
+    # The task copies whichever context it is created in.
+    task = contextvars.Context().run(
+        asyncio.get_running_loop().create_task, _refresh(cache_key, video_id, youtube_url, sample_mode)
+    )
+    _refreshing[cache_key] = task
+    task.add_done_callback(lambda _: _refreshing.pop(cache_key, None))
+
+
+async def _refresh(cache_key: str, video_id: str, youtube_url: str, sample_mode: bool) -> None:
+    if not await asyncio.to_thread(claim_refresh, cache_key, REFRESH_CLAIM_SECONDS):
+        return                                  # another worker is refreshing it
+    try:
+        await _refresh_claimed(cache_key, video_id, youtube_url, sample_mode)
+    finally:
+        await asyncio.to_thread(release_refresh, cache_key)
+
+
+async def _refresh_claimed(cache_key: str, video_id: str, youtube_url: str, sample_mode: bool) -> None:
+    # Another worker may have refreshed it already — adopt that copy instead.
+    stored = await asyncio.to_thread(load_result_entry, cache_key)
+    if stored is not None and time.time() - stored[1] < CACHE_TTL_SECONDS:
+        entry = _encode_cached(*stored)
+        with _cache_lock:
+            _cache[cache_key] = entry
+        return
+    if stored is not None:
+        stale_method = stored[0].get("analysis_method")
+    else:
+        with _cache_lock:
+            stale = _cache[cache_key] if cache_key in _cache else None
+        stale_method = stale.summary.get("analysis_method") if stale is not None else None
+    try:
+        result, state = await _run_analysis(video_id, youtube_url, sample_mode)
+    except AnalysisError as e:
+        logger.warning("Refresh of %s failed, keeping the stale result: %s", cache_key, e)
+        return
+    except Exception:
+        logger.exception("Refresh of %s failed, keeping the stale result.", cache_key)
+        return
+    # As in warm_cache: a fallback (Gemini quota or error) never replaces a
+    # Gemini result; the stale one is served until Gemini answers again.
+    if stale_method == "Gemini" and result["analysis_method"] != "Gemini":
+        logger.warning("Refresh of %s fell back to %s, keeping the stale Gemini result.",
+                       cache_key, result["analysis_method"])
+        return
+    await asyncio.to_thread(_refresh_persist, cache_key, result, state)
+    logger.info("Refreshed stale analysis for %s.", cache_key)
+
+
+def _fetch_title(video_id: str) -> str:
+    # Build and use the (per-thread) service on the same thread.
+    with timed("youtube_title"):
+        return fetch_video_title(build_youtube_service(), video_id)
+
 
-    _set_cached(video_id, result)
-    save_analysis(video_id, result, session_id)   # persist summary to SQLite
-    return jsonify(result)
+def _persist_analysis(cache_key: str, result: dict, session_id: str, state: dict) -> None:
+    """Blocking SQLite writes for a fresh analysis, run as one off-loop step."""
+    _persist_derived(cache_key, result, state)
+    with timed("sqlite_write"):
+        save_analysis(result["video_id"], result, session_id)   # summary row + daily rollup
+
+
+def _refresh_persist(cache_key: str, result: dict, state: dict) -> None:
+    """Writes for a refresh or warm-up: no history row, but it still counts in the daily rollup."""
+    _persist_derived(cache_key, result, state)
+    with timed("sqlite_write"):
+        record_rollup(result["video_id"], result)
+
+
+def _persist_derived(cache_key: str, result: dict, state: dict) -> None:
+    """Cache, search index and aggregate writes shared by every analysis."""
+    video_id = result["video_id"]
+    _set_cached(cache_key, result)
+    with timed("sqlite_write"):
+        index_search_documents(video_id, result["comments_data"], result["overall_insights"])
+        if not result["sampled"]:
+            save_aggregate_state(video_id, state)      # mergeable counts for later updates
+
+
+# ---------------------------------------------------------------------------
+# Cache warming — daily off-peak pre-analysis of watched and popular videos
+# ---------------------------------------------------------------------------
+_warmer_stop = threading.Event()
+# YouTube units one analysis spends: the title lookup plus one per page of 100 comments.
+_ANALYSIS_QUOTA_UNITS = 1 + math.ceil(MAX_COMMENTS / 100)
+
+
+def _watch_url(video_id: str) -> str:
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+def warmup_targets(watchlist: str = WARMUP_WATCHLIST, top_n: int = WARMUP_TOP_N) -> list[tuple[str, str]]:
+    """
+    (video_id, youtube_url) pairs to warm: the watch list file (YouTube URLs
+    or bare IDs, one per line, # starts a comment) in order, then the top_n
+    most-requested videos of the last WARMUP_LOOKBACK_DAYS.
+    """
+    targets: dict[str, str] = {}
+    if watchlist:
+        try:
+            with open(watchlist, encoding="utf-8") as f:
+                lines = [line.split("#", 1)[0].strip() for line in f]
+        except OSError:
+            logger.exception("Could not read warm-up watch list %s", watchlist)
+            lines = []
+        for line in filter(None, lines):
+            video_id = line if _VIDEO_ID_RE.fullmatch(line) else get_video_id(line)
+            if video_id:
+                targets.setdefault(video_id, _watch_url(video_id))
+            else:
+                logger.warning("Skipping unrecognised watch list entry %r.", line)
+    if top_n > 0:
+        for row in get_popular_videos(top_n, WARMUP_LOOKBACK_DAYS):
+            targets.setdefault(row["video_id"], row["youtube_url"] or _watch_url(row["video_id"]))
+    return list(targets.items())
+
+
+async def warm_cache(
+    targets: list[tuple[str, str]],
+    concurrency: int = WARMUP_CONCURRENCY,
+    quota_units: int = WARMUP_QUOTA_UNITS,
+) -> dict:
+    """
+    Analyses targets into the result cache, concurrency at a time, exactly
+    as a cold /analyze would (minus the history row). Returns a count per
+    outcome. Results still fresh are skipped for free; targets that would
+    take the run past quota_units YouTube units are not started, and a
+    Gemini quota error halts the run instead of caching fallback results.
+    """
+    counts = {"warmed": 0, "fresh": 0, "failed": 0, "over_budget": 0}
+    budget = {"units": quota_units, "halted": False}
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def warm(video_id: str, youtube_url: str) -> None:
+        async with semaphore:
+            stored = await asyncio.to_thread(load_result_entry, video_id)
+            if stored is not None and time.time() - stored[1] < CACHE_TTL_SECONDS:
+                counts["fresh"] += 1
+                return
+            if budget["halted"] or budget["units"] < _ANALYSIS_QUOTA_UNITS:
+                counts["over_budget"] += 1
+                return
+            budget["units"] -= _ANALYSIS_QUOTA_UNITS
+            try:
+                result, state = await _run_analysis(video_id, youtube_url, sample_mode=False)
+            except Exception as e:
+                logger.warning("Warm-up of %s failed: %s", video_id, e)
+                counts["failed"] += 1
+                return
+            if "quota exceeded" in result["analysis_method"]:
+                logger.warning("Gemini quota exhausted; stopping the warm-up at %s.", video_id)
+                budget["halted"] = True
+                counts["failed"] += 1
+                return
+            await asyncio.to_thread(_refresh_persist, video_id, result, state)
+            counts["warmed"] += 1
+
+    await asyncio.gather(*(warm(video_id, url) for video_id, url in targets))
+    return counts
+
+
+def _seconds_until_hour(hour: int, now: float) -> float:
+    """Seconds from now until the next hour:00 UTC."""
+    target = now - now % 86400 + hour * 3600
+    return target - now if target > now else target + 86400 - now
+
+
+def _warm_loop() -> None:
+    while not _warmer_stop.wait(_seconds_until_hour(WARMUP_HOUR, time.time())):
+        # Every worker wakes up; the first to claim today's slot does the run.
+        if not claim_warmup_slot(time.strftime("%Y-%m-%d", time.gmtime())):
+            continue
+        try:
+            counts = _run_coroutine(warm_cache(warmup_targets()))
+            logger.info("Cache warm-up finished: %s", counts)
+        except Exception:
+            logger.exception("Cache warm-up failed")
+
+
+def start_warmer() -> threading.Thread | None:
+    """Starts the daily cache warmer unless WARMUP_HOUR is outside 0–23."""
+    if not 0 <= WARMUP_HOUR <= 23:
+        return None
+    thread = threading.Thread(target=_warm_loop, name="vidalyze-warmer", daemon=True)
+    thread.start()
+    return thread
+
+
+# ---------------------------------------------------------------------------
+# Metrics — Prometheus scrape endpoint (see metrics.py)
+# ---------------------------------------------------------------------------
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Stage latency histograms and cache/fallback/quota counters, summed over every worker."""
+    payload, content_type = render()
+    return Response(payload, content_type=content_type)
+
+
+# ---------------------------------------------------------------------------
+# Admin — bulk export / import, cache stats
+# ---------------------------------------------------------------------------
+
+def _admin_denied():
+    """Returns an error response unless X-Admin-Token matches ADMIN_TOKEN."""
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Admin endpoints are disabled."}), 404
+    supplied = request.headers.get("X-Admin-Token", "")
+    if not hmac.compare_digest(supplied.encode(), ADMIN_TOKEN.encode()):
+        return jsonify({"error": "Invalid admin token."}), 403
+    return None
+
+
+@app.route("/export", methods=["GET"])
+def export():
+    """
+    Streams every stored analysis (and indexed comment) without buffering.
+
+    ?format=ndjson (default) carries both record types in one stream;
+    ?format=csv carries one, chosen with ?type=analysis|comment.
+    NDJSON also accepts ?type= to export only one kind.
+    """
+    if denied := _admin_denied():
+        return denied
+    fmt         = request.args.get("format", "ndjson")
+    record_type = request.args.get("type", "analysis" if fmt == "csv" else "")
+    if fmt not in FORMATS or record_type not in ("", "analysis", "comment"):
+        return jsonify({"error": "Unsupported export format or type."}), 400
+
+    def records():
+        if record_type in ("", "analysis"):
+            yield from iter_analyses()
+        if record_type in ("", "comment"):
+            yield from iter_comments()
+
+    body = encode_csv(records(), record_type) if fmt == "csv" else encode_ndjson(records())
+    response = Response(stream_with_context(body), mimetype=MIMETYPES[fmt])
+    response.headers["Content-Disposition"] = f"attachment; filename=vidalyze-export.{fmt}"
+    return response
+
+
+@app.route("/import", methods=["POST"])
+def import_history():
+    """
+    Loads an /export stream back in batched transactions, reading the request
+    body line by line. Send NDJSON, or CSV with ?format=csv&type=analysis|comment.
+    """
+    if denied := _admin_denied():
+        return denied
+    fmt         = request.args.get("format", "ndjson")
+    record_type = request.args.get("type", "analysis")
+    if fmt not in FORMATS or record_type not in ("analysis", "comment"):
+        return jsonify({"error": "Unsupported import format or type."}), 400
+
+    lines = io.TextIOWrapper(request.stream, encoding="utf-8", newline="")
+    records = decode_csv(lines, record_type) if fmt == "csv" else decode_ndjson(lines)
+    try:
+        counts = import_records(records)
+    except KeyError as e:
+        return jsonify({"error": f"Import stopped: record is missing field {e}."}), 400
+    except (ValueError, TypeError) as e:
+        # Batches committed before the bad record are kept; re-running the
+        # corrected file skips them as duplicates.
+        return jsonify({"error": f"Import stopped: {e}"}), 400
+    return jsonify(counts)
+
+
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    """This worker's in-memory result cache: occupancy, hits, admissions, evictions."""
+    if denied := _admin_denied():
+        return denied
+    with _cache_lock:
+        return jsonify(_cache.stats())
 
 
 @app.errorhandler(429)
@@ -207,4 +1241,7 @@ def internal_error(e):
 
 if __name__ == "__main__":
     debug_mode = os.getenv("FLASK_DEBUG", "false").lower() == "true"
+    # With the reloader, only the child process that serves requests starts them.
+    if not debug_mode or os.getenv("WERKZEUG_RUN_MAIN") == "true":
+        start_background_threads()
     app.run(debug=debug_mode, host="0.0.0.0", port=5000)
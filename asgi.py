@@ -0,0 +1,253 @@
+"""
+ASGI entry point — async serving mode for Vidalyze.
+
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+
+/analyze, /history and / run as coroutines on the server's event loop:
+Gemini calls are awaited directly, and blocking work (SQLite, the
+googleapiclient YouTube client, TextBlob) moves to a bounded thread pool
+(ASGI_BLOCKING_THREADS), so one process holds hundreds of analyses in
+flight while they wait on the network. Routing, rate limits, error
+handlers and responses are still Flask's — each async view runs inside a
+normal Flask request context.
+
+Every other route is the unchanged WSGI app, called on a worker thread.
+"""
+
+import asyncio
+import logging
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import app as flask_module
+from config import ASGI_BLOCKING_THREADS
+
+logger = logging.getLogger(__name__)
+
+flask_app = flask_module.app
+
+# Request bodies past this size spill from memory to a temp file.
+_SPOOL_BYTES = 1024 * 1024
+
+
+# ---------------------------------------------------------------------------
+# Async views
+# ---------------------------------------------------------------------------
+
+async def _index():
+    # Served from the once-rendered page — no I/O to wait on.
+    return flask_module.index()
+
+
+async def _history():
+    return await asyncio.to_thread(flask_module.history)
+
+
+_ASYNC_VIEWS = {
+    "index":   _index,
+    "history": _history,
+    "analyze": flask_module._analyze_async,
+}
+
+
+# ---------------------------------------------------------------------------
+# ASGI ⇄ WSGI plumbing
+# ---------------------------------------------------------------------------
+
+async def _read_body(receive) -> tempfile.SpooledTemporaryFile:
+    body = tempfile.SpooledTemporaryFile(max_size=_SPOOL_BYTES)
+    more = True
+    while more:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        body.write(message.get("body", b""))
+        more = message.get("more_body", False)
+    body.seek(0)
+    return body
+
+
+def _environ(scope: dict, body) -> dict:
+    """Builds a PEP 3333 environ from an ASGI HTTP scope."""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD":    scope["method"],
+        "SCRIPT_NAME":       scope.get("root_path", "").encode().decode("latin-1"),
+        "PATH_INFO":         scope["path"].encode().decode("latin-1"),
+        "QUERY_STRING":      scope["query_string"].decode("latin-1"),
+        "SERVER_NAME":       server[0],
+        "SERVER_PORT":       str(server[1]),
+        "SERVER_PROTOCOL":   f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR":       client[0],
+        "wsgi.version":      (1, 0),
+        "wsgi.url_scheme":   scope.get("scheme", "http"),
+        "wsgi.input":        body,
+        "wsgi.errors":       sys.stderr,
+        "wsgi.multithread":  True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once":     False,
+    }
+    for raw_name, raw_value in scope["headers"]:
+        name, value = raw_name.decode("latin-1").upper().replace("-", "_"), raw_value.decode("latin-1")
+        if name in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            environ[name] = value
+            continue
+        key = f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    # The body is already buffered and de-chunked; give its exact length.
+    environ.pop("HTTP_TRANSFER_ENCODING", None)
+    environ["CONTENT_LENGTH"] = str(body.seek(0, 2))
+    body.seek(0)
+    return environ
+
+
+async def _dispatch_async(environ: dict, view):
+    """
+    Flask's full_dispatch_request with an awaited view: before_request
+    hooks (including the rate limiter), error handlers and after_request
+    hooks all run as they would under WSGI. The before_request hooks run on
+    a worker thread — the limiter's SQLite writes may wait out a busy
+    timeout, and must not stall every other request on the loop meanwhile.
+    """
+    with flask_app.request_context(environ):
+        try:
+            try:
+                # to_thread copies the context, so the request context goes along.
+                rv = await asyncio.to_thread(flask_app.preprocess_request)
+                if rv is None:
+                    rv = await view()
+            except Exception as e:
+                rv = flask_app.handle_user_exception(e)
+            return flask_app.finalize_request(rv)
+        except Exception as e:
+            return flask_app.handle_exception(e)
+
+
+def _call_wsgi(wsgi_app, environ: dict):
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started["status"], started["headers"] = status, headers
+
+    chunks = wsgi_app(environ, start_response)
+    return started["status"], started["headers"], chunks
+
+
+def _run_wsgi(environ: dict, loop, queue: asyncio.Queue, abandoned: threading.Event) -> None:
+    """
+    Runs the WSGI app and drains its body on one worker thread — streamed
+    bodies (stream_with_context) must be iterated where they were started —
+    handing the status line and each chunk to the event loop through queue.
+    """
+    def put(item) -> None:
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    try:
+        status, headers, chunks = _call_wsgi(flask_app, environ)
+        try:
+            put((status, headers))
+            for chunk in chunks:
+                if abandoned.is_set():
+                    break
+                if chunk:
+                    put(chunk)
+        finally:
+            if hasattr(chunks, "close"):
+                chunks.close()
+    except Exception:
+        logger.exception("Unhandled error in WSGI fallback for %s", environ["PATH_INFO"])
+    finally:
+        put(None)
+
+
+async def _start(send, status: str, headers: list) -> None:
+    await send({
+        "type":    "http.response.start",
+        "status":  int(status.split(" ", 1)[0]),
+        "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in headers],
+    })
+
+
+async def _serve_async(send, environ: dict, view) -> None:
+    response = await _dispatch_async(environ, view)
+    status, headers, chunks = _call_wsgi(response, environ)
+    await _start(send, status, headers)
+    try:
+        for chunk in chunks:
+            if chunk:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+    finally:
+        chunks.close()
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def _serve_wsgi(send, environ: dict) -> None:
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=8)
+    abandoned = threading.Event()
+    worker = loop.run_in_executor(None, _run_wsgi, environ, loop, queue, abandoned)
+    try:
+        started = await queue.get()
+        if started is None:
+            await _start(send, "500 Internal Server Error", [("Content-Type", "text/plain")])
+            await send({"type": "http.response.body", "body": b"Internal Server Error"})
+            return
+        await _start(send, *started)
+        while (chunk := await queue.get()) is not None:
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        # On a client disconnect, unblock the worker so it can close the body.
+        abandoned.set()
+        while not worker.done():
+            while not queue.empty():
+                queue.get_nowait()
+            await asyncio.wait({worker}, timeout=0.05)
+
+
+# ---------------------------------------------------------------------------
+# Application
+# ---------------------------------------------------------------------------
+
+async def _lifespan(receive, send) -> None:
+    executor = None
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            executor = ThreadPoolExecutor(ASGI_BLOCKING_THREADS, thread_name_prefix="vidalyze-io")
+            asyncio.get_running_loop().set_default_executor(executor)
+            flask_module.start_background_threads()
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope: dict, receive, send) -> None:
+    if scope["type"] == "lifespan":
+        await _lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    body = await _read_body(receive)
+    try:
+        environ = _environ(scope, body)
+        adapter = flask_app.url_map.bind_to_environ(environ)
+        try:
+            endpoint, _ = adapter.match()
+        except Exception:  # 404/405/redirects — let the WSGI app answer them
+            endpoint = None
+
+        view = _ASYNC_VIEWS.get(endpoint)
+        if view is not None:
+            await _serve_async(send, environ, view)
+        else:
+            await _serve_wsgi(send, environ)
+    finally:
+        body.close()
@@ -0,0 +1,267 @@
+"""
+Static asset bundle for the single-page UI.
+
+Builds static/dist/ from the hand-written sources in static/ and the
+pinned third-party libraries in static/vendor/:
+
+    - app CSS/JS are minified (conservatively — whitespace and comments only)
+    - every file is renamed with a content hash, so it can be cached forever
+    - each file gets a .gz (and a .br when the optional brotli package is
+      installed) sibling, so the server never compresses per request
+    - manifest.json maps logical names ("js/app.js") to hashed ones
+
+    python assets.py            # fetch missing vendor files, then build
+    python assets.py --offline  # build only; fails if a vendor file is missing
+    python assets.py --pin      # download every vendor file and record its sha256
+
+Vendor files are checked against the sha256 digests committed in
+static/vendor.sha256 (sha256sum format) before they are written or built,
+so a changed or tampered CDN response fails the build instead of shipping.
+A vendor file with no digest yet is neither fetched nor bundled: the page
+keeps loading it from its pinned CDN URL until it is pinned.
+
+Without a build (local development) asset_url() falls back to the unhashed
+sources, and to the pinned CDN copy for any vendor file not on disk.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import re
+import shutil
+import sys
+import urllib.request
+from pathlib import Path
+
+try:
+    import brotli
+except ImportError:  # optional — only .gz variants are written without it
+    brotli = None
+
+STATIC_DIR = Path(__file__).parent / "static"
+DIST_DIR   = "dist"
+MANIFEST   = "manifest.json"
+
+# Pinned third-party libraries, fetched once at build time instead of on
+# every page load. Their digests live in VENDOR_DIGESTS.
+VENDOR_DIGESTS = "vendor.sha256"
+VENDOR = {
+    "vendor/marked.min.js":     "https://cdn.jsdelivr.net/npm/marked@9.1.6/marked.min.js",
+    "vendor/purify.min.js":     "https://cdnjs.cloudflare.com/ajax/libs/dompurify/3.0.6/purify.min.js",
+    "vendor/wordcloud2.min.js": "https://cdnjs.cloudflare.com/ajax/libs/wordcloud2.js/1.2.2/wordcloud2.min.js",
+    "vendor/chart.umd.min.js":  "https://cdn.jsdelivr.net/npm/chart.js@4.4.3/dist/chart.umd.min.js",
+}
+
+# First-party sources, minified before hashing.
+SOURCES = ("css/app.css", "js/app.js")
+
+# Files smaller than this aren't worth a compressed variant.
+_MIN_COMPRESS_BYTES = 512
+
+
+# ---------------------------------------------------------------------------
+# Minification
+# ---------------------------------------------------------------------------
+
+_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+_CSS_PUNCT   = re.compile(r"\s*([{};,>])\s*")
+
+
+def minify_css(css: str) -> str:
+    """Strips comments and insignificant whitespace from a stylesheet."""
+    css = _CSS_COMMENT.sub("", css)
+    css = re.sub(r"\s+", " ", css)
+    css = _CSS_PUNCT.sub(r"\1", css)
+    css = re.sub(r":\s+", ":", css)
+    return css.replace(";}", "}").strip()
+
+
+def minify_js(js: str) -> str:
+    """
+    Drops indentation, blank lines and whole-line // comments. Line breaks
+    are kept so automatic semicolon insertion behaves exactly as before, and
+    lines inside multi-line template literals are left untouched.
+    """
+    out = []
+    in_template = False
+    for line in js.splitlines():
+        stripped = line.strip()
+        if in_template:
+            out.append(line)
+        elif stripped and not stripped.startswith("//"):
+            out.append(stripped)
+        if len(re.findall(r"(?<!\\)`", line)) % 2:
+            in_template = not in_template
+    return "\n".join(out) + "\n"
+
+
+_MINIFIERS = {".css": minify_css, ".js": minify_js}
+
+
+# ---------------------------------------------------------------------------
+# Build
+# ---------------------------------------------------------------------------
+
+def load_vendor_digests(static_dir: Path = STATIC_DIR) -> dict[str, str]:
+    """{name: sha256 hex} from VENDOR_DIGESTS, or {} when nothing is pinned yet."""
+    try:
+        lines = (static_dir / VENDOR_DIGESTS).read_text(encoding="utf-8").splitlines()
+    except FileNotFoundError:
+        return {}
+    digests = {}
+    for line in lines:
+        if line.strip() and not line.startswith("#"):
+            digest, name = line.split(maxsplit=1)
+            digests[name.lstrip("*")] = digest.lower()
+    return digests
+
+
+def verify_vendor(name: str, content: bytes, digests: dict[str, str]) -> None:
+    """Raises ValueError unless content matches the pinned sha256 for name."""
+    expected = digests.get(name)
+    if expected is None:
+        raise ValueError(f"No pinned sha256 for {name} — run `python assets.py --pin` and commit {VENDOR_DIGESTS}.")
+    actual = hashlib.sha256(content).hexdigest()
+    if actual != expected:
+        raise ValueError(f"{name} has sha256 {actual}, expected {expected}.")
+
+
+def _download(url: str) -> bytes:
+    with urllib.request.urlopen(url, timeout=30) as response:  # noqa: S310 — pinned https URLs
+        return response.read()
+
+
+def fetch_vendor(static_dir: Path = STATIC_DIR) -> list[str]:
+    """
+    Downloads any pinned vendor file that isn't on disk yet, verifying it
+    before it is written. Returns their names; raises ValueError on a
+    mismatched digest. Unpinned files are skipped (see unpinned_vendor).
+    """
+    digests = load_vendor_digests(static_dir)
+    fetched = []
+    for name, url in VENDOR.items():
+        target = static_dir / name
+        if target.exists() or name not in digests:
+            continue
+        content = _download(url)
+        verify_vendor(name, content, digests)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(content)
+        fetched.append(name)
+    return fetched
+
+
+def unpinned_vendor(static_dir: Path = STATIC_DIR) -> list[str]:
+    """Vendor files without a digest in VENDOR_DIGESTS — served from their CDN URL."""
+    digests = load_vendor_digests(static_dir)
+    return [name for name in VENDOR if name not in digests]
+
+
+def pin_vendor(static_dir: Path = STATIC_DIR) -> dict[str, str]:
+    """
+    Downloads every vendor file and (re)writes VENDOR_DIGESTS with their
+    sha256 digests. Run it when changing a VENDOR URL, and review the diff.
+    """
+    digests = {name: hashlib.sha256(_download(url)).hexdigest() for name, url in VENDOR.items()}
+    (static_dir / VENDOR_DIGESTS).write_text(
+        "".join(f"{digest}  {name}\n" for name, digest in sorted(digests.items())), encoding="utf-8"
+    )
+    return digests
+
+
+def _hashed_name(name: str, content: bytes) -> str:
+    digest = hashlib.sha256(content).hexdigest()[:12]
+    stem, dot, ext = name.rpartition(".")
+    return f"{stem}.{digest}.{ext}" if dot else f"{name}.{digest}"
+
+
+def _write_variants(path: Path, content: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    if len(content) < _MIN_COMPRESS_BYTES:
+        return
+    # mtime=0 keeps the .gz byte-identical across builds.
+    path.with_name(path.name + ".gz").write_bytes(gzip.compress(content, 9, mtime=0))
+    if brotli is not None:
+        path.with_name(path.name + ".br").write_bytes(brotli.compress(content, quality=11))
+
+
+def build(static_dir: Path = STATIC_DIR) -> dict[str, str]:
+    """
+    Rebuilds static_dir/dist from scratch and returns the manifest.
+    Raises FileNotFoundError if a source or pinned vendor file is missing,
+    and ValueError if a vendor file doesn't match its pinned digest.
+    Unpinned vendor files are left out of the bundle.
+    """
+    digests = load_vendor_digests(static_dir)
+    dist = static_dir / DIST_DIR
+    shutil.rmtree(dist, ignore_errors=True)
+
+    manifest = {}
+    for name in (*SOURCES, *(vendor for vendor in VENDOR if vendor in digests)):
+        source = static_dir / name
+        content = source.read_bytes()
+        if name in SOURCES:
+            content = _MINIFIERS[source.suffix](content.decode("utf-8")).encode("utf-8")
+        else:
+            verify_vendor(name, content, digests)
+        hashed = _hashed_name(name, content)
+        _write_variants(dist / hashed, content)
+        manifest[name] = hashed
+
+    (dist / MANIFEST).write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    return manifest
+
+
+# ---------------------------------------------------------------------------
+# Lookup
+# ---------------------------------------------------------------------------
+
+def load_manifest(static_dir: Path = STATIC_DIR) -> dict[str, str]:
+    """Returns the built manifest, or {} when the bundle hasn't been built."""
+    try:
+        return json.loads((static_dir / DIST_DIR / MANIFEST).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def asset_url(name: str, manifest: dict[str, str], static_dir: Path = STATIC_DIR) -> str:
+    """
+    URL for a logical asset name: the fingerprinted build when there is one,
+    otherwise the unhashed source, otherwise (vendor files only) the CDN.
+    """
+    if name in manifest:
+        return f"/static/{DIST_DIR}/{manifest[name]}"
+    if name in VENDOR and not (static_dir / name).exists():
+        return VENDOR[name]
+    return f"/static/{name}"
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="assets", description="Build the static asset bundle.")
+    parser.add_argument("--offline", action="store_true", help="don't download missing vendor files")
+    parser.add_argument("--pin", action="store_true", help=f"download vendor files and rewrite {VENDOR_DIGESTS}")
+    args = parser.parse_args(argv)
+
+    if args.pin:
+        for name, digest in pin_vendor().items():
+            print(f"{digest}  {name}")
+        return 0
+    for name in unpinned_vendor():
+        print(f"Not pinned in {VENDOR_DIGESTS}, served from its CDN URL: {name}", file=sys.stderr)
+    try:
+        if not args.offline:
+            for name in fetch_vendor():
+                print(f"Fetched {name}")
+        manifest = build()
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Build failed: {e}", file=sys.stderr)
+        return 1
+    for name, hashed in manifest.items():
+        print(f"{name} -> {DIST_DIR}/{hashed}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
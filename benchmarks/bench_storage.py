@@ -0,0 +1,101 @@
+"""
+Benchmark the SQLite history read and write paths under concurrent threads.
+
+Compares the pooled storage layer against opening a fresh connection per
+call (the previous behaviour). Runs against a throwaway database:
+
+    python benchmarks/bench_storage.py [--threads 8] [--ops 500]
+"""
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import storage  # noqa: E402
+
+_SESSION = "aaaaaaaa-aaaa-4aaa-aaaa-aaaaaaaaaaaa"
+_RESULT = {
+    "youtube_url":        "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "video_title":        "Benchmark Video",
+    "total_comments":     500,
+    "analysis_method":    "Gemini",
+    "overall_sentiment":  {"Positive": 70.0, "Neutral": 20.0, "Negative": 10.0},
+    "comment_categories": {"Positive": 350, "Neutral": 100, "Negative": 50},
+    "overall_insights":   "## Summary\n\nBenchmark.",
+}
+
+
+def _unpooled_save(video_id: str) -> None:
+    with sqlite3.connect(storage.DB_PATH) as conn:
+        conn.execute(
+            """
+            INSERT INTO analyses
+                (video_id, video_title, youtube_url, analysis_method, total_comments,
+                 overall_sentiment, comment_categories, overall_insights, session_id, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))
+            """,
+            (video_id, _RESULT["video_title"], _RESULT["youtube_url"], _RESULT["analysis_method"],
+             _RESULT["total_comments"], json.dumps(_RESULT["overall_sentiment"]),
+             json.dumps(_RESULT["comment_categories"]), _RESULT["overall_insights"], _SESSION),
+        )
+        conn.commit()
+
+
+def _unpooled_history() -> None:
+    with sqlite3.connect(storage.DB_PATH) as conn:
+        conn.row_factory = sqlite3.Row
+        rows = conn.execute(
+            "SELECT * FROM analyses WHERE session_id = ? ORDER BY created_at DESC LIMIT 20",
+            (_SESSION,),
+        ).fetchall()
+        for row in rows:
+            json.loads(row["overall_sentiment"])
+            json.loads(row["comment_categories"])
+
+
+def _run(label: str, op, threads: int, ops: int) -> None:
+    def worker(n: int) -> None:
+        for i in range(ops):
+            op(f"v{n:03d}{i:07d}")
+
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - start
+    total = threads * ops
+    print(f"{label:<28} {total:>7} ops  {elapsed:7.3f} s  {total / elapsed:9.0f} ops/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=500, help="operations per thread")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)   # per-save INFO lines would dominate
+
+    with tempfile.TemporaryDirectory() as tmp, \
+         patch("storage.DB_PATH", Path(tmp) / "bench.db"):
+        storage.init_db()
+        print(f"{args.threads} threads × {args.ops} ops\n")
+        _run("write  (connect per call)", lambda vid: _unpooled_save(vid), args.threads, args.ops)
+        _run("write  (pooled)", lambda vid: storage.save_analysis(vid, _RESULT, _SESSION),
+             args.threads, args.ops)
+        _run("read   (connect per call)", lambda _: _unpooled_history(), args.threads, args.ops)
+        _run("read   (pooled)", lambda _: storage.get_history(20, _SESSION), args.threads, args.ops)
+        storage.close_pool()
+
+
+if __name__ == "__main__":
+    main()
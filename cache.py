@@ -0,0 +1,126 @@
+"""
+Byte-bounded in-memory cache with TinyLFU admission.
+
+Entries are weighed in approximate bytes rather than counted, so one
+50k-comment result takes the room of many small ones. Eviction is least
+recently used, but a new key is only let in when the frequency sketch says
+it is wanted more often than every entry it would displace — a burst of
+one-off lookups can't flush the videos everyone keeps opening.
+
+Not thread-safe on its own; app.py guards it with _cache_lock.
+"""
+
+from collections import OrderedDict
+from collections.abc import Callable, Iterator, MutableMapping
+
+from sketch import FrequencySketch
+
+
+class TinyLFUCache(MutableMapping):
+    """
+    An LRU-ordered mapping of at most max_bytes, as measured by weigher.
+
+    get() is the lookup that counts: it feeds the frequency sketch and the
+    hit/miss statistics. Item access, `in` and iteration don't, so checks
+    like the rate-limit cost probe leave the policy untouched.
+
+    Setting a key already present always replaces it (a refresh keeps its
+    slot); setting a new key may be rejected, in which case the mapping is
+    left unchanged.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        weigher: Callable[[object], int],
+        sketch_width: int = 1024,
+    ):
+        if max_bytes < 1:
+            raise ValueError("max_bytes must be at least 1.")
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._weigh = weigher
+        self._data: OrderedDict[str, tuple[object, int]] = OrderedDict()
+        self._sketch = FrequencySketch(sketch_width)
+        self.hits = self.misses = 0
+        self.admissions = self.rejections = self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._data)
+
+    def __contains__(self, key) -> bool:
+        return key in self._data
+
+    def __getitem__(self, key: str):
+        return self._data[key][0]
+
+    def get(self, key: str, default=None):
+        self._sketch.increment(key)
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._data.move_to_end(key)
+        return item[0]
+
+    def __setitem__(self, key: str, value) -> None:
+        weight = self._weigh(value)
+        present = key in self._data
+        if weight > self.max_bytes or not (present or self._admit(key, weight)):
+            self.rejections += 1
+            return
+        if present:
+            self._remove(key)
+        else:
+            self.admissions += 1
+        self._data[key] = (value, weight)
+        self.bytes += weight
+        while self.bytes > self.max_bytes:
+            victim = next(iter(self._data))
+            self._remove(victim)
+            self.evictions += 1
+
+    def __delitem__(self, key: str) -> None:
+        self._remove(key)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self.bytes = 0
+
+    def _remove(self, key: str) -> None:
+        _, weight = self._data.pop(key)
+        self.bytes -= weight
+
+    def _admit(self, key: str, weight: int) -> bool:
+        """True if the candidate is more popular than every LRU entry it would evict."""
+        needed = self.bytes + weight - self.max_bytes
+        if needed <= 0:
+            return True
+        candidate = self._sketch.estimate(key)
+        freed = 0
+        for victim, (_, victim_weight) in self._data.items():
+            if self._sketch.estimate(victim) >= candidate:
+                return False
+            freed += victim_weight
+            if freed >= needed:
+                return True
+        return False
+
+    def stats(self) -> dict:
+        """Occupancy plus hit, admission and eviction counters since start."""
+        lookups = self.hits + self.misses
+        return {
+            "entries":    len(self._data),
+            "bytes":      self.bytes,
+            "max_bytes":  self.max_bytes,
+            "hits":       self.hits,
+            "misses":     self.misses,
+            "hit_rate":   round(self.hits / lookups, 4) if lookups else 0.0,
+            "admissions": self.admissions,
+            "rejections": self.rejections,
+            "evictions":  self.evictions,
+        }
@@ -0,0 +1,121 @@
+"""
+Command-line export/import of Vidalyze history, and on-demand cache warming.
+
+Talks to the database directly (no server needed) and streams records, so
+multi-GB databases export and import in constant memory.
+
+    python cli.py export history.ndjson
+    python cli.py export analyses.csv --format csv --type analysis
+    python cli.py import history.ndjson
+    python cli.py import comments.csv --format csv --type comment
+
+A path of "-" reads stdin / writes stdout.
+
+    python cli.py warm --watchlist morning.txt --top 50 --budget 2000
+
+pre-analyses the watch list and the most-requested videos into the shared
+result store now, like the WARMUP_HOUR schedule does (see config.py).
+
+    python cli.py vacuum
+
+converts a database created before incremental vacuum was enabled, so space
+freed by the retention pruner goes back to the filesystem. It rewrites the
+whole file and blocks writers while it runs — do it once, off-peak.
+"""
+
+import argparse
+import asyncio
+import sys
+
+from config import WARMUP_CONCURRENCY, WARMUP_QUOTA_UNITS, WARMUP_TOP_N, WARMUP_WATCHLIST
+from storage import enable_incremental_vacuum, import_records, init_db, iter_analyses, iter_comments
+from transfer import FORMATS, RECORD_TYPES, decode_csv, decode_ndjson, encode_csv, encode_ndjson
+
+
+def _export(args: argparse.Namespace) -> int:
+    record_type = args.type or ("analysis" if args.format == "csv" else "")
+
+    def records():
+        if record_type in ("", "analysis"):
+            yield from iter_analyses()
+        if record_type in ("", "comment"):
+            yield from iter_comments()
+
+    lines = encode_csv(records(), record_type) if args.format == "csv" else encode_ndjson(records())
+    out = sys.stdout if args.path == "-" else open(args.path, "w", encoding="utf-8", newline="")
+    try:
+        out.writelines(lines)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+def _import(args: argparse.Namespace) -> int:
+    src = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8", newline="")
+    try:
+        records = decode_csv(src, args.type or "analysis") if args.format == "csv" else decode_ndjson(src)
+        counts = import_records(records)
+    except (ValueError, KeyError, TypeError) as e:
+        print(f"Import stopped: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if src is not sys.stdin:
+            src.close()
+    print(
+        f"Imported {counts['analyses']} analyses and {counts['comments']} comments "
+        f"({counts['skipped']} duplicates skipped)."
+    )
+    return 0
+
+
+def _warm(args: argparse.Namespace) -> int:
+    import app  # the full analysis pipeline — only this command needs it
+
+    targets = app.warmup_targets(args.watchlist, args.top)
+    counts = asyncio.run(app.warm_cache(targets, args.concurrency, args.budget))
+    print(
+        f"Warmed {counts['warmed']} of {len(targets)} videos ({counts['fresh']} already fresh, "
+        f"{counts['failed']} failed, {counts['over_budget']} over the quota budget)."
+    )
+    return 0
+
+
+def _vacuum(args: argparse.Namespace) -> int:
+    if enable_incremental_vacuum():
+        print("Database converted to incremental vacuum.")
+    else:
+        print("Database already uses incremental vacuum; nothing to do.")
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="vidalyze", description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, handler in (("export", _export), ("import", _import)):
+        command = commands.add_parser(name)
+        command.add_argument("path", help='file path, or "-" for stdin/stdout')
+        command.add_argument("--format", choices=FORMATS, default="ndjson")
+        command.add_argument("--type", choices=RECORD_TYPES,
+                             help="record type (required for CSV; default: all for NDJSON export)")
+        command.set_defaults(handler=handler)
+
+    warm = commands.add_parser("warm")
+    warm.add_argument("--watchlist", default=WARMUP_WATCHLIST,
+                      help="file of YouTube URLs or video IDs, one per line")
+    warm.add_argument("--top", type=int, default=WARMUP_TOP_N,
+                      help="also warm this many most-requested recent videos")
+    warm.add_argument("--concurrency", type=int, default=WARMUP_CONCURRENCY)
+    warm.add_argument("--budget", type=int, default=WARMUP_QUOTA_UNITS,
+                      help="YouTube API units this run may spend")
+    warm.set_defaults(handler=_warm)
+
+    commands.add_parser("vacuum").set_defaults(handler=_vacuum)
+
+    args = parser.parse_args(argv)
+    init_db()
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
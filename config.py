@@ -21,13 +21,121 @@ YOUTUBE_API_VERSION = "v3"
 # Analysis tuning
 MAX_COMMENTS = 500  # YouTube comments fetched per analysis
 
+# Sampling mode (mode=sample) — fetch many comments, classify a stratified sample
+SAMPLE_MAX_COMMENTS = 20000   # comments fetched per sampled analysis
+SAMPLE_SIZE = 500             # comments actually classified
+SAMPLE_PAGE_SIZE = 100        # stratum size — one YouTube API page
+
+# Word-cloud counting — exact below the threshold, Space-Saving sketch above it.
+# The sketch overestimates any count by at most EPSILON × total tokens.
+WORD_SKETCH_EXACT_MAX_COMMENTS = 5000
+WORD_SKETCH_EPSILON = 0.0005   # → 2,000 counters
+
+# Sentiment-over-time bucket width: "hour" | "day" | "week", or "auto" to
+# pick the finest that fits the span of each video's fetched comments.
+TIMELINE_RESOLUTION = os.getenv("TIMELINE_RESOLUTION", "auto")
+
+# Duplicate collapsing — near-duplicates need at least this Jaccard similarity
+# over character shingles; shorter comments are only collapsed on exact match.
+NEAR_DUP_THRESHOLD = 0.8
+NEAR_DUP_MIN_CHARS = 20
+
 # TextBlob polarity thresholds — calibrated: >0.1 = Positive, <-0.1 = Negative
 TEXTBLOB_POSITIVE_THRESHOLD = 0.1
 TEXTBLOB_NEGATIVE_THRESHOLD = -0.1
 
-# In-memory cache settings
+# SQLite connection pool — idle connections kept per worker process
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+
+# Retention — analyses older than MAX_AGE_DAYS, and each session's rows beyond
+# its newest MAX_ROWS_PER_SESSION, are pruned in the background. Both rules
+# are off (0) by default so history is never deleted unless an operator opts
+# in; PRUNE_INTERVAL_SECONDS=0 disables the pruner altogether. Deletes run in
+# batches of PRUNE_BATCH_SIZE rows so the write lock is only held briefly.
+RETENTION_MAX_AGE_DAYS = int(os.getenv("RETENTION_MAX_AGE_DAYS", "0"))
+RETENTION_MAX_ROWS_PER_SESSION = int(os.getenv("RETENTION_MAX_ROWS_PER_SESSION", "0"))
+PRUNE_INTERVAL_SECONDS = int(os.getenv("PRUNE_INTERVAL_SECONDS", "3600"))
+PRUNE_BATCH_SIZE = 500
+
+# Bulk export/import — rows per read batch / write transaction
+EXPORT_BATCH_SIZE = 1000
+
+# Admin endpoints (/export, /import) require this token in X-Admin-Token.
+# Unset → those endpoints are disabled.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# asgi.py only: worker threads for blocking calls (SQLite, googleapiclient,
+# TextBlob) so they don't stall the event loop. Bounds how many analyses can
+# be fetching from YouTube at once; Gemini calls are awaited and don't count.
+ASGI_BLOCKING_THREADS = int(os.getenv("ASGI_BLOCKING_THREADS", "64"))
+
+# /history page size — default and the most a client may request per page
+HISTORY_PAGE_SIZE = 20
+HISTORY_MAX_PAGE_SIZE = 100
+
+# Browser/proxy freshness for GET /analysis/<id>; after this they revalidate
+# with If-None-Match and usually get a body-less 304.
+ANALYSIS_HTTP_MAX_AGE = 300
+
+# Comments per page in the /analyze response and /analysis/<id>/comments
+COMMENTS_PAGE_SIZE = 50
+COMMENTS_MAX_PAGE_SIZE = 200
+
+# /search page size — default and maximum; deep pages are capped to keep
+# BM25 ranking cheap on very large indexes.
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 50
+SEARCH_MAX_OFFSET = 1000
+
+# /analyze rate limits, in cost units shared by every worker process. A cold
+# analysis costs COLD_ANALYSIS_COST, a hit in the in-memory cache (or a
+# rejected URL) CACHE_HIT_COST — so a session gets 5 cold analyses or 60
+# cache hits a minute, and an IP (which may be many users behind a NAT)
+# twice that.
+ANALYZE_IP_LIMIT = "120 per minute"
+ANALYZE_SESSION_LIMIT = "60 per minute"
+COLD_ANALYSIS_COST = 12
+CACHE_HIT_COST = 1
+# Where the counters live. Empty → ratelimit.db next to the history DB;
+# any limits storage URI (e.g. redis://host:6379) also works.
+RATELIMIT_STORAGE_URI = os.getenv("RATELIMIT_STORAGE_URI", "")
+
+# In-memory cache settings. Past CACHE_TTL_SECONDS (soft TTL) a cached result
+# is still served but re-analysed in the background; past
+# RESULT_STORE_TTL_SECONDS (hard TTL, below) it is no longer served at all.
 CACHE_TTL_SECONDS = 3600   # 1 hour
-CACHE_MAX_SIZE = 100       # max video IDs cached simultaneously
+# One background refresh per cache key runs across all workers; a worker
+# that dies mid-refresh holds the claim for at most this long.
+REFRESH_CLAIM_SECONDS = 600
+# The cache is bounded by approximate resident bytes per worker, and admits
+# a new video only if it is requested more often than the entries it would
+# evict (TinyLFU). CACHE_COMPRESS keeps each cached comment list
+# zlib-compressed — roughly 10× smaller, at the cost of inflating it on
+# every comments page read.
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_COMPRESS = os.getenv("CACHE_COMPRESS", "false").lower() == "true"
+CACHE_SKETCH_WIDTH = 4096  # frequency counters per row; ~10× the keys worth tracking
+
+# Persistent L2 result store — full /analyze payloads, compressed in SQLite.
+# Survives restarts so a redeploy doesn't re-fetch and re-classify every video.
+# Least recently read entries are evicted past the byte budget; 0 disables it.
+RESULT_STORE_MAX_BYTES = int(os.getenv("RESULT_STORE_MAX_BYTES", str(256 * 1024 * 1024)))
+RESULT_STORE_TTL_SECONDS = int(os.getenv("RESULT_STORE_TTL_SECONDS", str(24 * 3600)))
+# Bump whenever the /analyze payload shape or classification changes so stale
+# stored results are ignored instead of served.
+ANALYSIS_VERSION = 3
+
+# Cache warming — once a day at WARMUP_HOUR (UTC; -1 disables) one worker
+# pre-analyses the videos in WARMUP_WATCHLIST (a file of URLs or IDs, one per
+# line) and the WARMUP_TOP_N most-requested videos of the last
+# WARMUP_LOOKBACK_DAYS, WARMUP_CONCURRENCY at a time. It stops once the run
+# would spend more than WARMUP_QUOTA_UNITS YouTube API units.
+WARMUP_HOUR = int(os.getenv("WARMUP_HOUR", "-1"))
+WARMUP_WATCHLIST = os.getenv("WARMUP_WATCHLIST", "")
+WARMUP_TOP_N = int(os.getenv("WARMUP_TOP_N", "20"))
+WARMUP_LOOKBACK_DAYS = 7
+WARMUP_CONCURRENCY = int(os.getenv("WARMUP_CONCURRENCY", "2"))
+WARMUP_QUOTA_UNITS = int(os.getenv("WARMUP_QUOTA_UNITS", "500"))
 
 # Gemini model endpoint
 GEMINI_API_URL = (
@@ -0,0 +1,180 @@
+"""
+Duplicate and near-duplicate comment collapsing for Vidalyze.
+
+Viral videos attract copypasta, "first!" spam and bot floods. Classifying
+every copy wastes Gemini tokens and TextBlob time, so comments are grouped
+first and only one representative per group is classified; its label is
+then fanned back out to every member so distributions stay correct.
+
+Two passes:
+  1. Exact — comments that are identical after normalisation (case,
+     punctuation, whitespace) share a representative.
+  2. Near  — longer comments are MinHashed over character shingles and
+     bucketed with LSH banding; candidates sharing a bucket are verified
+     with true Jaccard similarity before being merged. A candidate is only
+     merged if every word the two comments don't share is noise — digits,
+     leftover symbols or laughter like "hahaha" — so "I agree …" and
+     "I disagree …", or "great" and "not great", always stay apart, however
+     similar the rest of the text is.
+
+The MinHash uses one-permutation hashing (Li, Owen & Zhang, 2012): each
+shingle is hashed once and the hash space is split into bins, so the
+signature costs O(shingles) rather than O(shingles × permutations).
+"""
+
+import logging
+import re
+
+from config import NEAR_DUP_MIN_CHARS, NEAR_DUP_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+_SHINGLE_SIZE  = 5
+_NUM_BINS      = 32          # MinHash signature length (one-permutation bins)
+_BANDS         = 8           # LSH bands of _NUM_BINS // _BANDS rows each
+_ROWS          = _NUM_BINS // _BANDS
+_MAX_CANDIDATES = 32         # verified candidates per comment — caps worst-case spam floods
+_HASH_MASK     = (1 << 64) - 1
+_EMPTY         = 1 << 64
+
+_NON_WORD_RE   = re.compile(r"[\W_]+")
+_REPEAT_RE     = re.compile(r"(.)\1{2,}")
+# A token that is one short unit repeated: "haha", "xoxo", "zz".
+_REPEATED_UNIT_RE = re.compile(r"(.+?)\1+")
+
+
+def normalize_comment(text: str) -> str:
+    """
+    Returns a canonical form used for exact duplicate detection.
+    Lower-cases, strips punctuation and squashes character runs ("soooo" → "soo").
+    Comments made only of symbols/emoji keep their stripped raw text so they
+    are not all collapsed into one empty key.
+    """
+    lowered = _REPEAT_RE.sub(r"\1\1", text.lower())
+    normalized = " ".join(_NON_WORD_RE.sub(" ", lowered).split())
+    return normalized or text.strip()
+
+
+def _shingles(text: str) -> set[int]:
+    if len(text) <= _SHINGLE_SIZE:
+        return {hash(text) & _HASH_MASK}
+    return {
+        hash(text[i : i + _SHINGLE_SIZE]) & _HASH_MASK
+        for i in range(len(text) - _SHINGLE_SIZE + 1)
+    }
+
+
+def _minhash(shingles: set[int]) -> list[int]:
+    """One-permutation MinHash: the minimum hash per bin, densified by rotation."""
+    signature = [_EMPTY] * _NUM_BINS
+    for s in shingles:
+        b = s % _NUM_BINS
+        if s < signature[b]:
+            signature[b] = s
+    # Short texts leave bins empty; borrow from the next filled bin so two
+    # empty bins never count as agreement.
+    for b in range(_NUM_BINS):
+        if signature[b] == _EMPTY:
+            offset = 1
+            while signature[(b + offset) % _NUM_BINS] == _EMPTY:
+                offset += 1
+            signature[b] = signature[(b + offset) % _NUM_BINS] + offset
+    return signature
+
+
+def _jaccard(a: set[int], b: set[int]) -> float:
+    return len(a & b) / len(a | b)
+
+
+def _is_noise(word: str) -> bool:
+    """True for tokens that carry no meaning: no letters at all, or a repeated unit."""
+    return not any(c.isalpha() for c in word) or _REPEATED_UNIT_RE.fullmatch(word) is not None
+
+
+def _differ_only_by_noise(a: set[str], b: set[str]) -> bool:
+    """
+    False if either word set has a real word the other lacks. Any differing
+    word may flip the meaning ("agree" / "disagree", "is" / "isn t"), and no
+    word list can name them all, so only noise tokens may differ.
+    """
+    return all(_is_noise(word) for word in a ^ b)
+
+
+def collapse_duplicates(
+    comments: list[str], threshold: float = NEAR_DUP_THRESHOLD
+) -> tuple[list[int], list[int]]:
+    """
+    Groups duplicate and near-duplicate comments.
+
+    Returns:
+        (representatives, assignment)
+        representatives — indices into comments, one per group, in first-seen order
+        assignment      — for every comment, the position of its group in representatives
+    """
+    representatives: list[int] = []
+    assignment: list[int] = []
+    exact: dict[str, int] = {}
+    rep_shingles: dict[int, set[int]] = {}
+    rep_words: dict[int, set[str]] = {}
+    buckets: dict[tuple, list[int]] = {}
+
+    for i, text in enumerate(comments):
+        key = normalize_comment(text)
+        group = exact.get(key)
+
+        if group is None and len(key) >= NEAR_DUP_MIN_CHARS:
+            shingles = _shingles(key)
+            words = set(key.split())
+            signature = _minhash(shingles)
+            bands = [(b, tuple(signature[b * _ROWS : (b + 1) * _ROWS])) for b in range(_BANDS)]
+
+            checked: set[int] = set()
+            for band in bands:
+                for candidate in buckets.get(band, ()):
+                    if candidate in checked:
+                        continue
+                    checked.add(candidate)
+                    if (
+                        _jaccard(shingles, rep_shingles[candidate]) >= threshold
+                        and _differ_only_by_noise(words, rep_words[candidate])
+                    ):
+                        group = candidate
+                        break
+                    if len(checked) >= _MAX_CANDIDATES:
+                        break
+                if group is not None or len(checked) >= _MAX_CANDIDATES:
+                    break
+
+            if group is None:
+                group = len(representatives)
+                representatives.append(i)
+                rep_shingles[group] = shingles
+                rep_words[group] = words
+                for band in bands:
+                    buckets.setdefault(band, []).append(group)
+        elif group is None:
+            group = len(representatives)
+            representatives.append(i)
+
+        exact.setdefault(key, group)
+        assignment.append(group)
+
+    if len(representatives) < len(comments):
+        logger.info("Collapsed %d comments into %d unique groups.",
+                    len(comments), len(representatives))
+    return representatives, assignment
+
+
+def fan_out(comments: list[str], assignment: list[int], labelled: list[dict]) -> list[dict]:
+    """
+    Expands one labelled result per group back to one result per comment.
+    Every comment keeps its own text; sentiment and category come from its group.
+    """
+    return [
+        {
+            "comment":   text,
+            "sentiment": labelled[group]["sentiment"],
+            "category":  labelled[group]["category"],
+        }
+        for text, group in zip(comments, assignment, strict=True)
+    ]
@@ -21,6 +21,7 @@ import sys
 import aiohttp
 
 from config import GEMINI_API_KEY, GEMINI_API_URL
+from dedup import collapse_duplicates, fan_out
 
 logger = logging.getLogger(__name__)
 
@@ -158,24 +159,31 @@ async def _analyze_sentiment_async(comments: list[str], api_key: str) -> list[di
     pairs — not the full comment text — keeping output tokens to ~5,000 for
     500 comments, well within Gemini's 8,192-token output limit.
 
+    Duplicate and near-duplicate comments are sent once; the label is fanned
+    back out so the result still has one entry per input comment.
+
     Any comment whose index is missing from the response defaults to Neutral.
     Raises GeminiQuotaError if quota is exceeded.
     """
     if not comments:
         return []
 
+    representatives, assignment = collapse_duplicates(comments)
+    unique = [comments[i] for i in representatives]
+
     # Pass comments as a JSON array; the model uses 0-based array position as index.
     prompt = (
         f"Classify each YouTube comment's sentiment as Positive, Neutral, Negative, or Mixed.\n"
-        f"There are {len(comments)} comments (0-indexed).\n"
+        f"There are {len(unique)} comments (0-indexed).\n"
         f"Return a JSON array where every object has:\n"
         f"  - 'index': the 0-based position of the comment\n"
         f"  - 'sentiment': one of Positive | Neutral | Negative | Mixed\n"
-        f"Classify ALL {len(comments)} comments. Do not skip any.\n\n"
-        f"Comments:\n{json.dumps(comments, ensure_ascii=False)}"
+        f"Classify ALL {len(unique)} comments. Do not skip any.\n\n"
+        f"Comments:\n{json.dumps(unique, ensure_ascii=False)}"
     )
 
-    logger.info("Sending all %d comments to Gemini in one request…", len(comments))
+    logger.info("Sending %d unique comments (of %d) to Gemini in one request…",
+                len(unique), len(comments))
     result = await _call_gemini(prompt, api_key, _SENTIMENT_SCHEMA)
 
     if not isinstance(result, list):
@@ -189,26 +197,26 @@ async def _analyze_sentiment_async(comments: list[str], api_key: str) -> list[di
         sentiment = item.get("sentiment", "Neutral")
         if sentiment not in _VALID_SENTIMENTS:
             sentiment = "Neutral"
-        if isinstance(idx, int) and 0 <= idx < len(comments):
+        if isinstance(idx, int) and 0 <= idx < len(unique):
             sentiment_map[idx] = sentiment
 
     classified = len(sentiment_map)
-    total      = len(comments)
+    total      = len(unique)
     if classified < total:
         logger.warning("Gemini classified %d/%d comments; %d defaulted to Neutral.",
                        classified, total, total - classified)
     else:
         logger.info("Gemini classified all %d comments.", total)
 
-    # Reconstruct in original order; default missing indices to Neutral
-    return [
+    # One label per unique comment; default missing indices to Neutral
+    labelled = [
         {
-            "comment":  comments[i],
             "sentiment": sentiment_map.get(i, "Neutral"),
             "category":  sentiment_map.get(i, "Neutral"),
         }
         for i in range(total)
     ]
+    return fan_out(comments, assignment, labelled)
 
 
 # ---------------------------------------------------------------------------
@@ -285,10 +293,10 @@ async def _generate_highlights_async(
 
 
 # ---------------------------------------------------------------------------
-# Public sync API  (called from Flask routes via asyncio.run)
+# Public async API  (awaited directly by the ASGI app)
 # ---------------------------------------------------------------------------
 
-def analyze_sentiment_gemini(
+async def analyze_sentiment_gemini_async(
     comments: list[str], api_key: str = GEMINI_API_KEY
 ) -> list[dict]:
     """
@@ -299,10 +307,10 @@ def analyze_sentiment_gemini(
     if not api_key:
         logger.info("No Gemini API key — skipping sentiment analysis.")
         return []
-    return asyncio.run(_analyze_sentiment_async(comments, api_key))
+    return await _analyze_sentiment_async(comments, api_key)
 
 
-def generate_insights_gemini(
+async def generate_insights_gemini_async(
     categorized_comments: list[dict], api_key: str = GEMINI_API_KEY
 ) -> str:
     """
@@ -314,10 +322,10 @@ def generate_insights_gemini(
     if not api_key:
         logger.info("No Gemini API key — skipping insights generation.")
         return "Insights unavailable (Gemini API key not configured)."
-    return asyncio.run(_generate_insights_async(categorized_comments, api_key))
+    return await _generate_insights_async(categorized_comments, api_key)
 
 
-def generate_highlights_gemini(
+async def generate_highlights_gemini_async(
     categorized_comments: list[dict], api_key: str = GEMINI_API_KEY
 ) -> dict:
     """
@@ -328,7 +336,32 @@ def generate_highlights_gemini(
     if not categorized_comments or not api_key:
         return empty
     try:
-        return asyncio.run(_generate_highlights_async(categorized_comments, api_key))
+        return await _generate_highlights_async(categorized_comments, api_key)
     except GeminiQuotaError:
         logger.warning("Gemini quota exhausted during highlights — returning empty.")
         return empty
+
+
+# ---------------------------------------------------------------------------
+# Public sync API  (for callers without a running event loop)
+# ---------------------------------------------------------------------------
+
+def analyze_sentiment_gemini(
+    comments: list[str], api_key: str = GEMINI_API_KEY
+) -> list[dict]:
+    """Blocking wrapper around analyze_sentiment_gemini_async."""
+    return asyncio.run(analyze_sentiment_gemini_async(comments, api_key))
+
+
+def generate_insights_gemini(
+    categorized_comments: list[dict], api_key: str = GEMINI_API_KEY
+) -> str:
+    """Blocking wrapper around generate_insights_gemini_async."""
+    return asyncio.run(generate_insights_gemini_async(categorized_comments, api_key))
+
+
+def generate_highlights_gemini(
+    categorized_comments: list[dict], api_key: str = GEMINI_API_KEY
+) -> dict:
+    """Blocking wrapper around generate_highlights_gemini_async."""
+    return asyncio.run(generate_highlights_gemini_async(categorized_comments, api_key))
@@ -0,0 +1,51 @@
+"""
+gunicorn settings for the production image — threaded workers, app preloaded
+in the master so workers fork with it already imported and initialised.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+WEB_CONCURRENCY and GUNICORN_THREADS override the process/thread counts.
+"""
+
+import glob
+import os
+
+bind = "0.0.0.0:5000"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+preload_app = True
+
+# 120 s allows Gemini batches to complete
+timeout = 120
+accesslog = "-"
+errorlog = "-"
+
+# Per-process Prometheus metric files, summed by /metrics (see metrics.py).
+# Set here, before the app and prometheus_client are imported. The previous
+# run's metric files are removed so its workers aren't counted again — only
+# those: the directory may be one an operator chose, holding other files.
+_metrics_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/vidalyze-metrics")
+os.makedirs(_metrics_dir, exist_ok=True)
+# prometheus_client names them <type>_<pid>.db, gauges gauge_<mode>_<pid>.db;
+# a bare *.db would also match vidalyze.db if DB_DIR is the same directory.
+for _pattern in ("counter_*.db", "histogram_*.db", "summary_*.db", "gauge_*_*.db"):
+    for _path in glob.glob(os.path.join(_metrics_dir, _pattern)):
+        os.remove(_path)
+
+
+def post_fork(server, worker):
+    # The preloaded app carries the master's SQLite pool, HTTP clients and
+    # locks; give this worker its own and start its pruner and warmer here
+    # (app.py starts no threads at import, so the master runs neither).
+    import app
+
+    app.after_fork()
+
+
+def child_exit(server, worker):
+    # Counters and histograms of a dead worker stay in the totals; only its
+    # live-process bookkeeping is dropped.
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
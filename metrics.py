@@ -0,0 +1,106 @@
+"""
+Prometheus metrics for Vidalyze, served at /metrics.
+
+Under gunicorn every worker is a separate process, so counters kept in
+process memory would each show one worker's share. gunicorn.conf.py sets
+PROMETHEUS_MULTIPROC_DIR before the app is imported; prometheus_client then
+keeps each process's values in files there, and render() sums them across
+all workers (including ones that have since exited). Without it — the dev
+server, a single uvicorn process — the in-process registry is served.
+
+The same timed() blocks also feed collect_timings(), the per-request stage
+breakdown /analyze returns when asked for it.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# From a sub-millisecond URL parse up to a Gemini batch near the worker timeout.
+_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+STAGE_SECONDS = Histogram(
+    "vidalyze_stage_seconds",
+    "Time spent in each step of an analysis.",
+    ["stage"],
+    buckets=_BUCKETS,
+)
+CACHE_LOOKUPS = Counter(
+    "vidalyze_cache_lookups_total",
+    "/analyze result cache lookups, by outcome: hit, stale (served while refreshing) or miss.",
+    ["result"],
+)
+ANALYSES = Counter(
+    "vidalyze_analyses_total",
+    "Completed analyses by analysis_method; anything but Gemini names its fallback reason.",
+    ["method"],
+)
+QUOTA_ERRORS = Counter(
+    "vidalyze_quota_errors_total",
+    "Upstream API quota errors.",
+    ["service"],
+)
+
+
+# {stage: (seconds, count)} for the request being timed, None otherwise.
+# Tasks and asyncio.to_thread calls copy the context, so the stages they run
+# land in the same dict.
+_request_stages: ContextVar[dict | None] = ContextVar("request_stages", default=None)
+
+
+@contextmanager
+def timed(stage: str):
+    """Observes the duration of the block in STAGE_SECONDS, even if it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.labels(stage).observe(elapsed)
+        stages = _request_stages.get()
+        if stages is not None:
+            seconds, count = stages.get(stage, (0.0, 0))
+            stages[stage] = (seconds + elapsed, count + 1)
+
+
+@contextmanager
+def collect_timings():
+    """
+    Collects every timed() stage run inside the block into the yielded dict:
+        {"total_ms": 812.4, "stages": {"youtube_title": {"ms": 95.1, "count": 1}, ...}}
+    filled in when the block exits. Stages may overlap (gathered Gemini
+    calls), so their sum can exceed total_ms.
+    """
+    report: dict = {}
+    stages: dict = {}
+    token = _request_stages.set(stages)
+    started = time.perf_counter()
+    try:
+        yield report
+    finally:
+        _request_stages.reset(token)
+        report["total_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        report["stages"] = {
+            stage: {"ms": round(seconds * 1000, 2), "count": count}
+            for stage, (seconds, count) in stages.items()
+        }
+
+
+def render() -> tuple[bytes, str]:
+    """The exposition-format payload and its content type."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
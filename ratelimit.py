@@ -0,0 +1,115 @@
+"""
+SQLite storage backend for Flask-Limiter / limits.
+
+The default memory:// storage keeps counters per process, so every gunicorn
+worker enforced its own copy of each limit. Registering the "sqlite" scheme
+lets all workers on a host share one small database file:
+
+    Limiter(..., storage_uri="sqlite:////home/vidalyze/data/ratelimit.db")
+
+Supports the fixed-window strategy (Flask-Limiter's default). Counters are
+kept apart from the history database so per-request limit writes never
+queue behind history writes.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+from limits.storage import Storage
+
+# Expired counters are swept every this many increments, per process.
+_SWEEP_EVERY = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_limits (
+    key    TEXT PRIMARY KEY,
+    count  INTEGER NOT NULL,
+    expiry REAL    NOT NULL
+) WITHOUT ROWID
+"""
+
+# One statement, so concurrent workers can't lose an increment: a live
+# window is incremented, an expired one restarts at amount.
+_INCR = """
+INSERT INTO rate_limits (key, count, expiry) VALUES (:key, :amount, :expiry)
+ON CONFLICT (key) DO UPDATE SET
+    count  = CASE WHEN expiry <= :now THEN :amount ELSE count + :amount END,
+    expiry = CASE WHEN expiry <= :now THEN :expiry ELSE expiry END
+RETURNING count
+"""
+
+
+def default_uri() -> str:
+    """sqlite:// URI for ratelimit.db in DB_DIR (the history database's directory)."""
+    db_dir = Path(os.getenv("DB_DIR", str(Path(__file__).parent)))
+    return f"sqlite:///{db_dir / 'ratelimit.db'}"
+
+
+class SQLiteStorage(Storage):
+    """Rate limit counters in a WAL-mode SQLite file shared across processes."""
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, **options) -> None:
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.path = urlparse(uri).path
+        self._local = threading.local()
+        self._increments = 0
+
+    @property
+    def base_exceptions(self) -> type[Exception]:
+        return sqlite3.Error
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread, reopened in a forked child (never
+        # shared with the parent process).
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(_SCHEMA)
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def incr(self, key: str, expiry: int, amount: int = 1) -> int:
+        now = time.time()
+        conn = self._conn()
+        (count,) = conn.execute(
+            _INCR, {"key": key, "amount": amount, "expiry": now + expiry, "now": now}
+        ).fetchone()
+        self._increments += 1
+        if self._increments % _SWEEP_EVERY == 0:
+            conn.execute("DELETE FROM rate_limits WHERE expiry <= ?", (now,))
+        return count
+
+    def get(self, key: str) -> int:
+        row = self._conn().execute(
+            "SELECT count FROM rate_limits WHERE key = ? AND expiry > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key: str) -> float:
+        now = time.time()
+        row = self._conn().execute(
+            "SELECT expiry FROM rate_limits WHERE key = ? AND expiry > ?", (key, now)
+        ).fetchone()
+        return row[0] if row else now
+
+    def check(self) -> bool:
+        try:
+            self._conn().execute("SELECT 1").fetchone()
+        except sqlite3.Error:
+            return False
+        return True
+
+    def reset(self) -> int | None:
+        return self._conn().execute("DELETE FROM rate_limits").rowcount
+
+    def clear(self, key: str) -> None:
+        self._conn().execute("DELETE FROM rate_limits WHERE key = ?", (key,))
@@ -0,0 +1,85 @@
+"""
+Stratified sampling for very large comment sets.
+
+For videos with hundreds of thousands of comments, classifying everything
+is too slow for interactive use. Instead a fixed-size sample is drawn across
+the fetched comments and only the sample is classified; the reported
+sentiment shares then carry confidence intervals.
+
+Strata are the YouTube API pages the comments arrived in. Pages are
+returned newest-first, so each stratum is a contiguous slice of time and
+proportional allocation keeps old and new comments represented.
+"""
+
+import math
+import random
+
+from config import SAMPLE_PAGE_SIZE
+
+_Z_95 = 1.959964
+
+
+def stratified_sample(
+    total: int,
+    sample_size: int,
+    stratum_size: int = SAMPLE_PAGE_SIZE,
+    seed: int | None = None,
+) -> list[int]:
+    """
+    Returns sorted indices of a proportionally allocated stratified sample.
+
+    total items are split into consecutive strata of stratum_size. Each
+    stratum receives its proportional share of sample_size, with leftover
+    slots handed out by largest remainder. Returns every index when
+    sample_size >= total.
+    """
+    if sample_size >= total:
+        return list(range(total))
+
+    rng = random.Random(seed)
+    strata = [(start, min(start + stratum_size, total)) for start in range(0, total, stratum_size)]
+
+    quotas = [(end - start) * sample_size / total for start, end in strata]
+    alloc = [int(q) for q in quotas]
+    by_remainder = sorted(range(len(strata)), key=lambda i: quotas[i] - alloc[i], reverse=True)
+    for i in by_remainder[: sample_size - sum(alloc)]:
+        alloc[i] += 1
+
+    indices: list[int] = []
+    for (start, end), k in zip(strata, alloc, strict=True):
+        indices.extend(rng.sample(range(start, end), k))
+    return sorted(indices)
+
+
+def wilson_interval(
+    successes: int, n: int, population: int | None = None, z: float = _Z_95
+) -> tuple[float, float]:
+    """
+    Wilson score interval for a proportion, as (low, high) fractions.
+
+    When population is given, the finite population correction shrinks the
+    interval — sampling most of a video's comments leaves little uncertainty.
+    """
+    if n <= 0:
+        return 0.0, 1.0
+    p = successes / n
+    fpc = math.sqrt((population - n) / (population - 1)) if population and population > 1 else 1.0
+    z_eff = z * fpc
+    denom = 1 + z_eff ** 2 / n
+    centre = (p + z_eff ** 2 / (2 * n)) / denom
+    half = z_eff * math.sqrt(p * (1 - p) / n + z_eff ** 2 / (4 * n ** 2)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+def sentiment_confidence_intervals(
+    sentiment_counts: dict, sample_size: int, population: int
+) -> dict:
+    """
+    Returns {sentiment: [low_pct, high_pct]} 95% intervals for each share.
+    Percentages are rounded to 2 decimals to match overall_sentiment.
+    """
+    intervals = {}
+    for label, count in sentiment_counts.items():
+        low, high = wilson_interval(count, sample_size, population)
+        intervals[label] = [round(low * 100, 2), round(high * 100, 2)]
+    return intervals
@@ -2,9 +2,18 @@ import logging
 import re
 from collections import Counter
 
+import numpy as np
 from textblob import TextBlob
 
-from config import TEXTBLOB_NEGATIVE_THRESHOLD, TEXTBLOB_POSITIVE_THRESHOLD
+from config import (
+    TEXTBLOB_NEGATIVE_THRESHOLD,
+    TEXTBLOB_POSITIVE_THRESHOLD,
+    TIMELINE_RESOLUTION,
+    WORD_SKETCH_EPSILON,
+    WORD_SKETCH_EXACT_MAX_COMMENTS,
+)
+from dedup import collapse_duplicates, fan_out
+from sketch import SpaceSaving
 
 logger = logging.getLogger(__name__)
 
@@ -60,16 +69,21 @@ def analyze_sentiment_fallback(comments: list[str]) -> list[dict]:
     """
     Runs TextBlob + rule-based analysis on a list of comment strings.
     Returns list of {comment, sentiment, category} dicts.
+
+    Duplicate and near-duplicate comments are classified once and the label
+    is fanned back out, so the result still has one entry per comment.
     """
-    logger.info("Running TextBlob fallback analysis on %d comments...", len(comments))
-    results = []
-    for text in comments:
-        results.append({
-            "comment": text,
+    representatives, assignment = collapse_duplicates(comments)
+    logger.info("Running TextBlob fallback analysis on %d comments (%d unique)...",
+                len(comments), len(representatives))
+    labelled = []
+    for i in representatives:
+        text = comments[i]
+        labelled.append({
             "sentiment": get_sentiment_textblob(text),
             "category": categorize_comment(text),
         })
-    return results
+    return fan_out(comments, assignment, labelled)
 
 
 def generate_insights_fallback(categorized_comments: list[dict]) -> str:
@@ -132,37 +146,318 @@ _STOPWORDS = frozenset({
 })
 
 
-def compute_word_frequencies(categorized_comments: list[dict], top_n: int = 60) -> dict:
+def _tokenize(text: str) -> list[str]:
+    """Lower-cases text and returns the meaningful word tokens used for word clouds."""
+    tokens = re.findall(r"[a-z]+", text.lower())
+    return [t for t in tokens if len(t) > 3 and t not in _STOPWORDS]
+
+
+# ---------------------------------------------------------------------------
+# Time bucketing
+# ---------------------------------------------------------------------------
+
+TIMELINE_LABELS = ("Positive", "Neutral", "Negative", "Mixed")
+_LABEL_CODES = {label: code for code, label in enumerate(TIMELINE_LABELS)}
+_NEUTRAL_CODE = _LABEL_CODES["Neutral"]
+
+_RESOLUTION_SECONDS = {"hour": 3600, "day": 86400, "week": 7 * 86400}  # finest first
+_WEEK_ORIGIN = 4 * 86400   # 1970-01-05, the first Monday after the epoch
+_MAX_AUTO_BUCKETS = 72     # "auto" picks the finest resolution within this many buckets
+
+
+def _publish_times(timed: list[dict]) -> np.ndarray:
+    """UTC epoch seconds of comments that have a published_at timestamp."""
+    # YouTube timestamps are UTC ("...Z"); datetime64 wants them naive.
+    return np.array(
+        [c["published_at"].rstrip("Z") for c in timed], dtype="datetime64[s]"
+    ).astype(np.int64)
+
+
+def choose_timeline_resolution(
+    categorized_comments: list[dict], resolution: str = TIMELINE_RESOLUTION
+) -> str:
     """
-    Returns the top_n most frequent meaningful words across all comments.
-    Tokenises with a simple regex, filters short words and common stopwords.
-    No external dependencies required.
+    Returns resolution, or for "auto" the finest of hour/day/week that covers
+    the comments' publish-time span in at most _MAX_AUTO_BUCKETS buckets:
+    a day-old video charts by hour, a years-old one by week.
     """
-    words: list[str] = []
-    for item in categorized_comments:
-        tokens = re.findall(r"[a-z]+", item.get("comment", "").lower())
-        words.extend(t for t in tokens if len(t) > 3 and t not in _STOPWORDS)
-    return dict(Counter(words).most_common(top_n))
+    if resolution != "auto":
+        return resolution
+    timed = [c for c in categorized_comments if c.get("published_at")]
+    if not timed:
+        return "hour"
+    stamps = _publish_times(timed)
+    span = int(stamps.max() - stamps.min())
+    for name, width in _RESOLUTION_SECONDS.items():
+        if span < width * _MAX_AUTO_BUCKETS:
+            return name
+    return "week"
+
+
+def bucket_sentiment_counts(
+    categorized_comments: list[dict], resolution: str = TIMELINE_RESOLUTION
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Buckets comments by their published_at timestamp ("auto" resolves via
+    choose_timeline_resolution).
+
+    Returns (bucket_starts, counts): bucket_starts is a sorted int64 array of
+    UTC epoch seconds, counts[i] holds the Positive/Neutral/Negative/Mixed
+    tallies of bucket i (TIMELINE_LABELS order). Comments without a
+    timestamp are skipped. All bucketing runs in NumPy — no per-bucket loop.
+    """
+    resolution = choose_timeline_resolution(categorized_comments, resolution)
+    if resolution not in _RESOLUTION_SECONDS:
+        raise ValueError(f"Unknown timeline resolution: {resolution!r}")
+
+    timed = [c for c in categorized_comments if c.get("published_at")]
+    if not timed:
+        return np.empty(0, dtype=np.int64), np.empty((0, len(TIMELINE_LABELS)), dtype=np.int64)
+
+    stamps = _publish_times(timed)
+    codes = np.array(
+        [_LABEL_CODES.get(c.get("sentiment"), _NEUTRAL_CODE) for c in timed], dtype=np.int64
+    )
+
+    width = _RESOLUTION_SECONDS[resolution]
+    origin = _WEEK_ORIGIN if resolution == "week" else 0
+    floored = (stamps - origin) // width * width + origin
+
+    starts, bucket_idx = np.unique(floored, return_inverse=True)
+    n_labels = len(TIMELINE_LABELS)
+    counts = np.bincount(
+        bucket_idx * n_labels + codes, minlength=len(starts) * n_labels
+    ).reshape(len(starts), n_labels)
+    return starts, counts
+
+
+def _timeline_rows(starts: np.ndarray, counts: np.ndarray) -> list[dict]:
+    """Turns bucket counts into the per-bucket percentage rows sent to the chart."""
+    totals = counts.sum(axis=1)
+    keep = totals > 0
+    starts, counts, totals = starts[keep], counts[keep], totals[keep]
+    pcts = np.round(counts / totals[:, None] * 100, 1).tolist()
+    stamps = np.datetime_as_string(starts.astype("datetime64[s]"), unit="s").tolist()
+
+    return [
+        {
+            "chunk":  i + 1,
+            "bucket": stamp + "Z",
+            "count":  int(total),
+            **dict(zip(TIMELINE_LABELS, row, strict=True)),
+        }
+        for i, (stamp, total, row) in enumerate(zip(stamps, totals.tolist(), pcts, strict=True))
+    ]
 
 
-def compute_sentiment_timeline(
-    categorized_comments: list[dict], chunk_size: int = 20
-) -> list[dict]:
+# ---------------------------------------------------------------------------
+# Mergeable aggregate state
+# ---------------------------------------------------------------------------
+#
+# A plain, JSON-serialisable dict holding raw counts rather than percentages,
+# so two states can be combined without re-scanning their comments:
+#
+#   {
+#     "version":    1,
+#     "total":      int,
+#     "sentiment":  {label: count},
+#     "category":   {label: count},
+#     "words":      {word: count},
+#     "word_sketch": None | SpaceSaving.to_dict(),
+#     "chunk_size": int,
+#     "timeline":   [{label: count}, ...],   # chronological, oldest first
+#     "resolution": None | "hour" | "day" | "week",
+#     "buckets":    {epoch_seconds: [pos, neu, neg, mixed]},
+#   }
+#
+# With a resolution the timeline is bucketed by real publish time and the
+# chunk list stays empty; buckets merge exactly by summing per key. Without
+# one, comments are cut into fixed chunks in arrival order.
+#
+# Word counts are exact until the state covers more than
+# WORD_SKETCH_EXACT_MAX_COMMENTS comments; from then on they live in a
+# Space-Saving sketch ("words" stays empty), so channel-wide merges stay
+# bounded by 1/WORD_SKETCH_EPSILON counters instead of the vocabulary.
+#
+# compute_stats / compute_word_frequencies / compute_sentiment_timeline are
+# thin views over this state, so incremental and one-shot analyses agree.
+
+AGGREGATE_STATE_VERSION = 1
+
+
+def empty_aggregate_state(chunk_size: int = 20, resolution: str | None = None) -> dict:
+    """Returns an aggregate state that represents zero comments."""
+    return {
+        "version":    AGGREGATE_STATE_VERSION,
+        "total":      0,
+        "sentiment":  {},
+        "category":   {},
+        "words":      {},
+        "word_sketch": None,
+        "chunk_size": chunk_size,
+        "timeline":   [],
+        "resolution": resolution,
+        "buckets":    {},
+    }
+
+
+def update_aggregate_state(state: dict, categorized_comments: list[dict]) -> dict:
+    """
+    Folds newly classified comments into state in place and returns it.
+
+    categorized_comments is newest-first (YouTube order). In chunk mode they
+    must be newer than everything already in state; time-bucketed states
+    accept comments in any order. Cost is O(len(categorized_comments)).
     """
-    Batches comments into chunks of chunk_size (oldest → newest) and returns
-    the sentiment percentage breakdown per chunk.
+    sentiment = state["sentiment"]
+    category  = state["category"]
+    words     = state["words"]
+    timeline  = state["timeline"]
+    chunk_size = state["chunk_size"]
+    resolution = state.get("resolution")
+    sketch = None
+    if state.get("word_sketch") or (
+        state["total"] + len(categorized_comments) > WORD_SKETCH_EXACT_MAX_COMMENTS
+    ):
+        sketch = _word_sketch(state)
+
+    for item in reversed(categorized_comments):
+        label = item.get("sentiment", "Neutral")
+        sentiment[label] = sentiment.get(label, 0) + 1
+        cat = item.get("category", "Neutral/Other")
+        category[cat] = category.get(cat, 0) + 1
+        tokens = _tokenize(item.get("comment", ""))
+        if sketch is not None:
+            sketch.update(tokens)
+        else:
+            for word in tokens:
+                words[word] = words.get(word, 0) + 1
+
+        if resolution:
+            continue
+        if not timeline or sum(timeline[-1].values()) >= chunk_size:
+            timeline.append({})
+        chunk = timeline[-1]
+        chunk[label] = chunk.get(label, 0) + 1
+
+    if resolution:
+        buckets = state.setdefault("buckets", {})
+        starts, counts = bucket_sentiment_counts(categorized_comments, resolution)
+        for start, row in zip(starts.tolist(), counts.tolist(), strict=True):
+            key = str(start)
+            buckets[key] = [x + y for x, y in zip(buckets.get(key, [0] * len(row)), row, strict=True)]
+
+    if sketch is not None:
+        state["words"], state["word_sketch"] = {}, sketch.to_dict()
+    state["total"] += len(categorized_comments)
+    return state
+
+
+def _word_sketch(state: dict) -> SpaceSaving:
+    """state's word counts as a Space-Saving sketch, folding in exact counts if it has those."""
+    if state.get("word_sketch"):
+        return SpaceSaving.from_dict(state["word_sketch"])
+    sketch = SpaceSaving.for_error(WORD_SKETCH_EPSILON)
+    for word, count in state["words"].items():
+        sketch.add(word, count)
+    return sketch
+
+
+def build_aggregate_state(
+    categorized_comments: list[dict], chunk_size: int = 20, resolution: str | None = None
+) -> dict:
+    """
+    Builds a fresh aggregate state from a newest-first list of classified comments.
+    An "auto" resolution is fixed here, from these comments, so later updates
+    and merges bucket the same way.
+    """
+    if resolution:
+        resolution = choose_timeline_resolution(categorized_comments, resolution)
+    return update_aggregate_state(
+        empty_aggregate_state(chunk_size, resolution), categorized_comments
+    )
+
 
-    YouTube returns comments newest-first, so the list is reversed before
-    chunking to produce a chronological timeline.
+def merge_aggregate_states(a: dict, b: dict) -> dict:
     """
-    ordered = list(reversed(categorized_comments))
+    Combines two aggregate states into a new one; neither input is modified.
+
+    Counts and time buckets are summed exactly, except word counts once
+    either side (or the sum) is past the exact threshold: those are merged
+    as Space-Saving sketches. Chunk timelines are
+    concatenated with b treated as the newer shard; a partial trailing chunk
+    of a is combined with b's first chunk only when the two together still
+    fit in one chunk.
+    """
+    if a.get("version") != b.get("version"):
+        raise ValueError("Cannot merge aggregate states of different versions.")
+    if a.get("resolution") != b.get("resolution"):
+        raise ValueError("Cannot merge aggregate states with different timeline resolutions.")
+
+    merged = empty_aggregate_state(a["chunk_size"], a.get("resolution"))
+    merged["total"] = a["total"] + b["total"]
+    for key in ("sentiment", "category", "words"):
+        counts = dict(a[key])
+        for label, count in b[key].items():
+            counts[label] = counts.get(label, 0) + count
+        merged[key] = counts
+    if a.get("word_sketch") or b.get("word_sketch") or merged["total"] > WORD_SKETCH_EXACT_MAX_COMMENTS:
+        merged["words"] = {}
+        merged["word_sketch"] = _word_sketch(a).merge(_word_sketch(b)).to_dict()
+
+    buckets = {key: list(row) for key, row in a.get("buckets", {}).items()}
+    for key, row in b.get("buckets", {}).items():
+        buckets[key] = [x + y for x, y in zip(buckets.get(key, [0] * len(row)), row, strict=True)]
+    merged["buckets"] = buckets
+
+    timeline = [dict(chunk) for chunk in a["timeline"]]
+    tail = [dict(chunk) for chunk in b["timeline"]]
+    if timeline and tail and (
+        sum(timeline[-1].values()) + sum(tail[0].values()) <= merged["chunk_size"]
+    ):
+        for label, count in tail.pop(0).items():
+            timeline[-1][label] = timeline[-1].get(label, 0) + count
+    merged["timeline"] = timeline + tail
+    return merged
+
+
+def stats_from_state(state: dict) -> tuple[dict, dict]:
+    """Returns (overall_sentiment, comment_categories) exactly as compute_stats does."""
+    total = state["total"]
+    if not total:
+        return {}, {}
+    sentiment_counts = Counter(state["sentiment"])
+    category_counts = Counter(state["category"])
+    overall_sentiment = {
+        sentiment: round(count / total * 100, 2)
+        for sentiment, count in sentiment_counts.most_common()
+    }
+    return overall_sentiment, dict(category_counts.most_common())
+
+
+def word_frequencies_from_state(state: dict, top_n: int = 60) -> dict:
+    """Returns the top_n words held in state (estimated counts once it holds a sketch)."""
+    if state.get("word_sketch"):
+        return dict(SpaceSaving.from_dict(state["word_sketch"]).top(top_n))
+    return dict(Counter(state["words"]).most_common(top_n))
+
+
+def timeline_from_state(state: dict) -> list[dict]:
+    """Returns the per-bucket (or per-chunk) sentiment percentage breakdown held in state."""
+    if state.get("resolution"):
+        buckets = state.get("buckets", {})
+        if not buckets:
+            return []
+        keys = sorted(buckets, key=int)
+        starts = np.array([int(k) for k in keys], dtype=np.int64)
+        counts = np.array([buckets[k] for k in keys], dtype=np.int64)
+        return _timeline_rows(starts, counts)
+
     chunks: list[dict] = []
-    for i in range(0, len(ordered), chunk_size):
-        batch = ordered[i : i + chunk_size]
-        if not batch:
+    for counts in state["timeline"]:
+        total = sum(counts.values())
+        if not total:
             continue
-        counts = Counter(item.get("sentiment", "Neutral") for item in batch)
-        total  = len(batch)
         chunks.append({
             "chunk":    len(chunks) + 1,
             "Positive": round(counts.get("Positive", 0) / total * 100, 1),
@@ -173,6 +468,50 @@ def compute_sentiment_timeline(
     return chunks
 
 
+def compute_word_frequencies(
+    categorized_comments: list[dict],
+    top_n: int = 60,
+    epsilon: float = WORD_SKETCH_EPSILON,
+    exact_max_comments: int = WORD_SKETCH_EXACT_MAX_COMMENTS,
+) -> dict:
+    """
+    Returns the top_n most frequent meaningful words across all comments.
+    Tokenises with a simple regex, filters short words and common stopwords.
+    No external dependencies required.
+
+    Up to exact_max_comments comments are counted exactly. Larger inputs are
+    streamed through a Space-Saving sketch so memory stays bounded by
+    1/epsilon counters; each reported count may then overestimate the true
+    count by at most epsilon × total tokens.
+    """
+    if len(categorized_comments) <= exact_max_comments:
+        words: Counter = Counter()
+        for item in categorized_comments:
+            words.update(_tokenize(item.get("comment", "")))
+        return dict(words.most_common(top_n))
+
+    sketch = SpaceSaving.for_error(epsilon, min_capacity=top_n)
+    for item in categorized_comments:
+        sketch.update(_tokenize(item.get("comment", "")))
+    return dict(sketch.top(top_n))
+
+
+def compute_sentiment_timeline(
+    categorized_comments: list[dict], chunk_size: int = 20, resolution: str | None = None
+) -> list[dict]:
+    """
+    Returns the sentiment percentage breakdown over time, oldest → newest.
+
+    With a resolution ("hour", "day", "week" or "auto") comments are bucketed by
+    their published_at timestamp and each row carries its bucket start.
+    Without one, comments are batched into chunks of chunk_size; YouTube
+    returns comments newest-first, so the list is reversed before chunking.
+    """
+    if resolution:
+        return _timeline_rows(*bucket_sentiment_counts(categorized_comments, resolution))
+    return timeline_from_state(build_aggregate_state(categorized_comments, chunk_size))
+
+
 def compute_stats(categorized_comments: list[dict]) -> tuple[dict, dict]:
     """
     Computes sentiment distribution (percentages) and category counts.
@@ -185,12 +524,10 @@ def compute_stats(categorized_comments: list[dict]) -> tuple[dict, dict]:
     if not categorized_comments:
         return {}, {}
 
-    total = len(categorized_comments)
     sentiment_counts = Counter(c["sentiment"] for c in categorized_comments)
     category_counts = Counter(c["category"] for c in categorized_comments)
-
-    overall_sentiment = {
-        sentiment: round(count / total * 100, 2)
-        for sentiment, count in sentiment_counts.most_common()
-    }
-    return overall_sentiment, dict(category_counts.most_common())
+    return stats_from_state({
+        "total":     len(categorized_comments),
+        "sentiment": sentiment_counts,
+        "category":  category_counts,
+    })
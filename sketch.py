@@ -0,0 +1,211 @@
+"""
+Bounded-memory frequency sketches for Vidalyze.
+
+SpaceSaving tracks the heaviest hitters of an unbounded token stream in a
+fixed number of counters (Metwally, Agrawal & El Abbadi, 2005). With
+capacity m over a stream of N items, every reported count overestimates
+the true count by at most N / m, and any item whose true count exceeds
+N / m is guaranteed to be tracked.
+
+FrequencySketch estimates how often each key was seen recently in a fixed
+table of small counters — the popularity filter behind the TinyLFU result
+cache admission policy in cache.py.
+"""
+
+import heapq
+import math
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitter summary.
+
+    Counters live in a dict; a lazily-invalidated min-heap finds the
+    eviction victim in O(log m) instead of scanning all counters.
+    """
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1.")
+        self.capacity = capacity
+        self.total = 0
+        self._counts: dict[str, int] = {}
+        self._errors: dict[str, int] = {}
+        self._heap: list[tuple[int, str]] = []
+
+    @classmethod
+    def for_error(cls, epsilon: float, min_capacity: int = 1) -> "SpaceSaving":
+        """Returns a sketch whose overestimate is bounded by epsilon × stream length."""
+        if not 0 < epsilon < 1:
+            raise ValueError("epsilon must be between 0 and 1.")
+        return cls(max(math.ceil(1 / epsilon), min_capacity))
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    @property
+    def error_bound(self) -> int:
+        """Maximum amount by which any reported count can exceed the true count."""
+        if len(self._counts) < self.capacity:
+            return 0  # nothing has been evicted yet — counts are exact
+        # The smallest counter bounds every inherited error and is itself ≤ N / m.
+        return min(self._counts.values())
+
+    def add(self, item: str, count: int = 1) -> None:
+        """Records count occurrences of item."""
+        self.total += count
+        counts = self._counts
+
+        if item in counts:
+            counts[item] += count
+            self._push(counts[item], item)
+            return
+
+        if len(counts) < self.capacity:
+            counts[item] = count
+            self._errors[item] = 0
+            self._push(count, item)
+            return
+
+        # Replace the smallest counter; the newcomer inherits its count as error.
+        floor, victim = self._pop_min()
+        del counts[victim]
+        del self._errors[victim]
+        counts[item] = floor + count
+        self._errors[item] = floor
+        self._push(counts[item], item)
+
+    def update(self, items) -> None:
+        """Records one occurrence of every item in an iterable."""
+        for item in items:
+            self.add(item)
+
+    def top(self, n: int) -> list[tuple[str, int]]:
+        """Returns the n highest (item, estimated_count) pairs, largest first."""
+        return heapq.nlargest(n, self._counts.items(), key=lambda kv: kv[1])
+
+    def guaranteed(self, item: str) -> int:
+        """Returns a lower bound on the true count of item."""
+        return self._counts.get(item, 0) - self._errors.get(item, 0)
+
+    def merge(self, other: "SpaceSaving") -> "SpaceSaving":
+        """
+        Returns a new sketch summarising both streams.
+
+        An item missing from a full sketch may still have occurred up to that
+        sketch's minimum count, so the minimum is added to both its estimate
+        and its error (Agarwal et al., "Mergeable Summaries", 2012).
+        """
+        merged = SpaceSaving(max(self.capacity, other.capacity))
+        floor_a = min(self._counts.values()) if len(self) >= self.capacity else 0
+        floor_b = min(other._counts.values()) if len(other) >= other.capacity else 0
+
+        candidates: dict[str, tuple[int, int]] = {}
+        for item in self._counts.keys() | other._counts.keys():
+            count = self._counts.get(item, floor_a) + other._counts.get(item, floor_b)
+            error = self._errors.get(item, floor_a) + other._errors.get(item, floor_b)
+            candidates[item] = (count, error)
+
+        kept = heapq.nlargest(merged.capacity, candidates.items(), key=lambda kv: kv[1][0])
+        merged.total = self.total + other.total
+        merged._counts = {item: count for item, (count, _) in kept}
+        merged._errors = {item: error for item, (_, error) in kept}
+        merged._rebuild_heap()
+        return merged
+
+    def to_dict(self) -> dict:
+        """Returns a JSON-serialisable representation of the sketch."""
+        return {
+            "capacity": self.capacity,
+            "total":    self.total,
+            "counts":   dict(self._counts),
+            "errors":   dict(self._errors),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SpaceSaving":
+        """Rebuilds a sketch from to_dict() output."""
+        sketch = cls(data["capacity"])
+        sketch.total = data["total"]
+        sketch._counts = dict(data["counts"])
+        sketch._errors = dict(data["errors"])
+        sketch._rebuild_heap()
+        return sketch
+
+    # -- heap maintenance ---------------------------------------------------
+
+    def _push(self, count: int, item: str) -> None:
+        heapq.heappush(self._heap, (count, item))
+        # Every increment leaves a stale entry behind; compact periodically
+        # so the heap stays O(capacity) rather than O(stream length).
+        if len(self._heap) > 4 * self.capacity:
+            self._rebuild_heap()
+
+    def _pop_min(self) -> tuple[int, str]:
+        while True:
+            count, item = heapq.heappop(self._heap)
+            if self._counts.get(item) == count:
+                return count, item
+
+    def _rebuild_heap(self) -> None:
+        self._heap = [(count, item) for item, count in self._counts.items()]
+        heapq.heapify(self._heap)
+
+
+# Halves every counter in one bytes.translate() pass.
+_HALVE = bytes(i >> 1 for i in range(256))
+# Odd 64-bit multipliers, one per row; the product's top bits pick the column.
+_ROW_SEEDS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93)
+_MASK64 = (1 << 64) - 1
+
+
+class FrequencySketch:
+    """
+    Count-Min sketch of recent access frequencies (TinyLFU: Einziger,
+    Friedman & Manes, 2017).
+
+    Counters are bytes saturating at 15 and updated conservatively (only
+    the smallest of an item's counters grow), so estimates overshoot
+    rarely. After sample_size increments every counter is halved: the
+    sketch forgets old popularity instead of growing with the stream.
+    Hashes use hash(), so estimates are only meaningful within one process.
+    """
+
+    DEPTH = 4
+    MAX_COUNT = 15
+
+    def __init__(self, width: int, sample_size: int | None = None):
+        if width < 1:
+            raise ValueError("width must be at least 1.")
+        self._bits = (width - 1).bit_length()
+        self.width = 1 << self._bits                  # a power of two
+        self.sample_size = sample_size or 10 * self.width
+        self.additions = 0
+        self._table = bytearray(self.DEPTH * self.width)
+
+    def _slots(self, item) -> list[int]:
+        h, shift = hash(item) & _MASK64, 64 - self._bits
+        return [
+            row * self.width + (((h * seed) & _MASK64) >> shift)
+            for row, seed in enumerate(_ROW_SEEDS)
+        ]
+
+    def increment(self, item) -> None:
+        """Records one access to item."""
+        table = self._table
+        slots = self._slots(item)
+        floor = min(table[slot] for slot in slots)
+        if floor >= self.MAX_COUNT:
+            return
+        for slot in slots:
+            if table[slot] == floor:
+                table[slot] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self._table = bytearray(table.translate(_HALVE))
+            self.additions //= 2
+
+    def estimate(self, item) -> int:
+        """Returns the (over)estimated recent access count of item."""
+        table = self._table
+        return min(table[slot] for slot in self._slots(item))
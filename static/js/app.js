@@ -0,0 +1,865 @@
+let sentimentChartInst = null;
+let timelineChartInst  = null;
+
+// ── Page loader ───────────────────────────────────────────────────
+// Dismisses on window.load; 5 s safety timeout guards against a stalled asset load.
+(function () {
+    const loader = document.getElementById('pageLoader');
+    if (!loader) return;
+    function dismiss() {
+        loader.classList.add('fade-out');
+        loader.addEventListener('transitionend', () => loader.remove(), { once: true });
+    }
+    const guard = setTimeout(dismiss, 5000);
+    window.addEventListener('load', function () {
+        clearTimeout(guard);
+        dismiss();
+    }, { once: true });
+})();
+
+// ── Analysis step progress ────────────────────────────────────────
+let _stepTimers = [];
+let _slowTimer  = null;
+
+function setStepState(id, state) {
+    const item = document.getElementById(id);
+    if (!item) return;
+    const dot   = item.querySelector('.step-dot');
+    const label = item.querySelector('.step-label');
+    dot.className = `step-dot ${state}`;
+    label.style.color      = state === 'done'  ? '#22c55e'
+                           : state === 'active' ? 'var(--text)'
+                           : 'var(--muted)';
+    label.style.fontWeight = state === 'active' ? '600' : '400';
+}
+
+function startProgressSteps() {
+    _stepTimers.forEach(clearTimeout);
+    if (_slowTimer) clearTimeout(_slowTimer);
+    _stepTimers = [];
+    hide(document.getElementById('slowNotice'));
+    setStepState('step1', 'active');
+    setStepState('step2', 'pending');
+    setStepState('step3', 'pending');
+    _stepTimers.push(setTimeout(() => setStepState('step2', 'active'), 2500));
+    _stepTimers.push(setTimeout(() => setStepState('step3', 'active'), 6500));
+    _slowTimer = setTimeout(() => show(document.getElementById('slowNotice')), 9000);
+}
+
+function completeProgressSteps() {
+    _stepTimers.forEach(clearTimeout);
+    if (_slowTimer) clearTimeout(_slowTimer);
+    setStepState('step1', 'done');
+    setStepState('step2', 'done');
+    setStepState('step3', 'done');
+}
+
+// ── Session identity ──────────────────────────────────────────────
+// A UUID persisted in localStorage ties this browser to its own
+// history. Never sent to a third party — only used as an
+// X-Session-Id header on requests to this server.
+function _fallbackUUID() {
+    return 'xxxxxxxx-xxxx-4xxx-yxxx-xxxxxxxxxxxx'.replace(/[xy]/g, c => {
+        const r = Math.random() * 16 | 0;
+        return (c === 'x' ? r : (r & 0x3 | 0x8)).toString(16);
+    });
+}
+function getOrCreateSessionId() {
+    const KEY = 'vidalyze-sid';
+    try {
+        let sid = localStorage.getItem(KEY);
+        if (!sid) {
+            sid = (typeof crypto !== 'undefined' && crypto.randomUUID)
+                ? crypto.randomUUID()
+                : _fallbackUUID();
+            localStorage.setItem(KEY, sid);
+        }
+        return sid;
+    } catch { return ''; }
+}
+const SESSION_ID = getOrCreateSessionId();
+
+// ── Theme ─────────────────────────────────────────────────────────
+const html       = document.documentElement;
+const darkToggle = document.getElementById('darkToggle');
+const iconMoon   = document.getElementById('iconMoon');
+const iconSun    = document.getElementById('iconSun');
+let   isDark     = localStorage.getItem('vidalyze-theme') === 'dark';
+
+function applyTheme(dark) {
+    isDark = dark;
+    html.classList.toggle('dark', dark);
+    iconMoon.style.display = dark ? 'none'  : '';
+    iconSun.style.display  = dark ? ''      : 'none';
+    darkToggle.title = dark ? 'Switch to light mode' : 'Switch to dark mode';
+    localStorage.setItem('vidalyze-theme', dark ? 'dark' : 'light');
+    refreshChartTheme();
+}
+
+darkToggle.addEventListener('click', () => applyTheme(!isDark));
+
+if (!localStorage.getItem('vidalyze-theme')) {
+    applyTheme(window.matchMedia('(prefers-color-scheme: dark)').matches);
+} else {
+    applyTheme(isDark);
+}
+
+// ── DOM refs ──────────────────────────────────────────────────────
+const analysisForm       = document.getElementById('analysisForm');
+const youtubeUrlInput    = document.getElementById('youtube_url');
+const analyzeButton      = document.getElementById('analyzeButton');
+const buttonText         = document.getElementById('buttonText');
+const loadingSpinner     = document.getElementById('loadingSpinner');
+const videoInfo          = document.getElementById('videoInfo');
+const videoTitleEl       = document.getElementById('videoTitle');
+const totalCommentsEl    = document.getElementById('totalComments');
+const analysisMethodEl   = document.getElementById('analysisMethod');
+const videoLink          = document.getElementById('videoLink');
+const errorMessageDiv    = document.getElementById('errorMessage');
+const errorTextEl        = document.getElementById('errorText');
+const emptyState         = document.getElementById('emptyState');
+const loadingState       = document.getElementById('loadingState');
+const resultsSection     = document.getElementById('resultsSection');
+const overallInsightsDiv = document.getElementById('overallInsights');
+const sentimentFilter    = document.getElementById('sentimentFilter');
+const categoryFilter     = document.getElementById('categoryFilter');
+const commentsListDiv    = document.getElementById('commentsList');
+const commentCountEl     = document.getElementById('commentCount');
+const moreCommentsBtn    = document.getElementById('moreCommentsBtn');
+const exportBtn          = document.getElementById('exportBtn');
+const historyPanel       = document.getElementById('historyPanel');
+const historyList        = document.getElementById('historyList');
+const highlightsSection  = document.getElementById('highlightsSection');
+const insightsList       = document.getElementById('insightsList');
+const complaintsList     = document.getElementById('complaintsList');
+const requestsList       = document.getElementById('requestsList');
+const analysisSubtitle   = document.getElementById('analysisSubtitle');
+
+let allCommentsData = [];   // first page of comments from /analyze
+// Where further pages come from: /analysis/<videoId>/comments
+let commentsSource  = { videoId: '', sample: false, total: 0, next: null };
+let commentsCursor  = null;
+let commentsSeq     = 0;    // drops responses for superseded filter changes
+
+// ── Lookup tables ─────────────────────────────────────────────────
+const SENT_CLASS = { Positive:'positive', Negative:'negative', Neutral:'neutral', Mixed:'mixed' };
+const SENT_BADGE = { positive:'bp', negative:'bn', neutral:'bne', mixed:'bm' };
+const CAT_CLASS  = { Suggestion:'suggestion', Help:'help', Positive:'positive',
+                     Negative:'negative', 'Neutral/Other':'neutral-other', Neutral:'neutral', Mixed:'mixed' };
+const CAT_BADGE  = { suggestion:'bs', help:'bh', positive:'bp', negative:'bn',
+                     neutral:'bne', 'neutral-other':'bne', mixed:'bm' };
+const SENT_ICON  = { Positive:'✓', Negative:'✗', Neutral:'●', Mixed:'±' };
+const CHART_COLORS = { Positive:'#22c55e', Negative:'#ef4444', Neutral:'#64748b',
+                        Mixed:'#f59e0b', Suggestion:'#3b82f6', Help:'#a855f7' };
+const DEFAULT_COLOR = '#94a3b8';
+
+// ── Markdown ──────────────────────────────────────────────────────
+function renderMarkdown(el, md) {
+    el.innerHTML = DOMPurify.sanitize(marked.parse(md || ''));
+}
+
+// ── Charts ────────────────────────────────────────────────────────
+function chartDefaults() {
+    const textColor = isDark ? '#7d8590' : '#64748b';
+    const gridColor = isDark ? '#21262d' : '#e2e8f0';
+    return { textColor, gridColor };
+}
+
+function renderSentimentChart(data) {
+    const { textColor } = chartDefaults();
+    const canvas = document.getElementById('sentimentChart');
+    if (sentimentChartInst) sentimentChartInst.destroy();
+    const labels = Object.keys(data);
+    const values = Object.values(data);
+    sentimentChartInst = new Chart(canvas, {
+        type: 'doughnut',
+        data: {
+            labels,
+            datasets: [{
+                data: values,
+                backgroundColor: labels.map(l => CHART_COLORS[l] || DEFAULT_COLOR),
+                borderWidth: 2,
+                borderColor: isDark ? '#161b22' : '#ffffff',
+                hoverOffset: 4,
+            }],
+        },
+        options: {
+            responsive: true, maintainAspectRatio: false, cutout: '65%',
+            plugins: {
+                legend: {
+                    position: 'bottom',
+                    labels: { color: textColor, padding: 10, font: { size: 11, weight: '600' },
+                              usePointStyle: true, pointStyleWidth: 7 },
+                },
+                tooltip: { callbacks: { label: ctx => ` ${ctx.label}: ${ctx.parsed.toFixed(1)}%` } },
+            },
+        },
+    });
+}
+
+function refreshChartTheme() {
+    const { textColor, gridColor } = chartDefaults();
+    [sentimentChartInst, timelineChartInst].forEach(chart => {
+        if (!chart) return;
+        if (chart.config.type === 'doughnut') {
+            chart.options.plugins.legend.labels.color = textColor;
+            chart.data.datasets[0].borderColor = isDark ? '#161b22' : '#ffffff';
+        } else {
+            if (chart.options.scales?.x) { chart.options.scales.x.ticks.color = textColor; chart.options.scales.x.grid.color = gridColor; }
+            if (chart.options.scales?.y) { chart.options.scales.y.ticks.color = textColor; }
+            if (chart.options.plugins?.legend) chart.options.plugins.legend.labels.color = textColor;
+        }
+        chart.update();
+    });
+}
+
+// ── Sentiment timeline (area line chart) ─────────────────────────
+function renderSentimentTimeline(timelineData, resolution) {
+    const card   = document.getElementById('timelineCard');
+    const canvas = document.getElementById('timelineChart');
+    if (!canvas || !timelineData || timelineData.length < 2) {
+        if (card) card.style.display = 'none';
+        return;
+    }
+    if (card) card.style.display = '';
+    if (timelineChartInst) timelineChartInst.destroy();
+    const { textColor, gridColor } = chartDefaults();
+
+    const n      = timelineData.length;
+    // Time-bucketed rows carry their bucket start; chunked rows only an index.
+    const format = resolution === 'hour'
+        ? { month: 'short', day: 'numeric', hour: 'numeric' }
+        : { month: 'short', day: 'numeric' };
+    const labels = timelineData[0].bucket
+        ? timelineData.map(d => new Date(d.bucket).toLocaleString(undefined, format))
+        : timelineData.map((_, i) => i === 0 ? 'Oldest' : i === n - 1 ? 'Newest' : '');
+
+    timelineChartInst = new Chart(canvas, {
+        type: 'line',
+        data: {
+            labels,
+            datasets: [
+                {
+                    label: 'Positive',
+                    data: timelineData.map(d => d.Positive),
+                    borderColor: '#22c55e',
+                    backgroundColor: 'rgba(34,197,94,0.12)',
+                    fill: true, tension: 0.4, borderWidth: 2,
+                    pointRadius: 2, pointHoverRadius: 4,
+                },
+                {
+                    label: 'Negative',
+                    data: timelineData.map(d => d.Negative),
+                    borderColor: '#ef4444',
+                    backgroundColor: 'rgba(239,68,68,0.07)',
+                    fill: true, tension: 0.4, borderWidth: 1.5,
+                    pointRadius: 2, pointHoverRadius: 4,
+                },
+            ],
+        },
+        options: {
+            responsive: true, maintainAspectRatio: false,
+            plugins: {
+                legend: {
+                    position: 'top',
+                    labels: { color: textColor, font: { size: 11, weight: '600' },
+                              usePointStyle: true, pointStyleWidth: 7 },
+                },
+                tooltip: { callbacks: { label: ctx => ` ${ctx.dataset.label}: ${ctx.parsed.y.toFixed(1)}%` } },
+            },
+            scales: {
+                x: { ticks: { color: textColor, font: { size: 10 }, maxRotation: 0 }, grid: { color: gridColor } },
+                y: { min: 0, max: 100,
+                     ticks: { color: textColor, font: { size: 10 }, callback: v => v + '%' },
+                     grid: { color: gridColor } },
+            },
+        },
+    });
+}
+
+// ── Word cloud ────────────────────────────────────────────────────
+function renderWordCloud(wordFreqs) {
+    const card   = document.getElementById('wordCloudCard');
+    const canvas = document.getElementById('wordCloudCanvas');
+    if (!canvas || !wordFreqs || !Object.keys(wordFreqs).length) {
+        if (card) card.style.display = 'none'; return;
+    }
+    if (typeof WordCloud === 'undefined') {
+        if (card) card.style.display = 'none'; return;
+    }
+    if (card) card.style.display = '';
+
+    const w = canvas.parentElement.clientWidth || 400;
+    canvas.width  = w;
+    canvas.height = 210;
+
+    const maxFreq = Math.max(...Object.values(wordFreqs));
+    const list = Object.entries(wordFreqs)
+        .sort((a, b) => b[1] - a[1])
+        .slice(0, 50)
+        .map(([word, freq]) => [word, Math.max(10, Math.round(freq / maxFreq * 54))]);
+
+    const palette = isDark
+        ? ['#f43f5e','#94a3b8','#3b82f6','#22c55e','#f59e0b','#a78bfa']
+        : ['#e11d48','#64748b','#2563eb','#16a34a','#d97706','#7c3aed'];
+
+    WordCloud(canvas, {
+        list,
+        gridSize:     Math.round(w / 60),
+        weightFactor: 1,
+        fontFamily:   'Geist, system-ui, sans-serif',
+        color: word => palette[(word.charCodeAt(0) + word.charCodeAt(word.length - 1)) % palette.length],
+        backgroundColor: 'transparent',
+        rotateRatio: 0.25,
+        minSize:     8,
+        shuffle:     true,
+    });
+}
+
+// ── Stat cards ────────────────────────────────────────────────────
+const SENT_COLORS = { Positive:'#22c55e', Negative:'#ef4444', Neutral:'#64748b', Mixed:'#f59e0b' };
+
+function countUp(el, target, isFloat, duration) {
+    duration = duration || 700;
+    const t0 = performance.now();
+    (function frame(now) {
+        const p = Math.min((now - t0) / duration, 1);
+        const v = target * (1 - Math.pow(1 - p, 3));
+        el.textContent = isFloat ? v.toFixed(1) : Math.round(v).toLocaleString();
+        if (p < 1) requestAnimationFrame(frame);
+    })(t0);
+}
+
+function showStatCards(data) {
+    const statCards = document.getElementById('statCards');
+    show(statCards);
+
+    // Card 1 — dominant sentiment
+    const sentEntries = Object.entries(data.overall_sentiment).sort((a,b) => b[1]-a[1]);
+    const [topSentName, topSentPct] = sentEntries[0] || ['—', 0];
+    const sentColor = SENT_COLORS[topSentName] || 'var(--text)';
+    const sentValEl = document.getElementById('statSentVal');
+    sentValEl.style.color = sentColor;
+    sentValEl.textContent = '0%';
+    const sentLblEl = document.getElementById('statSentLbl');
+    sentLblEl.textContent = topSentName;
+    setTimeout(() => countUp({ set textContent(v) { sentValEl.textContent = v + '%'; } }, topSentPct, true), 80);
+
+    // Card 2 — total comments (count-up on existing #totalComments span)
+    totalCommentsEl.textContent = '0';
+    setTimeout(() => countUp(totalCommentsEl, data.total_comments, false), 120);
+
+    // Card 3 — engine (already set by displayResults; just add cached sub-text)
+    document.getElementById('statEngineSub').textContent =
+        data.sampled ? `Sampled ${data.sample_size} of ${data.total_comments}`
+        : data.refreshing ? 'Cached result · refreshing'
+        : data.cached ? 'Cached result' : 'Live analysis';
+
+    // Card 4 — top category
+    const catEntries = Object.entries(data.comment_categories).sort((a,b) => b[1]-a[1]);
+    const [topCatName, topCatCount] = catEntries[0] || ['—', 0];
+    document.getElementById('statCatVal').textContent = topCatName;
+    const totalCmts = Object.values(data.comment_categories).reduce((s,n) => s+n, 0);
+    const catPct = totalCmts > 0 ? Math.round(topCatCount / totalCmts * 100) : 0;
+    document.getElementById('statCatSub').textContent = catPct + '% of comments';
+}
+
+function hideStatCards() {
+    hide(document.getElementById('statCards'));
+}
+
+// ── Nav click handlers ────────────────────────────────────────────
+document.getElementById('navDashboard').addEventListener('click', function () {
+    ['navDashboard','navAllAnalyses','navSettings'].forEach(id => {
+        document.getElementById(id).classList.remove('active');
+        document.getElementById(id).removeAttribute('aria-current');
+    });
+    this.classList.add('active');
+    this.setAttribute('aria-current', 'page');
+});
+
+document.getElementById('navAllAnalyses').addEventListener('click', function () {
+    ['navDashboard','navAllAnalyses','navSettings'].forEach(id => {
+        document.getElementById(id).classList.remove('active');
+        document.getElementById(id).removeAttribute('aria-current');
+    });
+    this.classList.add('active');
+    const hp = document.getElementById('historyPanel');
+    if (hp.style.display !== 'none') hp.scrollIntoView({ behavior: 'smooth', block: 'start' });
+});
+
+document.getElementById('navSettings').addEventListener('click', function () {
+    ['navDashboard','navAllAnalyses','navSettings'].forEach(id => {
+        document.getElementById(id).classList.remove('active');
+        document.getElementById(id).removeAttribute('aria-current');
+    });
+    this.classList.add('active');
+});
+
+// ── Export ────────────────────────────────────────────────────────
+exportBtn.addEventListener('click', async () => {
+    if (!commentsSource.videoId) return;
+    // Page through the server-side list — the client only holds one page.
+    const all = [];
+    let cursor = '0';
+    try {
+        while (cursor !== null) {
+            const res = await fetch(commentsUrl({ cursor, limit: 200 }));
+            if (!res.ok) return;
+            const page = await res.json();
+            all.push(...page.comments);
+            cursor = page.next_cursor;
+        }
+    } catch { return; }
+    const esc = s => `"${String(s).replace(/"/g, '""')}"`;
+    const hdr = ['Comment', 'Sentiment', 'Category'].map(esc).join(',');
+    const rows = all.map(c => [esc(c.comment), esc(c.sentiment), esc(c.category)].join(','));
+    const blob = new Blob(['﻿' + [hdr, ...rows].join('\r\n')], { type: 'text/csv;charset=utf-8;' });
+    const url  = URL.createObjectURL(blob);
+    const a    = document.createElement('a');
+    a.href = url; a.download = `vidalyze-${Date.now()}.csv`;
+    document.body.appendChild(a); a.click();
+    document.body.removeChild(a); URL.revokeObjectURL(url);
+});
+
+// ── Form submit ───────────────────────────────────────────────────
+analysisForm.addEventListener('submit', async e => {
+    e.preventDefault();
+    hide(errorMessageDiv);
+    hide(resultsSection);
+    hide(emptyState);
+    hide(videoInfo);
+    hideStatCards();
+    show(loadingState);
+    startProgressSteps();
+    commentsListDiv.innerHTML = '';
+
+    analyzeButton.disabled = true;
+    buttonText.textContent  = 'Analyzing…';
+    loadingSpinner.style.display = '';
+
+    const fd = new FormData();
+    fd.append('youtube_url', youtubeUrlInput.value.trim());
+    if (document.getElementById('sampleMode').checked) fd.append('mode', 'sample');
+
+    try {
+        const res  = await fetch('/analyze', {
+            method: 'POST',
+            headers: { 'X-Session-Id': SESSION_ID },
+            body: fd,
+        });
+        const data = await res.json();
+        if (res.ok) {
+            allCommentsData = data.comments_data;
+            commentsSource  = {
+                videoId: data.video_id,
+                sample:  data.mode === 'sample',
+                total:   data.comments_total,
+                next:    data.comments_next_cursor,
+            };
+            displayResults(data);
+        } else {
+            showError(data.error || 'Unknown error.');
+        }
+    } catch {
+        showError('Network error. Please try again.');
+    } finally {
+        analyzeButton.disabled = false;
+        buttonText.textContent  = 'Analyze Comments';
+        loadingSpinner.style.display = 'none';
+        completeProgressSteps();
+        hide(loadingState);
+    }
+});
+
+function show(el) { el.style.display = ''; }
+function hide(el) { el.style.display = 'none'; }
+
+function showError(msg) {
+    errorTextEl.textContent = msg;
+    show(errorMessageDiv);
+}
+
+// ── Results ───────────────────────────────────────────────────────
+function displayResults(data) {
+    hide(emptyState);
+
+    // Video info strip
+    videoTitleEl.textContent = data.video_title;
+    videoLink.href           = data.youtube_url;
+    show(videoInfo);
+
+    // Stat cards with count-up animation
+    // analysisMethod span lives inside stat card 3 — set it before showStatCards
+    analysisMethodEl.textContent = data.analysis_method;
+    showStatCards(data);
+
+    // Results section
+    analysisSubtitle.textContent = data.video_title;
+    show(resultsSection);
+
+    renderMarkdown(overallInsightsDiv, data.overall_insights);
+    renderHighlights(data.highlights || { top_insights: [], top_complaints: [], feature_requests: [] });
+    renderSentimentChart(data.overall_sentiment);
+    renderSentimentBreakdown(data.overall_sentiment, data.total_comments, data.confidence_intervals);
+    renderSentimentTimeline(data.sentiment_over_time || [], data.timeline_resolution);
+    renderTopicsRows(data.comment_categories);
+    renderWordCloud(data.word_frequencies || {});
+    renderRecentComments();
+    populateFilters(data);
+    renderComments();
+    loadHistory();
+}
+
+// ── Sentiment breakdown legend ────────────────────────────────────
+function renderSentimentBreakdown(sentimentData, totalComments, intervals) {
+    const el = document.getElementById('sentimentBreakdown');
+    if (!el) return;
+    el.innerHTML = '';
+    const entries = Object.entries(sentimentData).sort((a, b) => b[1] - a[1]);
+    entries.forEach(([label, pct]) => {
+        const count = Math.round(pct / 100 * totalComments);
+        const color = CHART_COLORS[label] || DEFAULT_COLOR;
+
+        const row = document.createElement('div');
+        row.className = 'sent-row';
+
+        const top = document.createElement('div');
+        top.className = 'sent-row-top';
+
+        const left = document.createElement('div');
+        left.className = 'sent-row-left';
+
+        const dot = document.createElement('div');
+        dot.className = 'sent-legend-dot';
+        dot.style.background = color;
+
+        const name = document.createElement('span');
+        name.style.cssText = 'font-size:.78rem;font-weight:600;color:var(--text)';
+        name.textContent = label;
+
+        const right = document.createElement('span');
+        right.style.cssText = 'font-size:.75rem;color:var(--muted)';
+        const ci = intervals && intervals[label];
+        right.textContent = ci
+            ? `${pct.toFixed(1)}% (95% CI ${ci[0].toFixed(1)}–${ci[1].toFixed(1)}%)`
+            : `${pct.toFixed(1)}% (${count})`;
+
+        left.append(dot, name);
+        top.append(left, right);
+
+        const track = document.createElement('div');
+        track.style.cssText = 'height:5px;background:var(--border);border-radius:9999px;overflow:hidden';
+        const fill = document.createElement('div');
+        fill.style.cssText = `height:100%;border-radius:9999px;background:${color};width:0;transition:width .85s cubic-bezier(0.16,1,0.3,1)`;
+        track.appendChild(fill);
+
+        row.append(top, track);
+        el.appendChild(row);
+
+        requestAnimationFrame(() => requestAnimationFrame(() => { fill.style.width = pct + '%'; }));
+    });
+}
+
+// ── Top topics HTML bar rows ──────────────────────────────────────
+function renderTopicsRows(categoryData) {
+    const el = document.getElementById('topicsRows');
+    if (!el) return;
+    el.innerHTML = '';
+    const total = Object.values(categoryData).reduce((s, n) => s + n, 0);
+    if (!total) return;
+    const entries = Object.entries(categoryData).sort((a, b) => b[1] - a[1]);
+    const maxCount = entries[0][1];
+    entries.forEach(([label, count]) => {
+        const pct     = Math.round(count / total * 100);
+        const barPct  = Math.round(count / maxCount * 100);
+        const color   = CHART_COLORS[label] || DEFAULT_COLOR;
+
+        const row = document.createElement('div');
+        row.className = 'topic-row';
+
+        const lbl = document.createElement('span');
+        lbl.className = 'topic-lbl';
+        lbl.textContent = label;
+
+        const track = document.createElement('div');
+        track.className = 'topic-track';
+        const fill = document.createElement('div');
+        fill.className = 'topic-fill';
+        fill.style.background = color;
+        track.appendChild(fill);
+
+        const pctEl = document.createElement('span');
+        pctEl.className = 'topic-pct';
+        pctEl.textContent = pct + '%';
+
+        row.append(lbl, track, pctEl);
+        el.appendChild(row);
+
+        requestAnimationFrame(() => requestAnimationFrame(() => { fill.style.width = barPct + '%'; }));
+    });
+}
+
+// ── Recent comments strip (top 5) ────────────────────────────────
+const RCMT_COLORS = { positive:'#22c55e', negative:'#ef4444', neutral:'#64748b', mixed:'#f59e0b' };
+
+function renderRecentComments() {
+    const el = document.getElementById('recentCmtsList');
+    if (!el) return;
+    el.innerHTML = '';
+    const recent = allCommentsData.slice(0, 5);
+    if (!recent.length) { el.style.display = 'none'; return; }
+    el.style.display = '';
+    recent.forEach(c => {
+        const sentCls   = SENT_CLASS[c.sentiment]  || 'neutral';
+        const badgeCls  = SENT_BADGE[sentCls]      || 'bne';
+        const dotColor  = RCMT_COLORS[sentCls]     || '#64748b';
+
+        const item = document.createElement('div');
+        item.className = 'rcmt-item';
+
+        const dot = document.createElement('div');
+        dot.className = 'rcmt-dot';
+        dot.style.background = dotColor;
+
+        const text = document.createElement('p');
+        text.className = 'rcmt-text';
+        text.textContent = c.comment;
+
+        const badge = document.createElement('span');
+        badge.className = `badge ${badgeCls}`;
+        badge.style.flexShrink = '0';
+        badge.textContent = c.sentiment;
+
+        item.append(dot, text, badge);
+        el.appendChild(item);
+    });
+}
+
+// Scroll-to-full-list handler
+document.getElementById('scrollToAllBtn').addEventListener('click', () => {
+    document.getElementById('commentsList').scrollIntoView({ behavior: 'smooth', block: 'start' });
+});
+
+// ── Filters ───────────────────────────────────────────────────────
+function buildOpts(sel, vals, allLabel) {
+    sel.innerHTML = '';
+    vals.forEach(v => {
+        const o = document.createElement('option');
+        o.value = v; o.textContent = v === 'All' ? allLabel : v;
+        sel.appendChild(o);
+    });
+}
+
+// Filter options come from the aggregates, not the (paged) comment list.
+function populateFilters(data) {
+    const sentiments = Object.keys(data.overall_sentiment).filter(k => data.overall_sentiment[k] > 0);
+    buildOpts(sentimentFilter, ['All', ...sentiments].sort(), 'All Sentiments');
+    buildOpts(categoryFilter,  ['All', ...Object.keys(data.comment_categories)].sort(), 'All Categories');
+}
+
+sentimentFilter.addEventListener('change', () => renderComments());
+categoryFilter.addEventListener('change',  () => renderComments());
+moreCommentsBtn.addEventListener('click',  () => renderComments(true));
+
+// ── Comment rendering ─────────────────────────────────────────────
+function makeBadge(text, cls, icon) {
+    const span = document.createElement('span');
+    span.className = `badge ${cls}`;
+    if (icon) {
+        const i = document.createElement('span');
+        i.textContent = icon;
+        i.setAttribute('aria-hidden', 'true');
+        span.appendChild(i);
+    }
+    span.appendChild(document.createTextNode(text));
+    return span;
+}
+
+function makeComment(c, idx) {
+    const sentCls  = SENT_CLASS[c.sentiment]  || 'neutral';
+    const catCls   = CAT_CLASS[c.category]    || 'neutral-other';
+    const sentBadge = SENT_BADGE[sentCls]     || 'bne';
+    const catBadge  = CAT_BADGE[catCls]       || 'bne';
+
+    const wrap = document.createElement('div');
+    wrap.className = `cmt ${sentCls} ${catCls}`;
+    wrap.style.animationDelay = `${Math.min(idx * 35, 600)}ms`;
+
+    const sr = document.createElement('span');
+    sr.className = 'sr-only';
+    sr.textContent = `${c.sentiment} sentiment, ${c.category} category. `;
+
+    const meta = document.createElement('div');
+    meta.style.cssText = 'display:flex;flex-wrap:wrap;align-items:center;gap:.4rem;margin-bottom:.4rem';
+    meta.setAttribute('aria-hidden', 'true');
+
+    const sl = document.createElement('span');
+    sl.style.cssText = 'font-size:.7rem;font-weight:600;color:var(--muted)';
+    sl.textContent = 'Sentiment';
+    const cl = document.createElement('span');
+    cl.style.cssText = 'font-size:.7rem;font-weight:600;color:var(--muted)';
+    cl.textContent = 'Category';
+    meta.append(sl, makeBadge(c.sentiment, sentBadge, SENT_ICON[c.sentiment] || ''), cl, makeBadge(c.category, catBadge, null));
+
+    const body = document.createElement('p');
+    body.style.cssText = 'font-size:.825rem;line-height:1.55;color:var(--text)';
+    body.textContent = c.comment;
+
+    wrap.append(sr, meta, body);
+    return wrap;
+}
+
+function commentsUrl(params) {
+    const qs = new URLSearchParams(params);
+    if (commentsSource.sample) qs.set('mode', 'sample');
+    return `/analysis/${encodeURIComponent(commentsSource.videoId)}/comments?${qs}`;
+}
+
+// Filtering happens server-side; append=true fetches the next page.
+async function renderComments(append = false) {
+    const ss  = sentimentFilter.value;
+    const sc  = categoryFilter.value;
+    const seq = ++commentsSeq;
+
+    let page;
+    if (!append && ss === 'All' && sc === 'All') {
+        page = { comments: allCommentsData, total: commentsSource.total, next_cursor: commentsSource.next };
+    } else {
+        const params = {};
+        if (ss !== 'All') params.sentiment = ss;
+        if (sc !== 'All') params.category  = sc;
+        if (append)       params.cursor    = commentsCursor;
+        try {
+            const res = await fetch(commentsUrl(params));
+            if (!res.ok || seq !== commentsSeq) return;
+            page = await res.json();
+        } catch { return; }
+        if (seq !== commentsSeq) return;
+    }
+
+    commentsCursor = page.next_cursor;
+    moreCommentsBtn.style.display = commentsCursor ? '' : 'none';
+    if (!append) commentsListDiv.innerHTML = '';
+
+    const total = commentsSource.total;
+    commentCountEl.textContent = page.total === total
+        ? `Showing all ${total} comments`
+        : `Showing ${page.total} of ${total} comments`;
+
+    if (!page.total) {
+        const p = document.createElement('p');
+        p.style.cssText = 'text-align:center;padding:2rem 0;font-size:.825rem;color:var(--muted)';
+        p.textContent = 'No comments match the selected filters.';
+        commentsListDiv.appendChild(p);
+        return;
+    }
+
+    const offset = commentsListDiv.children.length;
+    const frag = document.createDocumentFragment();
+    page.comments.forEach((c, i) => frag.appendChild(makeComment(c, offset + i)));
+    commentsListDiv.appendChild(frag);
+}
+
+// ── Highlights ────────────────────────────────────────────────────
+function makeHlItem(text) {
+    const el = document.createElement('div');
+    el.className = 'hl-item';
+    el.textContent = text;
+    return el;
+}
+
+function renderHighlights(h) {
+    const hasAny = h.top_insights.length || h.top_complaints.length || h.feature_requests.length;
+    if (!hasAny) { hide(highlightsSection); return; }
+    show(highlightsSection);
+
+    const fill = (container, items, msg) => {
+        container.innerHTML = '';
+        if (!items.length) {
+            const p = document.createElement('p');
+            p.style.cssText = 'font-size:.75rem;color:var(--muted)';
+            p.textContent = msg; container.appendChild(p);
+        } else {
+            const f = document.createDocumentFragment();
+            items.forEach(t => f.appendChild(makeHlItem(t)));
+            container.appendChild(f);
+        }
+    };
+    fill(insightsList,   h.top_insights,     'No insights found.');
+    fill(complaintsList, h.top_complaints,   'No complaints found.');
+    fill(requestsList,   h.feature_requests, 'No requests found.');
+}
+
+// ── History ───────────────────────────────────────────────────────
+function timeAgo(iso) {
+    const m = Math.floor((Date.now() - new Date(iso)) / 60000);
+    if (m < 1)  return 'just now';
+    if (m < 60) return `${m}m ago`;
+    const h = Math.floor(m / 60);
+    if (h < 24) return `${h}h ago`;
+    return `${Math.floor(h / 24)}d ago`;
+}
+
+function makeHistoryItem(rec) {
+    const btn = document.createElement('button');
+    btn.className = 'h-item';
+    btn.setAttribute('aria-label', `Re-analyze: ${rec.video_title}`);
+
+    const icon = document.createElement('div');
+    icon.style.cssText = 'width:2rem;height:2rem;border-radius:.375rem;background:var(--sub);border:1px solid var(--border);flex-shrink:0;display:flex;align-items:center;justify-content:center';
+    icon.innerHTML = `<svg xmlns="http://www.w3.org/2000/svg" width="11" height="11" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round" style="color:var(--muted)" aria-hidden="true"><polygon points="5 3 19 12 5 21 5 3"/></svg>`;
+
+    const info = document.createElement('div');
+    info.style.minWidth = '0';
+
+    const title = document.createElement('div');
+    title.style.cssText = 'font-size:.75rem;font-weight:600;line-height:1.3;overflow:hidden;display:-webkit-box;-webkit-line-clamp:2;-webkit-box-orient:vertical;color:var(--text)';
+    title.textContent = rec.video_title || 'Unknown video';
+
+    const meta = document.createElement('div');
+    meta.style.cssText = 'font-size:.67rem;color:var(--muted);margin-top:.1rem';
+    const top = Object.entries(rec.overall_sentiment || {}).sort((a,b) => b[1]-a[1])[0];
+    meta.textContent = [
+        rec.total_comments ? `${rec.total_comments} comments` : '',
+        top ? `${top[0]} ${top[1]}%` : '',
+        timeAgo(rec.created_at),
+    ].filter(Boolean).join(' · ');
+
+    info.append(title, meta);
+    btn.append(icon, info);
+
+    btn.addEventListener('click', () => {
+        youtubeUrlInput.value = rec.youtube_url;
+        analysisForm.dispatchEvent(new Event('submit', { cancelable: true, bubbles: true }));
+    });
+    return btn;
+}
+
+const viewAllBtn = document.getElementById('viewAllBtn');
+let historyCursor = null;
+
+// append=true fetches the page after historyCursor (keyset pagination);
+// otherwise the list is reset to the newest page.
+async function loadHistory(append = false) {
+    try {
+        const qs = append && historyCursor ? `?before=${encodeURIComponent(historyCursor)}` : '';
+        const res = await fetch(`/history${qs}`, {
+            headers: { 'X-Session-Id': SESSION_ID },
+        });
+        if (!res.ok) return;
+        const recs = await res.json();
+        historyCursor = res.headers.get('X-Next-Cursor');
+        viewAllBtn.style.display = historyCursor ? '' : 'none';
+        if (!recs.length) return;
+        if (!append) historyList.innerHTML = '';
+        const f = document.createDocumentFragment();
+        recs.forEach(r => f.appendChild(makeHistoryItem(r)));
+        historyList.appendChild(f);
+        show(historyPanel);
+    } catch { /* non-critical */ }
+}
+
+viewAllBtn.addEventListener('click', () => loadHistory(true));
+
+loadHistory();
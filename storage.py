@@ -1,17 +1,46 @@
 """
 SQLite persistence layer for Vidalyze analysis history.
 
-Stores a lightweight summary of each completed analysis (no full comment list).
+Stores a lightweight summary of each completed analysis (no full comment list),
+plus one mergeable aggregate state per video for incremental updates.
+Full /analyze payloads are kept separately, compressed, in a size-bounded
+result store that backs the in-memory cache across restarts, and comment
+text plus insights are indexed with FTS5 for /search.
 The database file is created automatically on first use.
 """
 
+import base64
+import html
 import json
 import logging
 import os
+import queue
+import re
 import sqlite3
+import threading
+import time
+import zlib
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from pathlib import Path
 
+from config import (
+    ANALYSIS_VERSION,
+    DB_POOL_SIZE,
+    EXPORT_BATCH_SIZE,
+    PRUNE_BATCH_SIZE,
+    RESULT_STORE_MAX_BYTES,
+    RESULT_STORE_TTL_SECONDS,
+    RETENTION_MAX_AGE_DAYS,
+    RETENTION_MAX_ROWS_PER_SESSION,
+)
+
+try:
+    import zstandard
+except ImportError:  # optional — zlib is used when zstandard isn't installed
+    zstandard = None
+
 logger = logging.getLogger(__name__)
 
 # DB_DIR can be overridden via environment variable so the production
@@ -19,6 +48,128 @@ logger = logging.getLogger(__name__)
 _DB_DIR = Path(os.getenv("DB_DIR", str(Path(__file__).parent)))
 DB_PATH = _DB_DIR / "vidalyze.db"
 
+# Applied once per pooled connection, not per request.
+_CONNECTION_PRAGMAS = (
+    # Only takes effect on a new, empty database; older files are converted
+    # once with `python cli.py vacuum` (see enable_incremental_vacuum).
+    "PRAGMA auto_vacuum=INCREMENTAL",
+    # WAL mode allows concurrent reads alongside a single writer.
+    # Essential with multiple gunicorn workers sharing one SQLite file.
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",      # WAL makes NORMAL durable across app crashes
+    "PRAGMA cache_size=-16000",       # 16 MB page cache per connection
+    "PRAGMA mmap_size=268435456",     # 256 MB memory-mapped reads
+    "PRAGMA busy_timeout=5000",       # wait up to 5 s for a competing writer
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA foreign_keys=ON",         # analysis_categories rows follow their analysis
+)
+_CACHED_STATEMENTS = 256              # per-connection prepared statement cache
+
+
+class _ConnectionPool:
+    """
+    Thread-safe LIFO pool of tuned SQLite connections for one database file.
+
+    Connections are opened lazily, configured once, and handed to one thread
+    at a time. Reusing them keeps the parsed schema, the page cache and the
+    sqlite3 prepared-statement cache warm across requests.
+    """
+
+    def __init__(self, path: Path, size: int):
+        self.path = path
+        self._idle: queue.LifoQueue = queue.LifoQueue(maxsize=size)
+        self._closed = False
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self._open()
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        if conn.in_transaction:
+            conn.rollback()
+        if self._closed:
+            conn.close()
+            return
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close(self) -> None:
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            check_same_thread=False,      # pooled: used by one thread at a time
+            cached_statements=_CACHED_STATEMENTS,
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in _CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+
+_pool: _ConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> _ConnectionPool:
+    """Return the pool for the current DB_PATH, replacing it if the path changed."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.path != DB_PATH:
+            if _pool is not None:
+                _pool.close()
+            _pool = _ConnectionPool(DB_PATH, DB_POOL_SIZE)
+        return _pool
+
+
+def close_pool() -> None:
+    """Close every idle pooled connection. The next query opens a fresh pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+# Pools inherited across fork(). Their connections are never used or closed
+# in the child: closing the last handle on a WAL database may checkpoint and
+# delete the -wal/-shm files the parent and sibling workers still use.
+_inherited_pools: list[_ConnectionPool] = []
+
+
+def reset_after_fork() -> None:
+    """
+    Call first thing in a forked child (e.g. gunicorn post_fork). Abandons
+    the parent's connections and lock; the next query opens a fresh pool.
+    """
+    global _pool, _pool_lock
+    if _pool is not None:
+        _inherited_pools.append(_pool)
+    _pool = None
+    _pool_lock = threading.Lock()
+
+
+@contextmanager
+def _connect():
+    """Borrow a pooled connection; uncommitted work is rolled back on return."""
+    pool = _get_pool()
+    conn = pool.acquire()
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+
 _CREATE_TABLE = """
 CREATE TABLE IF NOT EXISTS analyses (
     id                 INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -31,11 +182,156 @@ CREATE TABLE IF NOT EXISTS analyses (
     comment_categories TEXT NOT NULL DEFAULT '{}',  -- JSON {category: count}
     overall_insights   TEXT NOT NULL DEFAULT '',
     session_id         TEXT NOT NULL DEFAULT '',
-    created_at         TEXT NOT NULL
+    created_at         TEXT NOT NULL,
+    pct_positive       REAL NOT NULL DEFAULT 0,
+    pct_neutral        REAL NOT NULL DEFAULT 0,
+    pct_negative       REAL NOT NULL DEFAULT 0,
+    pct_mixed          REAL NOT NULL DEFAULT 0,
+    hit_count          INTEGER NOT NULL DEFAULT 1,  -- requests served by this row
+    cache_hit          INTEGER NOT NULL DEFAULT 0   -- 1: created by a cache hit, not in the rollups
+)
+"""
+# Sentiment shares as typed columns and category counts as child rows, so
+# history reads and aggregate queries never have to decode the JSON columns
+# (which are still written for older readers and exports).
+_SENTIMENT_COLUMNS = {
+    "Positive": "pct_positive",
+    "Neutral":  "pct_neutral",
+    "Negative": "pct_negative",
+    "Mixed":    "pct_mixed",
+}
+# One row per video per UTC day, upserted by save_analysis (and by
+# record_rollup for analyses that have no row of their own). Shares are kept
+# as running sums so the mean is exact and the update is O(1); trend reads
+# touch only these rows, never the analyses table.
+_ROLLUP_SUM_COLUMNS = {
+    "Positive": "sum_positive",
+    "Neutral":  "sum_neutral",
+    "Negative": "sum_negative",
+    "Mixed":    "sum_mixed",
+}
+_CREATE_ROLLUPS_TABLE = """
+CREATE TABLE IF NOT EXISTS video_daily_rollups (
+    video_id       TEXT NOT NULL,
+    day            TEXT NOT NULL,                -- YYYY-MM-DD, UTC
+    analyses       INTEGER NOT NULL DEFAULT 0,
+    total_comments INTEGER NOT NULL DEFAULT 0,
+    sum_positive   REAL NOT NULL DEFAULT 0,
+    sum_neutral    REAL NOT NULL DEFAULT 0,
+    sum_negative   REAL NOT NULL DEFAULT 0,
+    sum_mixed      REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (video_id, day)
+) WITHOUT ROWID
+"""
+_CREATE_CATEGORIES_TABLE = """
+CREATE TABLE IF NOT EXISTS analysis_categories (
+    analysis_id INTEGER NOT NULL REFERENCES analyses (id) ON DELETE CASCADE,
+    category    TEXT NOT NULL,
+    count       INTEGER NOT NULL,
+    PRIMARY KEY (analysis_id, category)
+) WITHOUT ROWID
+"""
+_CREATE_AGGREGATES_TABLE = """
+CREATE TABLE IF NOT EXISTS aggregate_states (
+    video_id    TEXT PRIMARY KEY,
+    state       TEXT NOT NULL,                   -- JSON, see sentiment.build_aggregate_state
+    updated_at  TEXT NOT NULL
+)
+"""
+_CREATE_RESULTS_TABLE = """
+CREATE TABLE IF NOT EXISTS result_store (
+    cache_key    TEXT NOT NULL,                  -- video_id, or video_id:sample
+    version      INTEGER NOT NULL,               -- config.ANALYSIS_VERSION
+    codec        TEXT NOT NULL,                  -- 'zstd' | 'zlib'
+    payload      BLOB NOT NULL,                  -- compressed JSON
+    stored_bytes INTEGER NOT NULL,
+    created_at   REAL NOT NULL,                  -- unix time
+    last_access  REAL NOT NULL,                  -- unix time, drives LRU eviction
+    PRIMARY KEY (cache_key, version)
 )
 """
+# One row per cache-warming slot (a UTC day); whichever worker inserts it
+# runs that warm-up, so N workers don't spend the quota N times.
+_CREATE_WARMUP_TABLE = """
+CREATE TABLE IF NOT EXISTS warmup_runs (
+    slot       TEXT PRIMARY KEY,                -- YYYY-MM-DD, UTC
+    claimed_at REAL NOT NULL                    -- unix time
+) WITHOUT ROWID
+"""
+# One row per stale-while-revalidate refresh in flight; claimed_at lets a
+# claim left by a dead worker lapse.
+_CREATE_REFRESH_TABLE = """
+CREATE TABLE IF NOT EXISTS refresh_claims (
+    cache_key  TEXT PRIMARY KEY,
+    claimed_at REAL NOT NULL                    -- unix time
+) WITHOUT ROWID
+"""
+# One counter per session, bumped in the same transaction as every write that
+# can change that session's history (save, cache-hit bump, import, prune);
+# the '' row moves with every write, as '' lists all sessions. /history
+# validates against it instead of counting the session's rows.
+_CREATE_HISTORY_VERSIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS history_versions (
+    session_id TEXT PRIMARY KEY,
+    version    INTEGER NOT NULL
+) WITHOUT ROWID
+"""
+# Full-text search: search_docs holds one row per indexed comment or insight
+# summary (the latest analysis of each video); search_fts is an external-
+# content FTS5 index over its body, kept in sync by triggers so the text is
+# stored only once.
+_CREATE_SEARCH_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS search_docs (
+        id        INTEGER PRIMARY KEY,
+        video_id  TEXT NOT NULL,
+        kind      TEXT NOT NULL,                 -- 'comment' | 'insights'
+        sentiment TEXT NOT NULL DEFAULT '',
+        category  TEXT NOT NULL DEFAULT '',
+        body      TEXT NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_search_docs_video ON search_docs (video_id)",
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS search_fts USING fts5(
+        body, content='search_docs', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_docs_ai AFTER INSERT ON search_docs BEGIN
+        INSERT INTO search_fts (rowid, body) VALUES (new.id, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_docs_ad AFTER DELETE ON search_docs BEGIN
+        INSERT INTO search_fts (search_fts, rowid, body) VALUES ('delete', old.id, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS search_docs_au AFTER UPDATE ON search_docs BEGIN
+        INSERT INTO search_fts (search_fts, rowid, body) VALUES ('delete', old.id, old.body);
+        INSERT INTO search_fts (rowid, body) VALUES (new.id, new.body);
+    END
+    """,
+)
+_SEARCH_TERM_RE = re.compile(r"\w+")
+_SNIPPET_OPEN, _SNIPPET_CLOSE = "\x02", "\x03"
+
 _CREATE_INDEX         = "CREATE INDEX IF NOT EXISTS idx_video_id  ON analyses (video_id)"
-_CREATE_SESSION_INDEX = "CREATE INDEX IF NOT EXISTS idx_session_id ON analyses (session_id)"
+_CREATE_RESULTS_INDEX = (
+    "CREATE INDEX IF NOT EXISTS idx_result_access ON result_store (last_access)"
+)
+# History reads filter on session_id and walk created_at newest-first; with id
+# as tie-breaker the index delivers rows already in keyset order, so a page
+# of /history touches only `limit` rows regardless of session size.
+_CREATE_SESSION_INDEX = (
+    "CREATE INDEX IF NOT EXISTS idx_session_created "
+    "ON analyses (session_id, created_at DESC, id DESC)"
+)
+_CREATE_CREATED_INDEX = (
+    "CREATE INDEX IF NOT EXISTS idx_created ON analyses (created_at DESC, id DESC)"
+)
 
 
 def _migrate_db(conn: sqlite3.Connection) -> None:
@@ -43,29 +339,114 @@ def _migrate_db(conn: sqlite3.Connection) -> None:
     existing_cols = {row[1] for row in conn.execute("PRAGMA table_info(analyses)")}
     if "session_id" not in existing_cols:
         conn.execute("ALTER TABLE analyses ADD COLUMN session_id TEXT NOT NULL DEFAULT ''")
-        conn.execute(_CREATE_SESSION_INDEX)
         logger.info("Migration applied: added session_id column to analyses table")
 
+    if "pct_positive" not in existing_cols:
+        for column in _SENTIMENT_COLUMNS.values():
+            conn.execute(f"ALTER TABLE analyses ADD COLUMN {column} REAL NOT NULL DEFAULT 0")
+        conn.execute(_CREATE_CATEGORIES_TABLE)
+        # Backfill from the JSON columns in SQL — no per-row Python decoding.
+        conn.execute(
+            "UPDATE analyses SET "
+            + ", ".join(
+                f"{column} = COALESCE(json_extract(overall_sentiment, '$.{label}'), 0)"
+                for label, column in _SENTIMENT_COLUMNS.items()
+            )
+        )
+        conn.execute(
+            """
+            INSERT OR IGNORE INTO analysis_categories (analysis_id, category, count)
+            SELECT a.id, j.key, j.value
+            FROM   analyses AS a, json_each(a.comment_categories) AS j
+            """
+        )
+        logger.info("Migration applied: typed sentiment columns and analysis_categories")
+
+    if "hit_count" not in existing_cols:
+        conn.execute("ALTER TABLE analyses ADD COLUMN hit_count INTEGER NOT NULL DEFAULT 1")
+        logger.info("Migration applied: added hit_count column to analyses table")
+
+    if "cache_hit" not in existing_cols:
+        # Which older rows were cache hits is unknown; the rollup backfill
+        # counted them all, so they stay counted.
+        conn.execute("ALTER TABLE analyses ADD COLUMN cache_hit INTEGER NOT NULL DEFAULT 0")
+        logger.info("Migration applied: added cache_hit column to analyses table")
+
+    has_rollups = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'video_daily_rollups'"
+    ).fetchone()
+    if not has_rollups:
+        conn.execute(_CREATE_ROLLUPS_TABLE)
+        conn.execute(
+            """
+            INSERT INTO video_daily_rollups
+                (video_id, day, analyses, total_comments,
+                 sum_positive, sum_neutral, sum_negative, sum_mixed)
+            SELECT video_id, substr(created_at, 1, 10), COUNT(*), SUM(total_comments),
+                   SUM(pct_positive), SUM(pct_neutral), SUM(pct_negative), SUM(pct_mixed)
+            FROM   analyses
+            WHERE  cache_hit = 0
+            GROUP  BY video_id, substr(created_at, 1, 10)
+            """
+        )
+        logger.info("Migration applied: video_daily_rollups backfilled from analyses")
+
+    # The composite (session_id, created_at, id) history index replaces the
+    # original single-column one; its session_id prefix serves the same lookups.
+    conn.execute(_CREATE_SESSION_INDEX)
+    conn.execute(_CREATE_CREATED_INDEX)
+    conn.execute("DROP INDEX IF EXISTS idx_session_id")
+
 
 def init_db() -> None:
     """Create the database and tables if they don't already exist, then migrate."""
     try:
         _DB_DIR.mkdir(parents=True, exist_ok=True)
-        with sqlite3.connect(DB_PATH) as conn:
-            # WAL mode allows concurrent reads alongside a single writer.
-            # Essential with multiple gunicorn workers sharing one SQLite file.
-            conn.execute("PRAGMA journal_mode=WAL")
+        with _connect() as conn:
+            if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                logger.warning(
+                    "%s predates incremental vacuum; pruned pages are not returned "
+                    "to the filesystem until `python cli.py vacuum` is run once.", DB_PATH
+                )
             conn.execute(_CREATE_TABLE)
             conn.execute(_CREATE_INDEX)
-            _migrate_db(conn)           # adds session_id column to legacy DBs first
-            conn.execute(_CREATE_SESSION_INDEX)  # safe now — column always exists
+            conn.execute(_CREATE_AGGREGATES_TABLE)
+            conn.execute(_CREATE_RESULTS_TABLE)
+            conn.execute(_CREATE_RESULTS_INDEX)
+            conn.execute(_CREATE_WARMUP_TABLE)
+            conn.execute(_CREATE_REFRESH_TABLE)
+            conn.execute(_CREATE_HISTORY_VERSIONS_TABLE)
+            _migrate_db(conn)           # adds newer columns and history indexes
+            conn.execute(_CREATE_CATEGORIES_TABLE)
+            try:
+                for statement in _CREATE_SEARCH_SCHEMA:
+                    conn.execute(statement)
+            except sqlite3.OperationalError:
+                logger.warning("SQLite was built without FTS5 — /search is disabled.")
             conn.commit()
         logger.info("Database initialised at %s", DB_PATH)
     except Exception:
         logger.exception("Failed to initialise SQLite database")
 
 
-def save_analysis(video_id: str, data: dict, session_id: str = "") -> None:
+def enable_incremental_vacuum() -> bool:
+    """
+    Switch a database created before incremental vacuum was enabled to
+    auto_vacuum=INCREMENTAL, so the pruner can return free pages in small
+    steps. This takes one full VACUUM — the whole file is rewritten under an
+    exclusive lock — so it is an explicit maintenance command, never run at
+    startup. Returns False if the database was already converted.
+    """
+    with _connect() as conn:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            return False
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.execute("VACUUM")
+    logger.info("Converted %s to auto_vacuum=INCREMENTAL", DB_PATH)
+    return True
+
+
+def save_analysis(video_id: str, data: dict, session_id: str = "", cache_hit: bool = False) -> None:
     """
     Persist a summary of a completed analysis to SQLite.
 
@@ -73,16 +454,43 @@ def save_analysis(video_id: str, data: dict, session_id: str = "") -> None:
     intentionally excluded to keep the database small.
     session_id scopes the record to a specific browser session so that
     /history only returns the requesting user's own analyses.
+
+    cache_hit=True marks a request served from cache: if the session already
+    has a row for this video, that row's hit_count is bumped and it moves to
+    the top of the history instead of a duplicate row being written. Cache
+    hits never count towards the daily rollups — nothing was re-analysed.
     """
+    sentiment  = data.get("overall_sentiment", {})
+    categories = data.get("comment_categories", {})
+    shares     = [sentiment.get(label, 0) for label in _SENTIMENT_COLUMNS]
+    created_at = datetime.now(tz=timezone.utc).isoformat()
     try:
-        with sqlite3.connect(DB_PATH) as conn:
-            conn.execute(
-                """
+        with _connect() as conn:
+            if cache_hit:
+                bumped = conn.execute(
+                    """
+                    UPDATE analyses SET hit_count = hit_count + 1, created_at = ?
+                    WHERE  id = (
+                        SELECT id FROM analyses
+                        WHERE  session_id = ? AND video_id = ?
+                        ORDER  BY created_at DESC, id DESC
+                        LIMIT  1
+                    )
+                    """,
+                    (created_at, session_id, video_id),
+                ).rowcount
+                if bumped:
+                    _bump_history_versions(conn, {session_id})
+                    conn.commit()
+                    return
+            cursor = conn.execute(
+                f"""
                 INSERT INTO analyses
                     (video_id, video_title, youtube_url, analysis_method,
                      total_comments, overall_sentiment, comment_categories,
-                     overall_insights, session_id, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                     overall_insights, session_id, created_at, cache_hit,
+                     {", ".join(_SENTIMENT_COLUMNS.values())})
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
                 (
                     video_id,
@@ -90,57 +498,326 @@ def save_analysis(video_id: str, data: dict, session_id: str = "") -> None:
                     data.get("youtube_url", ""),
                     data.get("analysis_method", ""),
                     data.get("total_comments", 0),
-                    json.dumps(data.get("overall_sentiment", {})),
-                    json.dumps(data.get("comment_categories", {})),
+                    json.dumps(sentiment),
+                    json.dumps(categories),
                     data.get("overall_insights", ""),
                     session_id,
-                    datetime.now(tz=timezone.utc).isoformat(),
+                    created_at,
+                    int(cache_hit),
+                    *shares,
                 ),
             )
+            conn.executemany(
+                "INSERT INTO analysis_categories (analysis_id, category, count) VALUES (?, ?, ?)",
+                [(cursor.lastrowid, category, count) for category, count in categories.items()],
+            )
+            if not cache_hit:
+                _update_rollup(conn, video_id, created_at[:10], data.get("total_comments", 0), shares)
+            _bump_history_versions(conn, {session_id})
             conn.commit()
         logger.info("Saved analysis for video %s (session %s).", video_id, session_id or "anonymous")
     except Exception:
         logger.exception("Failed to save analysis for video %s", video_id)
 
 
-def get_history(limit: int = 20, session_id: str = "") -> list[dict]:
+def _bump_history_versions(conn: sqlite3.Connection, session_ids: Iterable[str]) -> None:
+    """Advance the history version of each session (and of the all-sessions view)."""
+    conn.executemany(
+        "INSERT INTO history_versions (session_id, version) VALUES (?, 1) "
+        "ON CONFLICT (session_id) DO UPDATE SET version = version + 1",
+        [(session_id,) for session_id in {*session_ids, ""}],
+    )
+
+
+def _update_rollup(
+    conn: sqlite3.Connection, video_id: str, day: str, total_comments: int, shares: list[float]
+) -> None:
+    """Fold one analysis into its video's daily rollup row; the caller commits."""
+    conn.execute(
+        """
+        INSERT INTO video_daily_rollups
+            (video_id, day, analyses, total_comments,
+             sum_positive, sum_neutral, sum_negative, sum_mixed)
+        VALUES (?, ?, 1, ?, ?, ?, ?, ?)
+        ON CONFLICT(video_id, day) DO UPDATE SET
+            analyses       = analyses + 1,
+            total_comments = total_comments + excluded.total_comments,
+            sum_positive   = sum_positive + excluded.sum_positive,
+            sum_neutral    = sum_neutral  + excluded.sum_neutral,
+            sum_negative   = sum_negative + excluded.sum_negative,
+            sum_mixed      = sum_mixed    + excluded.sum_mixed
+        """,
+        (video_id, day, total_comments, *shares),
+    )
+
+
+def record_rollup(video_id: str, data: dict) -> None:
+    """
+    Count an analysis that gets no analyses row — a background refresh or a
+    cache warm-up — towards its video's daily rollup, so /trend keeps getting
+    points for videos that are mostly re-analysed off the request path.
+    """
+    sentiment = data.get("overall_sentiment", {})
+    shares    = [sentiment.get(label, 0) for label in _SENTIMENT_COLUMNS]
+    day       = datetime.now(tz=timezone.utc).isoformat()[:10]
+    try:
+        with _connect() as conn:
+            _update_rollup(conn, video_id, day, data.get("total_comments", 0), shares)
+            conn.commit()
+    except Exception:
+        logger.exception("Failed to update daily rollup for video %s", video_id)
+
+
+def save_aggregate_state(video_id: str, state: dict) -> None:
+    """
+    Store the mergeable aggregate state for a video, replacing any previous one.
+
+    Unlike the analyses summary rows there is exactly one state per video, so
+    later shards or incremental updates can be merged into it cheaply.
+    """
+    try:
+        with _connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO aggregate_states (video_id, state, updated_at)
+                VALUES (?, ?, ?)
+                ON CONFLICT(video_id) DO UPDATE SET
+                    state      = excluded.state,
+                    updated_at = excluded.updated_at
+                """,
+                (video_id, json.dumps(state), datetime.now(tz=timezone.utc).isoformat()),
+            )
+            conn.commit()
+    except Exception:
+        logger.exception("Failed to save aggregate state for video %s", video_id)
+
+
+def load_aggregate_state(video_id: str) -> dict | None:
+    """Return the stored aggregate state for a video, or None if there is none."""
+    try:
+        with _connect() as conn:
+            row = conn.execute(
+                "SELECT state FROM aggregate_states WHERE video_id = ?", (video_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+    except Exception:
+        logger.exception("Failed to load aggregate state for video %s", video_id)
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Result store — compressed full payloads (L2 behind the in-memory cache)
+# ---------------------------------------------------------------------------
+
+def _compress(raw: bytes) -> tuple[str, bytes]:
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=6).compress(raw)
+    return "zlib", zlib.compress(raw, 6)
+
+
+def _decompress(codec: str, payload: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("Stored result uses zstd but zstandard is not installed.")
+        return zstandard.ZstdDecompressor().decompress(payload)
+    return zlib.decompress(payload)
+
+
+def save_result(cache_key: str, result: dict) -> None:
+    """
+    Store a full /analyze payload under cache_key and the current ANALYSIS_VERSION.
+
+    After writing, the least recently read entries are evicted until the
+    store fits in RESULT_STORE_MAX_BYTES. Does nothing when the budget is 0.
+    """
+    if RESULT_STORE_MAX_BYTES <= 0:
+        return
+    codec, payload = _compress(json.dumps(result, separators=(",", ":")).encode())
+    if len(payload) > RESULT_STORE_MAX_BYTES:
+        return
+    now = time.time()
+    try:
+        with _connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO result_store
+                    (cache_key, version, codec, payload, stored_bytes, created_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(cache_key, version) DO UPDATE SET
+                    codec        = excluded.codec,
+                    payload      = excluded.payload,
+                    stored_bytes = excluded.stored_bytes,
+                    created_at   = excluded.created_at,
+                    last_access  = excluded.last_access
+                """,
+                (cache_key, ANALYSIS_VERSION, codec, payload, len(payload), now, now),
+            )
+            # Keep the newest-read rows whose running size fits the budget;
+            # rows from older ANALYSIS_VERSIONs can never be served, so go first.
+            conn.execute(
+                """
+                DELETE FROM result_store WHERE rowid IN (
+                    SELECT rowid FROM (
+                        SELECT rowid, version,
+                               SUM(stored_bytes) OVER (
+                                   ORDER BY version = ? DESC, last_access DESC, rowid DESC
+                               ) AS running
+                        FROM   result_store
+                    )
+                    WHERE running > ? OR version != ?
+                )
+                """,
+                (ANALYSIS_VERSION, RESULT_STORE_MAX_BYTES, ANALYSIS_VERSION),
+            )
+            conn.commit()
+    except Exception:
+        logger.exception("Failed to store result for %s", cache_key)
+
+
+def load_result(cache_key: str) -> dict | None:
+    """
+    Return the stored payload for cache_key, or None if it is missing, older
+    than RESULT_STORE_TTL_SECONDS or from another ANALYSIS_VERSION.
+    A hit refreshes the entry's position in the eviction order.
+    """
+    entry = load_result_entry(cache_key)
+    return entry[0] if entry is not None else None
+
+
+def load_result_entry(cache_key: str) -> tuple[dict, float] | None:
+    """Like load_result, but returns (payload, created_at epoch seconds)."""
+    if RESULT_STORE_MAX_BYTES <= 0:
+        return None
+    now = time.time()
+    try:
+        with _connect() as conn:
+            row = conn.execute(
+                """
+                SELECT codec, payload, created_at FROM result_store
+                WHERE  cache_key = ? AND version = ? AND created_at > ?
+                """,
+                (cache_key, ANALYSIS_VERSION, now - RESULT_STORE_TTL_SECONDS),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE result_store SET last_access = ? WHERE cache_key = ? AND version = ?",
+                (now, cache_key, ANALYSIS_VERSION),
+            )
+            conn.commit()
+        return json.loads(_decompress(row["codec"], row["payload"])), row["created_at"]
+    except Exception:
+        logger.exception("Failed to load stored result for %s", cache_key)
+        return None
+
+
+def has_stored_result(cache_key: str) -> bool:
+    """
+    True if load_result would return a payload for cache_key. Reads only the
+    key columns and leaves the eviction order alone, so it is cheap enough
+    for the rate-limit cost probe.
+    """
+    if RESULT_STORE_MAX_BYTES <= 0:
+        return False
+    try:
+        with _connect() as conn:
+            row = conn.execute(
+                """
+                SELECT 1 FROM result_store
+                WHERE  cache_key = ? AND version = ? AND created_at > ?
+                """,
+                (cache_key, ANALYSIS_VERSION, time.time() - RESULT_STORE_TTL_SECONDS),
+            ).fetchone()
+        return row is not None
+    except Exception:
+        logger.exception("Failed to probe stored result for %s", cache_key)
+        return False
+
+
+def get_result_store_size() -> int:
+    """Return the total compressed bytes held in the result store."""
+    try:
+        with _connect() as conn:
+            return conn.execute(
+                "SELECT COALESCE(SUM(stored_bytes), 0) FROM result_store"
+            ).fetchone()[0]
+    except Exception:
+        return 0
+
+
+# ---------------------------------------------------------------------------
+# History
+# ---------------------------------------------------------------------------
+
+def encode_history_cursor(record: dict) -> str:
+    """Return the opaque /history cursor that resumes after the given record."""
+    raw = f"{record['created_at']}|{record['id']}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_history_cursor(cursor: str) -> tuple[str, int]:
+    """Decode a /history cursor into (created_at, id). Raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, _, row_id = raw.rpartition("|")
+        datetime.fromisoformat(created_at)
+        return created_at, int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid history cursor.") from e
+
+
+def get_history(limit: int = 20, session_id: str = "", before: str | None = None) -> list[dict]:
     """
     Return the most recent analyses for a given session, newest first.
     When session_id is empty all records are returned (dev/admin fallback).
-    overall_sentiment and comment_categories are decoded from JSON.
+    overall_sentiment is built from the typed columns and comment_categories
+    from analysis_categories — one extra query per page, no JSON decoding.
+
+    before is a cursor from encode_history_cursor(); only records strictly
+    older than it are returned (keyset pagination on created_at, id).
+    Raises ValueError for a malformed cursor.
     """
+    where, params = [], []
+    if session_id:
+        where.append("session_id = ?")
+        params.append(session_id)
+    if before:
+        where.append("(created_at, id) < (?, ?)")
+        params.extend(decode_history_cursor(before))
+    where_sql = f"WHERE  {' AND '.join(where)}" if where else ""
+
     try:
-        with sqlite3.connect(DB_PATH) as conn:
-            conn.row_factory = sqlite3.Row
-            if session_id:
-                rows = conn.execute(
-                    """
-                    SELECT id, video_id, video_title, youtube_url, analysis_method,
-                           total_comments, overall_sentiment, comment_categories, created_at
-                    FROM   analyses
-                    WHERE  session_id = ?
-                    ORDER  BY created_at DESC
-                    LIMIT  ?
-                    """,
-                    (session_id, limit),
-                ).fetchall()
-            else:
-                rows = conn.execute(
-                    """
-                    SELECT id, video_id, video_title, youtube_url, analysis_method,
-                           total_comments, overall_sentiment, comment_categories, created_at
-                    FROM   analyses
-                    ORDER  BY created_at DESC
-                    LIMIT  ?
-                    """,
-                    (limit,),
-                ).fetchall()
+        with _connect() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT id, video_id, video_title, youtube_url, analysis_method,
+                       total_comments, hit_count, created_at,
+                       {", ".join(_SENTIMENT_COLUMNS.values())}
+                FROM   analyses
+                {where_sql}
+                ORDER  BY created_at DESC, id DESC
+                LIMIT  ?
+                """,
+                (*params, limit),
+            ).fetchall()
+
+            categories: dict[int, dict] = {row["id"]: {} for row in rows}
+            if categories:
+                placeholders = ", ".join("?" * len(categories))
+                for analysis_id, category, count in conn.execute(
+                    f"SELECT analysis_id, category, count FROM analysis_categories "
+                    f"WHERE analysis_id IN ({placeholders})",
+                    tuple(categories),
+                ):
+                    categories[analysis_id][category] = count
 
         records = []
         for row in rows:
-            record = dict(row)
-            record["overall_sentiment"]   = json.loads(record["overall_sentiment"])
-            record["comment_categories"]  = json.loads(record["comment_categories"])
+            record = {key: row[key] for key in row.keys() if key not in _SENTIMENT_COLUMNS.values()}
+            record["overall_sentiment"]  = {
+                label: row[column] for label, column in _SENTIMENT_COLUMNS.items()
+            }
+            record["comment_categories"] = categories[row["id"]]
             records.append(record)
         return records
 
@@ -149,10 +826,623 @@ def get_history(limit: int = 20, session_id: str = "") -> list[dict]:
         return []
 
 
+def get_history_version(session_id: str = "") -> str:
+    """
+    Return a token that changes whenever the session's history could have
+    changed: the session's history_versions counter (bumped by every save,
+    cache-hit bump, import and prune) plus the (created_at, id) of its newest
+    row. Two index seeks — the cost does not grow with the session's size.
+    """
+    where = "WHERE session_id = ?" if session_id else ""
+    params = (session_id,) if session_id else ()
+    try:
+        with _connect() as conn:
+            counter = conn.execute(
+                "SELECT version FROM history_versions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            top = conn.execute(
+                f"SELECT created_at, id FROM analyses {where} "
+                "ORDER BY created_at DESC, id DESC LIMIT 1",
+                params,
+            ).fetchone()
+        newest, top_id = top if top else ("", 0)
+        return f"{counter[0] if counter else 0}:{newest}:{top_id}"
+    except Exception:
+        logger.exception("Failed to read history version")
+        return ""
+
+
+def get_sentiment_trend(video_id: str, days: int | None = None) -> list[dict]:
+    """
+    Return a video's per-UTC-day rollups, oldest first:
+        [{"day": "2024-01-01", "analyses": 3, "total_comments": 1500,
+          "Positive": 61.2, "Neutral": ..., "Negative": ..., "Mixed": ...}, ...]
+    Shares are the mean over that day's analyses. Reads only
+    video_daily_rollups, so cost is O(days) regardless of analysis count.
+    days limits the result to the most recent N days that have data.
+    """
+    try:
+        with _connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT * FROM (
+                    SELECT day, analyses, total_comments,
+                           sum_positive, sum_neutral, sum_negative, sum_mixed
+                    FROM   video_daily_rollups
+                    WHERE  video_id = ?
+                    ORDER  BY day DESC
+                    LIMIT  ?
+                ) ORDER BY day
+                """,
+                (video_id, days if days is not None else -1),
+            ).fetchall()
+        return [
+            {
+                "day":            row["day"],
+                "analyses":       row["analyses"],
+                "total_comments": row["total_comments"],
+                **{
+                    label: round(row[column] / row["analyses"], 2)
+                    for label, column in _ROLLUP_SUM_COLUMNS.items()
+                },
+            }
+            for row in rows
+        ]
+    except Exception:
+        logger.exception("Failed to read sentiment trend for video %s", video_id)
+        return []
+
+
+def get_category_totals(session_id: str = "") -> dict:
+    """
+    Return {category: total comments} summed over a session's analyses
+    (all analyses when session_id is empty), largest first.
+    """
+    where = "WHERE a.session_id = ?" if session_id else ""
+    try:
+        with _connect() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT c.category, SUM(c.count) AS total
+                FROM   analysis_categories AS c
+                JOIN   analyses AS a ON a.id = c.analysis_id
+                {where}
+                GROUP  BY c.category
+                ORDER  BY total DESC, c.category
+                """,
+                (session_id,) if session_id else (),
+            ).fetchall()
+        return {category: total for category, total in rows}
+    except Exception:
+        logger.exception("Failed to compute category totals")
+        return {}
+
+
+def get_popular_videos(limit: int, since_days: int) -> list[dict]:
+    """
+    Return the most-requested videos of the last since_days days, most first:
+        [{"video_id": ..., "youtube_url": ..., "requests": 12}, ...]
+    requests sums hit_count over every session's row for the video.
+    """
+    cutoff = datetime.fromtimestamp(time.time() - since_days * 86400, tz=timezone.utc).isoformat()
+    try:
+        with _connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT video_id, MAX(youtube_url) AS youtube_url, SUM(hit_count) AS requests
+                FROM   analyses
+                WHERE  created_at >= ?
+                GROUP  BY video_id
+                ORDER  BY requests DESC, video_id
+                LIMIT  ?
+                """,
+                (cutoff, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+    except Exception:
+        logger.exception("Failed to read popular videos")
+        return []
+
+
+def claim_warmup_slot(slot: str) -> bool:
+    """True for exactly one caller per slot, across every worker process."""
+    try:
+        with _connect() as conn:
+            claimed = conn.execute(
+                "INSERT OR IGNORE INTO warmup_runs (slot, claimed_at) VALUES (?, ?)",
+                (slot, time.time()),
+            ).rowcount
+            conn.commit()
+        return claimed == 1
+    except Exception:
+        logger.exception("Failed to claim warm-up slot %s", slot)
+        return False
+
+
+def claim_refresh(cache_key: str, lease_seconds: float) -> bool:
+    """
+    True if this caller may refresh cache_key: no other worker holds the
+    claim, or its claim is older than lease_seconds. Pair with release_refresh.
+    """
+    now = time.time()
+    try:
+        with _connect() as conn:
+            claimed = conn.execute(
+                """
+                INSERT INTO refresh_claims (cache_key, claimed_at) VALUES (?, ?)
+                ON CONFLICT(cache_key) DO UPDATE SET claimed_at = excluded.claimed_at
+                WHERE claimed_at < ?
+                """,
+                (cache_key, now, now - lease_seconds),
+            ).rowcount
+            conn.commit()
+        return claimed == 1
+    except Exception:
+        logger.exception("Failed to claim refresh of %s", cache_key)
+        return False
+
+
+def release_refresh(cache_key: str) -> None:
+    """Drops the refresh claim on cache_key."""
+    try:
+        with _connect() as conn:
+            conn.execute("DELETE FROM refresh_claims WHERE cache_key = ?", (cache_key,))
+            conn.commit()
+    except Exception:
+        logger.exception("Failed to release refresh claim on %s", cache_key)
+
+
+# ---------------------------------------------------------------------------
+# Full-text search
+# ---------------------------------------------------------------------------
+
+def index_search_documents(video_id: str, comments: list[dict], insights: str = "") -> None:
+    """
+    Replace the indexed text for a video with its latest analysis: one
+    document per comment (with its sentiment and category) plus one for the
+    overall insights. Runs in a single transaction; triggers update search_fts.
+    """
+    docs = [
+        (video_id, "comment", c.get("sentiment", ""), c.get("category", ""), c["comment"])
+        for c in comments
+        if c.get("comment")
+    ]
+    if insights:
+        docs.append((video_id, "insights", "", "", insights))
+    try:
+        with _connect() as conn:
+            conn.execute("DELETE FROM search_docs WHERE video_id = ?", (video_id,))
+            conn.executemany(
+                "INSERT INTO search_docs (video_id, kind, sentiment, category, body) "
+                "VALUES (?, ?, ?, ?, ?)",
+                docs,
+            )
+            conn.commit()
+    except Exception:
+        logger.exception("Failed to index search documents for video %s", video_id)
+
+
+def _fts_query(query: str) -> str:
+    """
+    Turn free text into a safe FTS5 expression: every word becomes a quoted
+    term and all terms must match, so user input can never be parsed as FTS
+    syntax. A trailing * on the last word keeps its prefix-search meaning.
+    """
+    terms = _SEARCH_TERM_RE.findall(query)
+    if not terms:
+        return ""
+    expression = " ".join(f'"{term}"' for term in terms)
+    return expression + "*" if query.rstrip().endswith("*") else expression
+
+
+def _render_snippet(raw: str) -> str:
+    """HTML-escape a snippet, then turn the match markers into <mark> tags."""
+    return (
+        html.escape(raw)
+        .replace(_SNIPPET_OPEN, "<mark>")
+        .replace(_SNIPPET_CLOSE, "</mark>")
+    )
+
+
+def search_documents(
+    query: str, limit: int = 20, offset: int = 0, video_id: str = "", session_id: str | None = None
+) -> list[dict]:
+    """
+    Return indexed comments/insights matching query, best match first (BM25):
+        [{"video_id", "video_title", "kind", "sentiment", "category",
+          "snippet", "score"}, ...]
+    snippet is HTML-safe with matched terms wrapped in <mark>. video_id
+    restricts the search to one video. Returns [] for an empty query.
+
+    session_id restricts results (and titles) to videos that session has
+    analysed, as /history does; "" is the anonymous session. None searches
+    everything — for offline tooling only, never a request.
+    """
+    expression = _fts_query(query)
+    if not expression:
+        return []
+    filters, params = [], [expression]
+    if video_id:
+        filters.append("AND d.video_id = ?")
+        params.append(video_id)
+    if session_id is not None:
+        filters.append(
+            "AND EXISTS (SELECT 1 FROM analyses AS a "
+            "WHERE a.session_id = ? AND a.video_id = d.video_id)"
+        )
+        params.append(session_id)
+    title_filter = "AND session_id = ?" if session_id is not None else ""
+    title_params = (session_id,) if session_id is not None else ()
+    try:
+        with _connect() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT d.video_id, d.kind, d.sentiment, d.category,
+                       snippet(search_fts, 0, ?, ?, '…', 16) AS snippet,
+                       bm25(search_fts) AS score
+                FROM   search_fts
+                JOIN   search_docs AS d ON d.id = search_fts.rowid
+                WHERE  search_fts MATCH ? {" ".join(filters)}
+                ORDER  BY rank
+                LIMIT  ? OFFSET ?
+                """,
+                (_SNIPPET_OPEN, _SNIPPET_CLOSE, *params, limit, offset),
+            ).fetchall()
+
+            titles = {}
+            for vid in {row["video_id"] for row in rows}:
+                title = conn.execute(
+                    f"SELECT video_title FROM analyses WHERE video_id = ? {title_filter} "
+                    "ORDER BY id DESC LIMIT 1",
+                    (vid, *title_params),
+                ).fetchone()
+                titles[vid] = title[0] if title else ""
+
+        return [
+            {
+                "video_id":    row["video_id"],
+                "video_title": titles[row["video_id"]],
+                "kind":        row["kind"],
+                "sentiment":   row["sentiment"],
+                "category":    row["category"],
+                "snippet":     _render_snippet(row["snippet"]),
+                "score":       round(-row["score"], 4),   # bm25() is lower-is-better
+            }
+            for row in rows
+        ]
+    except Exception:
+        logger.exception("Search failed for query %r", query)
+        return []
+
+
+# ---------------------------------------------------------------------------
+# Bulk export / import
+# ---------------------------------------------------------------------------
+
+def iter_analyses(batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[dict]:
+    """
+    Yield every analysis as an export record, oldest first.
+
+    Rows are read in keyset batches on id, each on a briefly held pooled
+    connection, so memory is bounded by batch_size and a slow consumer never
+    pins a WAL snapshot (which would stop checkpoints) for the whole export.
+    """
+    last_id = 0
+    while True:
+        with _connect() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT id, video_id, video_title, youtube_url, analysis_method,
+                       total_comments, overall_insights, session_id, created_at,
+                       hit_count, cache_hit, {", ".join(_SENTIMENT_COLUMNS.values())}
+                FROM   analyses
+                WHERE  id > ?
+                ORDER  BY id
+                LIMIT  ?
+                """,
+                (last_id, batch_size),
+            ).fetchall()
+            if not rows:
+                return
+            categories: dict[int, dict] = {row["id"]: {} for row in rows}
+            for analysis_id, category, count in conn.execute(
+                "SELECT analysis_id, category, count FROM analysis_categories "
+                "WHERE analysis_id BETWEEN ? AND ?",
+                (rows[0]["id"], rows[-1]["id"]),
+            ):
+                categories[analysis_id][category] = count
+
+        for row in rows:
+            yield {
+                "type":               "analysis",
+                "video_id":           row["video_id"],
+                "video_title":        row["video_title"],
+                "youtube_url":        row["youtube_url"],
+                "analysis_method":    row["analysis_method"],
+                "total_comments":     row["total_comments"],
+                "overall_sentiment":  {
+                    label: row[column] for label, column in _SENTIMENT_COLUMNS.items()
+                },
+                "comment_categories": categories[row["id"]],
+                "overall_insights":   row["overall_insights"],
+                "session_id":         row["session_id"],
+                "created_at":         row["created_at"],
+                "hit_count":          row["hit_count"],
+                "cache_hit":          row["cache_hit"],
+            }
+        last_id = rows[-1]["id"]
+
+
+def iter_comments(batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[dict]:
+    """Yield every indexed comment and insight summary as an export record."""
+    last_id = 0
+    while True:
+        with _connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT id, video_id, kind, sentiment, category, body
+                FROM   search_docs
+                WHERE  id > ?
+                ORDER  BY id
+                LIMIT  ?
+                """,
+                (last_id, batch_size),
+            ).fetchall()
+        if not rows:
+            return
+        for row in rows:
+            yield {
+                "type":      "comment",
+                "video_id":  row["video_id"],
+                "source":    row["kind"],
+                "sentiment": row["sentiment"],
+                "category":  row["category"],
+                "text":      row["body"],
+            }
+        last_id = rows[-1]["id"]
+
+
+def _import_batch(conn: sqlite3.Connection, batch: list[dict], counts: dict, docs_before: int) -> None:
+    """
+    docs_before is the highest search_docs id when the import started:
+    comments already indexed up to it are skipped, while repeated comments
+    within the file itself (a video can have two identical ones) are kept.
+    """
+    for record in batch:
+        if record["type"] == "comment":
+            kind = record.get("source", "comment")
+            duplicate = conn.execute(
+                "SELECT 1 FROM search_docs WHERE video_id = ? AND kind = ? AND body = ? AND id <= ?",
+                (record["video_id"], kind, record["text"], docs_before),
+            ).fetchone()
+            if duplicate:
+                counts["skipped"] += 1
+                continue
+            conn.execute(
+                "INSERT INTO search_docs (video_id, kind, sentiment, category, body) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (record["video_id"], kind,
+                 record.get("sentiment", ""), record.get("category", ""), record["text"]),
+            )
+            counts["comments"] += 1
+            continue
+
+        session_id, created_at = record.get("session_id", ""), record["created_at"]
+        datetime.fromisoformat(created_at)
+        duplicate = conn.execute(
+            "SELECT 1 FROM analyses WHERE session_id = ? AND created_at = ? AND video_id = ?",
+            (session_id, created_at, record["video_id"]),
+        ).fetchone()
+        if duplicate:
+            counts["skipped"] += 1
+            continue
+
+        sentiment  = record.get("overall_sentiment", {})
+        categories = record.get("comment_categories", {})
+        shares     = [sentiment.get(label, 0) for label in _SENTIMENT_COLUMNS]
+        cache_hit  = int(bool(record.get("cache_hit", 0)))
+        cursor = conn.execute(
+            f"""
+            INSERT INTO analyses
+                (video_id, video_title, youtube_url, analysis_method,
+                 total_comments, overall_sentiment, comment_categories,
+                 overall_insights, session_id, created_at, hit_count, cache_hit,
+                 {", ".join(_SENTIMENT_COLUMNS.values())})
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                record["video_id"],
+                record.get("video_title", ""),
+                record.get("youtube_url", ""),
+                record.get("analysis_method", ""),
+                record.get("total_comments", 0),
+                json.dumps(sentiment),
+                json.dumps(categories),
+                record.get("overall_insights", ""),
+                session_id,
+                created_at,
+                record.get("hit_count", 1),
+                cache_hit,
+                *shares,
+            ),
+        )
+        conn.executemany(
+            "INSERT INTO analysis_categories (analysis_id, category, count) VALUES (?, ?, ?)",
+            [(cursor.lastrowid, category, count) for category, count in categories.items()],
+        )
+        if not cache_hit:           # rolled up only if it was when first saved
+            _update_rollup(conn, record["video_id"], created_at[:10],
+                           record.get("total_comments", 0), shares)
+        _bump_history_versions(conn, {session_id})
+        counts["analyses"] += 1
+
+
+def import_records(records: Iterable[dict], batch_size: int = EXPORT_BATCH_SIZE) -> dict:
+    """
+    Insert export records in batches of batch_size, one transaction each.
+
+    Analyses already present (same session, video and created_at) and
+    comments already indexed (same video, source and text) are skipped, so
+    re-importing an export is harmless. Analyses that were cache hits are
+    left out of the daily rollups, as they were when first saved. Returns
+    {"analyses": n, "comments": n, "skipped": n}. A malformed record raises
+    ValueError/KeyError; batches committed before it are kept.
+    """
+    counts = {"analyses": 0, "comments": 0, "skipped": 0}
+    with _connect() as conn:
+        try:
+            docs_before = conn.execute("SELECT COALESCE(MAX(id), 0) FROM search_docs").fetchone()[0]
+        except sqlite3.OperationalError:        # built without FTS5 — no search_docs
+            docs_before = 0
+    batch: list[dict] = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            with _connect() as conn:
+                _import_batch(conn, batch, counts, docs_before)
+                conn.commit()
+            batch = []
+    if batch:
+        with _connect() as conn:
+            _import_batch(conn, batch, counts, docs_before)
+            conn.commit()
+    logger.info("Imported %(analyses)d analyses and %(comments)d comments "
+                "(%(skipped)d duplicates skipped).", counts)
+    return counts
+
+
+# ---------------------------------------------------------------------------
+# Retention
+# ---------------------------------------------------------------------------
+
+def _forget_deleted(conn: sqlite3.Connection, rows: list[sqlite3.Row]) -> None:
+    """
+    Bookkeeping for a batch of deleted analyses, given their (session_id,
+    video_id): bump the affected sessions' history versions, and drop the
+    aggregate state and search documents of any video that has no analyses
+    left — otherwise /search would keep returning pruned videos forever.
+    """
+    if not rows:
+        return
+    _bump_history_versions(conn, {row[0] for row in rows})
+    videos = tuple({row[1] for row in rows})
+    placeholders = ", ".join("?" * len(videos))
+    for table in ("aggregate_states", "search_docs"):
+        try:
+            conn.execute(
+                f"DELETE FROM {table} WHERE video_id IN ({placeholders}) "
+                f"AND NOT EXISTS (SELECT 1 FROM analyses WHERE analyses.video_id = {table}.video_id)",
+                videos,
+            )
+        except sqlite3.OperationalError:        # built without FTS5 — no search_docs
+            pass
+
+
+def _delete_in_batches(select_ids: str, params: tuple, batch_size: int) -> int:
+    """
+    Repeatedly delete up to batch_size analyses chosen by select_ids, one short
+    transaction per batch so a large prune never holds the write lock for long.
+    Category rows go with them via ON DELETE CASCADE; see _forget_deleted for
+    the rest of the bookkeeping, done in the same transaction.
+    """
+    deleted = 0
+    while True:
+        with _connect() as conn:
+            rows = conn.execute(
+                f"DELETE FROM analyses WHERE id IN ({select_ids} LIMIT ?) "
+                "RETURNING session_id, video_id",
+                (*params, batch_size),
+            ).fetchall()
+            count = len(rows)
+            _forget_deleted(conn, rows)
+            conn.commit()
+        deleted += count
+        if count < batch_size:
+            return deleted
+
+
+def _delete_ids(ids: list[int], batch_size: int) -> int:
+    """Delete the given analyses, batch_size ids per short write transaction."""
+    deleted = 0
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start : start + batch_size]
+        with _connect() as conn:
+            rows = conn.execute(
+                f"DELETE FROM analyses WHERE id IN ({', '.join('?' * len(batch))}) "
+                "RETURNING session_id, video_id",
+                batch,
+            ).fetchall()
+            _forget_deleted(conn, rows)
+            conn.commit()
+        deleted += len(rows)
+    return deleted
+
+
+def prune(
+    max_age_days: int = RETENTION_MAX_AGE_DAYS,
+    max_rows_per_session: int = RETENTION_MAX_ROWS_PER_SESSION,
+    batch_size: int = PRUNE_BATCH_SIZE,
+) -> int:
+    """
+    Apply the retention policy and return the number of analyses deleted.
+
+    Removes analyses older than max_age_days, then each session's rows beyond
+    its newest max_rows_per_session (0 disables either rule), plus expired
+    result-store entries. A video left with no analyses also loses its
+    aggregate state and search documents. Daily rollups are kept — they are
+    the long-term record. Freed pages are then returned to the filesystem incrementally.
+    """
+    deleted = 0
+    try:
+        if max_age_days > 0:
+            cutoff = datetime.fromtimestamp(
+                time.time() - max_age_days * 86400, tz=timezone.utc
+            ).isoformat()
+            deleted += _delete_in_batches(
+                "SELECT id FROM analyses WHERE created_at < ?", (cutoff,), batch_size
+            )
+        if max_rows_per_session > 0:
+            # The window runs over the whole table, so it runs once, in a
+            # read (which doesn't block writers under WAL); only the short
+            # id-batch deletes take the write lock.
+            with _connect() as conn:
+                victims = [row[0] for row in conn.execute(
+                    """
+                    SELECT id FROM (
+                        SELECT id, ROW_NUMBER() OVER (
+                                   PARTITION BY session_id ORDER BY created_at DESC, id DESC
+                               ) AS position
+                        FROM   analyses
+                    )
+                    WHERE position > ?
+                    """,
+                    (max_rows_per_session,),
+                )]
+            deleted += _delete_ids(victims, batch_size)
+        with _connect() as conn:
+            conn.execute(
+                "DELETE FROM result_store WHERE created_at < ?",
+                (time.time() - RESULT_STORE_TTL_SECONDS,),
+            )
+            conn.commit()
+            free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            while free_pages:
+                conn.execute(f"PRAGMA incremental_vacuum({batch_size})").fetchall()
+                remaining = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                if remaining >= free_pages:     # not in incremental mode — nothing to reclaim
+                    break
+                free_pages = remaining
+        if deleted:
+            logger.info("Pruned %d analyses past retention.", deleted)
+    except Exception:
+        logger.exception("Failed to prune analyses")
+    return deleted
+
+
 def get_record_count() -> int:
     """Return the total number of stored analyses (useful for tests)."""
     try:
-        with sqlite3.connect(DB_PATH) as conn:
+        with _connect() as conn:
             return conn.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
     except Exception:
         return 0
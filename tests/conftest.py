@@ -3,6 +3,7 @@ Shared pytest fixtures for Vidalyze tests.
 """
 import os
 import sys
+import tempfile
 from unittest.mock import MagicMock
 
 import pytest
@@ -14,6 +15,10 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # This ensures config.py reads "test-yt-key" instead of None.
 os.environ.setdefault("YOUTUBE_API_KEY", "test-yt-key")
 os.environ.setdefault("GEMINI_API_KEY", "")   # empty → TextBlob fallback path
+os.environ.setdefault("PRUNE_INTERVAL_SECONDS", "0")   # no background pruner in tests
+# Importing app runs init_db(); keep it (and ratelimit.db, profiles/) out of
+# the repo root. Tests that need a database patch storage.DB_PATH as well.
+os.environ.setdefault("DB_DIR", tempfile.mkdtemp(prefix="vidalyze-tests-"))
 
 
 @pytest.fixture(scope="session")
@@ -61,6 +66,15 @@ def sample_comments():
     ]
 
 
+@pytest.fixture
+def sample_fetched(sample_comments):
+    """sample_comments as fetch_youtube_comments returns them — newest first, one per day."""
+    return [
+        {"comment": text, "published_at": f"2024-01-{len(sample_comments) - i:02d}T12:00:00Z"}
+        for i, text in enumerate(sample_comments)
+    ]
+
+
 @pytest.fixture
 def sample_categorized(sample_comments):
     """Pre-built categorized comment list (TextBlob fallback style)."""
@@ -87,7 +101,10 @@ def mock_youtube_service():
     }
     service.commentThreads().list().execute.return_value = {
         "items": [
-            {"snippet": {"topLevelComment": {"snippet": {"textDisplay": f"Comment {i}"}}}}
+            {"snippet": {"topLevelComment": {"snippet": {
+                "textDisplay": f"Comment {i}",
+                "publishedAt": f"2024-01-0{5 - i}T12:00:00Z",
+            }}}}
             for i in range(5)
         ],
         "nextPageToken": None,
@@ -0,0 +1,156 @@
+"""
+Tests for asgi.py — the async serving mode. Requests are driven straight
+through the ASGI callable (no server), with YouTube and Gemini mocked.
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+async def call(path, method="GET", body=b"", headers=(), query=b""):
+    """Sends one request through asgi.application and collects the response."""
+    import asgi
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http", "method": method, "path": path, "query_string": query,
+        "headers": [(k.encode(), v.encode()) for k, v in headers],
+        "client": ("127.0.0.1", 1234), "server": ("testserver", 80),
+    }
+    await asgi.application(scope, receive, send)
+    start = sent[0]
+    return (
+        start["status"],
+        {k.decode(): v.decode() for k, v in start["headers"]},
+        b"".join(m.get("body", b"") for m in sent[1:]),
+    )
+
+
+def form(url):
+    return (
+        f"youtube_url={url}".encode(),
+        [("content-type", "application/x-www-form-urlencoded")],
+    )
+
+
+@pytest.fixture
+def tmp_db(tmp_path, app):
+    db_file = tmp_path / "test_vidalyze.db"
+    with patch("storage.DB_PATH", db_file):
+        import storage
+        storage.init_db()
+        yield db_file
+
+
+# ---------------------------------------------------------------------------
+# Async routes
+# ---------------------------------------------------------------------------
+
+class TestAsyncRoutes:
+    def test_index(self, app):
+        status, headers, body = asyncio.run(call("/", headers=[("accept-encoding", "identity")]))
+        assert status == 200
+        assert headers["content-type"].startswith("text/html")
+        assert b"<html" in body
+
+    def test_history(self, tmp_db):
+        import storage
+        with patch("storage.DB_PATH", tmp_db):
+            storage.save_analysis("dQw4w9WgXcQ", {"video_title": "T"})
+            status, _, body = asyncio.run(call("/history"))
+        assert status == 200
+        assert json.loads(body)[0]["video_id"] == "dQw4w9WgXcQ"
+
+    def test_analyze_validation_error(self, app):
+        body, headers = form("not-a-url")
+        status, _, payload = asyncio.run(call("/analyze", "POST", body, headers))
+        assert status == 400
+        assert "Invalid YouTube URL" in json.loads(payload)["error"]
+
+    def test_before_request_hooks_run_off_the_loop(self, app):
+        import threading
+        loop_thread, hook_threads = threading.get_ident(), []
+        with patch.object(app, "before_request_funcs", {None: [lambda: hook_threads.append(threading.get_ident())]}):
+            status, _, _ = asyncio.run(call("/analyze", "POST", *form("not-a-url")))
+        assert status == 400
+        assert hook_threads and hook_threads[0] != loop_thread
+
+    def test_analyzes_run_concurrently(self, tmp_db, sample_fetched, sample_categorized):
+        async def slow_gemini(texts):
+            await asyncio.sleep(0.3)
+            return [dict(c) for c in sample_categorized]
+
+        ids = [f"vid{i:08d}" for i in range(20)]
+
+        async def run_all():
+            requests = [call("/analyze", "POST", *form(f"https://youtu.be/{vid}")) for vid in ids]
+            return await asyncio.gather(*requests)
+
+        with patch("storage.DB_PATH", tmp_db), patch("app._set_cached"), \
+             patch("app._get_cached", return_value=None), \
+             patch("app.build_youtube_service"), patch("app.fetch_video_title", return_value="V"), \
+             patch("app.fetch_youtube_comments", return_value=(sample_fetched, None)), \
+             patch("app.GEMINI_API_KEY", "key"), \
+             patch("app.analyze_sentiment_gemini_async", side_effect=slow_gemini), \
+             patch("app.generate_insights_gemini_async", return_value="insights"), \
+             patch("app.generate_highlights_gemini_async", return_value={}):
+            started = time.perf_counter()
+            responses = asyncio.run(run_all())
+            elapsed = time.perf_counter() - started
+
+        assert [status for status, _, _ in responses] == [200] * len(ids)
+        assert {json.loads(body)["video_id"] for _, _, body in responses} == set(ids)
+        assert all(json.loads(body)["analysis_method"] == "Gemini" for _, _, body in responses)
+        # 20 × 0.3 s serially; overlapping they finish in roughly one wait.
+        assert elapsed < 2.0
+
+
+class TestLifespan:
+    def test_startup_starts_background_threads(self, app):
+        import asgi
+        messages = iter([{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}])
+        sent = []
+
+        async def receive():
+            return next(messages)
+
+        async def send(message):
+            sent.append(message["type"])
+
+        with patch("app.start_background_threads") as start:
+            asyncio.run(asgi.application({"type": "lifespan"}, receive, send))
+        start.assert_called_once_with()
+        assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+
+
+# ---------------------------------------------------------------------------
+# WSGI fallback
+# ---------------------------------------------------------------------------
+
+class TestWsgiFallback:
+    def test_sync_route_served(self, app):
+        status, headers, body = asyncio.run(call("/static/favicon.svg"))
+        assert status == 200
+        assert b"<svg" in body
+
+    def test_query_string_passed_through(self, app):
+        status, _, body = asyncio.run(call("/search", query=b"q="))
+        assert status == 400
+        assert "error" in json.loads(body)
+
+    def test_unknown_route_404(self, app):
+        status, _, _ = asyncio.run(call("/nope"))
+        assert status == 404
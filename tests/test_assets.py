@@ -0,0 +1,180 @@
+"""
+Tests for assets.py — minification, the fingerprinted build and URL
+lookup — plus the cached index page and the /static/dist route in app.py.
+"""
+import gzip
+import hashlib
+import json
+import os
+import sys
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import assets
+
+
+@pytest.fixture
+def static_dir(tmp_path):
+    """A static/ tree with every source and vendor file the build expects."""
+    (tmp_path / "css").mkdir()
+    (tmp_path / "js").mkdir()
+    (tmp_path / "vendor").mkdir()
+    (tmp_path / "css" / "app.css").write_text("/* tokens */\n.a > .b {\n    color: red;\n}\n" * 50)
+    (tmp_path / "js" / "app.js").write_text("// setup\nconst a = 1;\n\n    run(a);\n" * 50)
+    pins = []
+    for name in assets.VENDOR:
+        content = _vendor_content(name)
+        (tmp_path / name).write_bytes(content)
+        pins.append(f"{hashlib.sha256(content).hexdigest()}  {name}\n")
+    (tmp_path / assets.VENDOR_DIGESTS).write_text("".join(pins))
+    return tmp_path
+
+
+def _vendor_content(name: str) -> bytes:
+    return (f"/* {name} */" + "x" * 1000).encode()
+
+
+# ---------------------------------------------------------------------------
+# Minification
+# ---------------------------------------------------------------------------
+
+class TestMinify:
+    def test_css_strips_comments_and_whitespace(self):
+        css = "/* c */\n.a > .b,\n.c {\n    color: red;\n    margin: 0 auto;\n}\n"
+        assert assets.minify_css(css) == ".a>.b,.c{color:red;margin:0 auto}"
+
+    def test_css_keeps_media_query_spacing(self):
+        css = "@media (min-width: 1024px) and (hover: hover) {\n    .a { top: 0; }\n}"
+        assert assets.minify_css(css) == "@media (min-width:1024px) and (hover:hover){.a{top:0}}"
+
+    def test_js_keeps_line_breaks(self):
+        js = "// comment\nlet a = 1\n\n    [a].forEach(run)\n"
+        assert assets.minify_js(js) == "let a = 1\n[a].forEach(run)\n"
+
+    def test_js_leaves_template_literals_alone(self):
+        js = "const t = `\n    <pre>\n    // not a comment\n    </pre>`;\n    done();\n"
+        assert assets.minify_js(js) == "const t = `\n    <pre>\n    // not a comment\n    </pre>`;\ndone();\n"
+
+
+# ---------------------------------------------------------------------------
+# Build and lookup
+# ---------------------------------------------------------------------------
+
+class TestBuild:
+    def test_writes_hashed_files_and_manifest(self, static_dir):
+        manifest = assets.build(static_dir)
+        assert set(manifest) == {*assets.SOURCES, *assets.VENDOR}
+        assert manifest["js/app.js"].startswith("js/app.") and manifest["js/app.js"].endswith(".js")
+        dist = static_dir / assets.DIST_DIR
+        assert json.loads((dist / assets.MANIFEST).read_text()) == manifest
+        assert assets.load_manifest(static_dir) == manifest
+
+    def test_sources_are_minified_and_precompressed(self, static_dir):
+        manifest = assets.build(static_dir)
+        css = static_dir / assets.DIST_DIR / manifest["css/app.css"]
+        assert "/*" not in css.read_text()
+        assert gzip.decompress(css.with_name(css.name + ".gz").read_bytes()) == css.read_bytes()
+
+    def test_build_is_deterministic(self, static_dir):
+        first = assets.build(static_dir)
+        gz = static_dir / assets.DIST_DIR / (first["js/app.js"] + ".gz")
+        before = gz.read_bytes()
+        assert assets.build(static_dir) == first
+        assert gz.read_bytes() == before
+
+    def test_hash_changes_with_content(self, static_dir):
+        first = assets.build(static_dir)
+        (static_dir / "js" / "app.js").write_text("run();\n")
+        assert assets.build(static_dir)["js/app.js"] != first["js/app.js"]
+
+    def test_missing_vendor_file_fails(self, static_dir):
+        (static_dir / "vendor" / "chart.umd.min.js").unlink()
+        with pytest.raises(FileNotFoundError):
+            assets.build(static_dir)
+
+    def test_tampered_vendor_file_fails(self, static_dir):
+        (static_dir / "vendor" / "marked.min.js").write_text("alert(1)")
+        with pytest.raises(ValueError, match="marked.min.js has sha256"):
+            assets.build(static_dir)
+
+    def test_asset_url_fallbacks(self, tmp_path):
+        assert assets.asset_url("js/app.js", {"js/app.js": "js/app.abc.js"}, tmp_path) == "/static/dist/js/app.abc.js"
+        assert assets.asset_url("js/app.js", {}, tmp_path) == "/static/js/app.js"
+        assert assets.asset_url("vendor/marked.min.js", {}, tmp_path).startswith("https://")
+        assert assets.load_manifest(tmp_path) == {}
+
+
+class TestVendorPins:
+    def test_fetch_verifies_before_writing(self, static_dir):
+        target = static_dir / "vendor" / "purify.min.js"
+        target.unlink()
+        with patch("assets._download", return_value=b"tampered"):
+            with pytest.raises(ValueError, match="expected"):
+                assets.fetch_vendor(static_dir)
+        assert not target.exists()
+        with patch("assets._download", return_value=_vendor_content("vendor/purify.min.js")):
+            assert assets.fetch_vendor(static_dir) == ["vendor/purify.min.js"]
+        assert target.read_bytes() == _vendor_content("vendor/purify.min.js")
+
+    def test_unpinned_file_left_to_cdn(self, static_dir):
+        (static_dir / assets.VENDOR_DIGESTS).unlink()
+        (static_dir / "vendor" / "purify.min.js").unlink()
+        with patch("assets._download") as download:
+            assert assets.fetch_vendor(static_dir) == []
+        download.assert_not_called()
+        assert assets.unpinned_vendor(static_dir) == list(assets.VENDOR)
+        manifest = assets.build(static_dir)
+        assert set(manifest) == set(assets.SOURCES)
+        assert assets.asset_url("vendor/purify.min.js", manifest, static_dir).startswith("https://")
+
+    def test_pin_writes_sha256sum_file(self, tmp_path):
+        with patch("assets._download", side_effect=lambda url: url.encode()):
+            digests = assets.pin_vendor(tmp_path)
+        assert assets.load_vendor_digests(tmp_path) == digests
+        url = assets.VENDOR["vendor/marked.min.js"]
+        assert digests["vendor/marked.min.js"] == hashlib.sha256(url.encode()).hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# Routes
+# ---------------------------------------------------------------------------
+
+class TestAssetRoutes:
+    def test_dist_serves_precompressed_variant(self, client, static_dir):
+        manifest = assets.build(static_dir)
+        with patch("app._DIST_PATH", static_dir / assets.DIST_DIR):
+            resp = client.get(f"/static/dist/{manifest['js/app.js']}",
+                              headers={"Accept-Encoding": "gzip"})
+            plain = client.get(f"/static/dist/{manifest['js/app.js']}")
+        assert resp.status_code == 200
+        assert resp.headers["Content-Encoding"] == "gzip"
+        assert resp.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+        assert resp.mimetype in ("text/javascript", "application/javascript")
+        assert gzip.decompress(resp.data) == plain.data
+        assert "Content-Encoding" not in plain.headers
+
+    def test_dist_unknown_file_404(self, client):
+        assert client.get("/static/dist/nope.js").status_code == 404
+
+    def test_index_rendered_once(self, client):
+        import app as app_module
+        app_module._index_page.clear()
+        with patch("app.render_template", return_value="<html></html>") as mock_render:
+            client.get("/")
+            client.get("/")
+        assert mock_render.call_count == 1
+        app_module._index_page.clear()
+
+    def test_index_revalidates_with_etag(self, client):
+        first = client.get("/")
+        assert first.headers["Cache-Control"] == "no-cache"
+        again = client.get("/", headers={"If-None-Match": first.headers["ETag"]})
+        assert again.status_code == 304
+
+    def test_index_links_bundle_not_tailwind(self, client):
+        html = client.get("/").get_data(as_text=True)
+        assert "cdn.tailwindcss.com" not in html
+        assert 'src="/static/js/app.js"' in html or "/static/dist/js/app." in html
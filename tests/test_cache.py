@@ -0,0 +1,99 @@
+"""
+Tests for cache.py — the byte-bounded TinyLFU result cache.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import TinyLFUCache
+
+
+def _cache(max_bytes: int = 100) -> TinyLFUCache:
+    # Values are their own weights.
+    return TinyLFUCache(max_bytes, weigher=lambda value: value, sketch_width=1024)
+
+
+def _touch(cache: TinyLFUCache, key: str, times: int) -> None:
+    for _ in range(times):
+        cache.get(key)
+
+
+class TestTinyLFUCache:
+    def test_bounded_by_bytes_not_entries(self):
+        cache = _cache(100)
+        for i in range(10):
+            cache[f"small{i}"] = 5
+        assert len(cache) == 10
+        assert cache.bytes == 50
+        cache["big"] = 60   # room only after evicting; a cold newcomer is refused
+        assert "big" not in cache
+        assert cache.stats()["rejections"] == 1
+
+    def test_popular_newcomer_evicts_lru_entries(self):
+        cache = _cache(100)
+        for i in range(10):
+            cache[f"small{i}"] = 10
+        _touch(cache, "big", 3)
+        cache["big"] = 25
+        assert "big" in cache
+        assert cache.bytes <= 100
+        assert [f"small{i}" in cache for i in range(3)] == [False] * 3
+        assert cache.stats()["evictions"] == 3
+
+    def test_one_hit_wonders_do_not_displace_hot_entries(self):
+        cache = _cache(100)
+        for i in range(4):
+            cache[f"hot{i}"] = 25
+            _touch(cache, f"hot{i}", 5)
+        for i in range(50):
+            cache.get(f"once{i}")
+            cache[f"once{i}"] = 25
+        assert sorted(cache) == [f"hot{i}" for i in range(4)]
+
+    def test_replacing_a_key_is_always_allowed(self):
+        cache = _cache(100)
+        cache["a"] = 40
+        cache["b"] = 40
+        cache["a"] = 70   # b is now least recently used and makes room
+        assert dict(cache) == {"a": 70}
+        assert cache.bytes == 70
+
+    def test_oversized_value_rejected(self):
+        cache = _cache(100)
+        cache["huge"] = 101
+        assert "huge" not in cache
+        assert cache.bytes == 0
+
+    def test_get_tracks_recency_and_hits(self):
+        cache = _cache(100)
+        cache["a"], cache["b"] = 50, 50
+        assert cache.get("a") == 50
+        assert cache.get("missing") is None
+        _touch(cache, "c", 5)
+        cache["c"] = 50   # b, not the just-read a, is evicted
+        assert sorted(cache) == ["a", "c"]
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"]) == (1, 6)
+
+    def test_membership_and_item_access_do_not_count(self):
+        cache = _cache(100)
+        cache["a"] = 10
+        assert "a" in cache and cache["a"] == 10
+        assert cache.stats()["hits"] == 0
+
+    def test_mapping_operations(self):
+        cache = _cache(100)
+        cache.update({"a": 10, "b": 20})
+        assert cache.pop("a") == 10
+        assert cache.bytes == 20
+        del cache["b"]
+        cache["c"] = 5
+        cache.clear()
+        assert len(cache) == 0 and cache.bytes == 0
+
+    def test_invalid_budget(self):
+        with pytest.raises(ValueError):
+            _cache(0)
@@ -0,0 +1,157 @@
+"""
+Concurrency stress tests — the app under many request threads at once (as
+gunicorn gthread workers run it) and across fork() (as --preload does).
+"""
+import json
+import os
+import subprocess
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+THREADS = 16
+ROUNDS = 5
+
+
+@pytest.fixture
+def tmp_db(tmp_path, app):
+    db_file = tmp_path / "test_vidalyze.db"
+    with patch("storage.DB_PATH", db_file):
+        import storage
+        storage.init_db()
+        yield db_file
+        storage.close_pool()
+
+
+def _session(n: int) -> str:
+    return f"00000000-0000-4000-8000-{n:012d}"
+
+
+# ---------------------------------------------------------------------------
+# Threaded workers
+# ---------------------------------------------------------------------------
+
+class TestThreadedRequests:
+    def test_mixed_traffic_from_many_threads(self, app, tmp_db, sample_fetched):
+        import app as app_module
+        import storage
+        app_module._cache.clear()
+        barrier = threading.Barrier(THREADS)
+
+        def worker(n: int) -> list[int]:
+            statuses = []
+            headers = {"X-Session-Id": _session(n)}
+            with app.test_client() as client:
+                barrier.wait()
+                for r in range(ROUNDS):
+                    # Half the threads share video ids, so misses race with hits.
+                    video_id = f"vid{(n % (THREADS // 2)) * ROUNDS + r:08d}"
+                    resp = client.post("/analyze", headers=headers,
+                                       data={"youtube_url": f"https://youtu.be/{video_id}"})
+                    statuses.append(resp.status_code)
+                    statuses.append(client.get("/history", headers=headers).status_code)
+                    statuses.append(client.get(f"/analysis/{video_id}").status_code)
+            return statuses
+
+        with patch("storage.DB_PATH", tmp_db), \
+             patch("app.build_youtube_service"), patch("app.fetch_video_title", return_value="V"), \
+             patch("app.fetch_youtube_comments", return_value=(sample_fetched, None)), \
+             patch("app.GEMINI_API_KEY", ""):
+            with ThreadPoolExecutor(THREADS) as pool:
+                results = list(pool.map(worker, range(THREADS)))
+
+            assert all(status == 200 for statuses in results for status in statuses)
+            # One history row per (session, video): cache hits refresh, never duplicate.
+            assert storage.get_record_count() == THREADS * ROUNDS
+            for n in range(THREADS):
+                assert len(storage.get_history(limit=100, session_id=_session(n))) == ROUNDS
+        app_module._cache.clear()
+
+    def test_cached_entries_are_never_mutated(self, app, tmp_db, sample_fetched):
+        import app as app_module
+        app_module._cache.clear()
+        with patch("storage.DB_PATH", tmp_db), \
+             patch("app.build_youtube_service"), patch("app.fetch_video_title", return_value="V"), \
+             patch("app.fetch_youtube_comments", return_value=(sample_fetched, None)), \
+             patch("app.GEMINI_API_KEY", ""):
+            with app.test_client() as client:
+                client.post("/analyze", data={"youtube_url": "https://youtu.be/dQw4w9WgXcQ"})
+            entry = app_module._cache["dQw4w9WgXcQ"]
+            snapshot = (entry.body, json.dumps(dict(entry.result), sort_keys=True))
+
+            def hit(n: int) -> int:
+                with app.test_client() as client:
+                    return client.post("/analyze", headers={"X-Session-Id": _session(n)},
+                                       data={"youtube_url": "https://youtu.be/dQw4w9WgXcQ"}).status_code
+
+            with ThreadPoolExecutor(THREADS) as pool:
+                assert set(pool.map(hit, range(THREADS * 4))) == {200}
+        assert (entry.body, json.dumps(dict(entry.result), sort_keys=True)) == snapshot
+        app_module._cache.clear()
+
+    def test_youtube_client_is_per_thread(self):
+        import youtube
+        youtube.reset_after_fork()
+        with patch("youtube.YOUTUBE_API_KEY", "k"), patch("youtube.build", side_effect=lambda *a, **kw: object()):
+            first = youtube.build_youtube_service()
+            assert youtube.build_youtube_service() is first
+            with ThreadPoolExecutor(1) as pool:
+                other = pool.submit(youtube.build_youtube_service).result()
+        assert other is not first
+        youtube.reset_after_fork()
+
+
+# ---------------------------------------------------------------------------
+# Preload + fork
+# ---------------------------------------------------------------------------
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork()")
+class TestForkSafety:
+    def test_forked_worker_gets_fresh_pool(self, app, tmp_db):
+        import app as app_module
+        import storage
+        with patch("storage.DB_PATH", tmp_db):
+            storage.save_analysis("parentvid01", {"video_title": "P"})
+            parent_pool = storage._get_pool()
+
+            pid = os.fork()
+            if pid == 0:  # child: behave like a gunicorn worker after post_fork
+                code = 1
+                try:
+                    app_module.after_fork()
+                    ok = storage._get_pool() is not parent_pool
+                    storage.save_analysis("childvid001", {"video_title": "C"})
+                    ok = ok and storage.get_record_count() == 2
+                    with app.test_client() as client:
+                        ok = ok and client.get("/history").status_code == 200
+                    code = 0 if ok else 1
+                finally:
+                    os._exit(code)
+
+            _, status = os.waitpid(pid, 0)
+            assert os.waitstatus_to_exitcode(status) == 0
+            # The parent's connections still work and see the child's write.
+            assert storage._get_pool() is parent_pool
+            assert storage.get_record_count() == 2
+
+    def test_import_starts_no_background_threads(self, tmp_path):
+        # A preloading gunicorn master imports app.py and then forks; it must
+        # not be running the pruner or warmer itself.
+        script = (
+            "import threading, app\n"
+            "names = lambda: {t.name for t in threading.enumerate()}\n"
+            "assert not names() & {'vidalyze-pruner', 'vidalyze-warmer'}, names()\n"
+            "app.start_background_threads()\n"
+            "assert {'vidalyze-pruner', 'vidalyze-warmer'} <= names(), names()\n"
+        )
+        env = {**os.environ, "DB_DIR": str(tmp_path), "PRUNE_INTERVAL_SECONDS": "3600", "WARMUP_HOUR": "3"}
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run(
+            [sys.executable, "-c", script], cwd=root, env=env, capture_output=True, text=True, timeout=60
+        )
+        assert result.returncode == 0, result.stderr
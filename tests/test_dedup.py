@@ -0,0 +1,122 @@
+"""
+Tests for dedup.py — exact and near-duplicate comment collapsing, and its
+use in front of the TextBlob and Gemini classifiers.
+"""
+import asyncio
+import os
+import sys
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dedup import collapse_duplicates, fan_out, normalize_comment
+from sentiment import analyze_sentiment_fallback, compute_stats
+
+_COPYPASTA = (
+    "If you are reading this comment, you have been blessed with good luck for the next week"
+)
+
+
+class TestNormalizeComment:
+    def test_case_and_punctuation_ignored(self):
+        assert normalize_comment("FIRST!!!") == normalize_comment("first")
+
+    def test_character_runs_squashed(self):
+        assert normalize_comment("soooooo good") == normalize_comment("sooo good")
+
+    def test_emoji_only_comments_not_merged_into_empty(self):
+        assert normalize_comment("🔥🔥") != normalize_comment("😂")
+
+
+class TestCollapseDuplicates:
+    def test_exact_duplicates_share_representative(self):
+        reps, assignment = collapse_duplicates(["First!", "first", "Nice video", "FIRST!!"])
+        assert reps == [0, 2]
+        assert assignment == [0, 0, 1, 0]
+
+    def test_near_duplicates_collapsed(self):
+        comments = [_COPYPASTA, _COPYPASTA + " 2024 🙏", _COPYPASTA + " hahaha"]
+        reps, assignment = collapse_duplicates(comments)
+        assert len(reps) == 1
+        assert assignment == [0, 0, 0]
+
+    def test_distinct_comments_kept_apart(self, sample_comments):
+        reps, _ = collapse_duplicates(sample_comments)
+        assert len(reps) == len(sample_comments)
+
+    def test_negated_near_duplicate_kept_apart(self):
+        comments = [
+            "This tutorial was great and helped me a lot with my project",
+            "This tutorial was not great and helped me a lot with my project",
+        ]
+        reps, assignment = collapse_duplicates(comments)
+        assert reps == [0, 1]
+        assert assignment == [0, 1]
+
+    def test_any_differing_word_kept_apart(self):
+        comments = [
+            "I agree with everything said in the first part of this video",
+            "I disagree with everything said in the first part of this video",
+            _COPYPASTA,
+            _COPYPASTA.replace("week", "weeks"),
+        ]
+        reps, assignment = collapse_duplicates(comments, threshold=0.5)
+        assert reps == [0, 1, 2, 3]
+        assert assignment == [0, 1, 2, 3]
+
+    def test_sentiment_word_swap_kept_apart(self):
+        comments = [
+            "Honestly the editing in this one was amazing from start to finish",
+            "Honestly the editing in this one was awful from start to finish",
+        ]
+        reps, _ = collapse_duplicates(comments, threshold=0.5)
+        assert len(reps) == 2
+
+    def test_short_similar_comments_not_fuzzy_matched(self):
+        reps, _ = collapse_duplicates(["good video", "bad video"])
+        assert len(reps) == 2
+
+    def test_empty_input(self):
+        assert collapse_duplicates([]) == ([], [])
+
+    def test_fan_out_keeps_every_comment(self):
+        comments = ["a", "a!", "b"]
+        labelled = [{"sentiment": "Positive", "category": "Positive"},
+                    {"sentiment": "Negative", "category": "Negative"}]
+        out = fan_out(comments, [0, 0, 1], labelled)
+        assert [c["comment"] for c in out] == comments
+        assert [c["sentiment"] for c in out] == ["Positive", "Positive", "Negative"]
+
+
+class TestClassifierIntegration:
+    def test_fallback_classifies_each_group_once(self):
+        comments = [_COPYPASTA] * 50 + ["This is terrible, awful and horrible."]
+        with patch("sentiment.get_sentiment_textblob", return_value="Neutral") as mock_tb:
+            result = analyze_sentiment_fallback(comments)
+        assert len(result) == 51
+        # get_sentiment_textblob is called once per representative, plus at
+        # most once more from categorize_comment — never once per duplicate.
+        assert mock_tb.call_count <= 4
+
+    def test_stats_count_every_duplicate(self):
+        comments = ["Great job! Love this channel."] * 9 + ["I hate this, it is the worst."]
+        sentiment, categories = compute_stats(analyze_sentiment_fallback(comments))
+        assert sentiment["Positive"] == 90.0
+        assert categories["Positive"] == 9
+
+    def test_gemini_sends_only_unique_comments(self):
+        from gemini import _analyze_sentiment_async
+
+        comments = ["First!", "first", "Loved the editing", "FIRST!!!"]
+        sent_prompts = []
+
+        async def fake_call(prompt, api_key, schema=None):
+            sent_prompts.append(prompt)
+            return [{"index": 0, "sentiment": "Neutral"}, {"index": 1, "sentiment": "Positive"}]
+
+        with patch("gemini._call_gemini", side_effect=fake_call):
+            result = asyncio.run(_analyze_sentiment_async(comments, "key"))
+
+        assert "There are 2 comments" in sent_prompts[0]
+        assert [r["sentiment"] for r in result] == ["Neutral", "Neutral", "Positive", "Neutral"]
+        assert [r["comment"] for r in result] == comments
@@ -0,0 +1,217 @@
+"""
+Tests for metrics.py and /metrics — per-stage histograms, cache / fallback /
+quota counters, and aggregation across worker processes.
+"""
+import os
+import subprocess
+import sys
+import textwrap
+from unittest.mock import MagicMock, patch
+
+import pytest
+from googleapiclient.errors import HttpError
+from prometheus_client import REGISTRY
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+URL = "https://youtu.be/dQw4w9WgXcQ"
+
+
+def _value(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def _stage_count(stage: str) -> float:
+    return _value("vidalyze_stage_seconds_count", stage=stage)
+
+
+@pytest.fixture
+def cold(sample_fetched):
+    """Patches for one cold /analyze run through the TextBlob path."""
+    import app as app_module
+    app_module._cache.pop("dQw4w9WgXcQ", None)
+    with patch("app._get_cached", return_value=None), patch("app.save_result"), \
+         patch("app.index_search_documents"), patch("app.save_aggregate_state"), \
+         patch("app.save_analysis"), \
+         patch("app.build_youtube_service"), patch("app.fetch_video_title", return_value="V"), \
+         patch("app.fetch_youtube_comments", return_value=(sample_fetched, None)), \
+         patch("app.GEMINI_API_KEY", ""):
+        yield
+    app_module._cache.pop("dQw4w9WgXcQ", None)
+
+
+class TestMetricsEndpoint:
+    def test_exposition_format(self, client):
+        resp = client.get("/metrics")
+        assert resp.status_code == 200
+        assert resp.content_type.startswith("text/plain")
+        assert b"# TYPE vidalyze_stage_seconds histogram" in resp.data
+
+    def test_cold_analysis_observes_each_stage(self, client, cold):
+        stages = ["url_parse", "youtube_title", "textblob", "aggregation", "sqlite_write", "json_encode"]
+        before = {stage: _stage_count(stage) for stage in stages}
+        misses = _value("vidalyze_cache_lookups_total", result="miss")
+        method = "TextBlob/Rule-Based Fallback"
+        analyses = _value("vidalyze_analyses_total", method=method)
+
+        assert client.post("/analyze", data={"youtube_url": URL}).status_code == 200
+
+        assert all(_stage_count(stage) > before[stage] for stage in stages)
+        assert _stage_count("sqlite_write") - before["sqlite_write"] == 3   # result, index, history
+        assert _value("vidalyze_cache_lookups_total", result="miss") == misses + 1
+        assert _value("vidalyze_analyses_total", method=method) == analyses + 1
+        body = client.get("/metrics").data.decode()
+        assert 'vidalyze_stage_seconds_bucket{le="0.001",stage="url_parse"}' in body
+
+    def test_gemini_stages_and_quota_errors(self, client, cold, sample_categorized):
+        from gemini import GeminiQuotaError
+        classify = _stage_count("gemini_classify")
+        insights = _stage_count("gemini_insights")
+        with patch("app.GEMINI_API_KEY", "key"), \
+             patch("app.analyze_sentiment_gemini_async", return_value=[dict(c) for c in sample_categorized]), \
+             patch("app.generate_insights_gemini_async", return_value="ok"), \
+             patch("app.generate_highlights_gemini_async", return_value={}):
+            client.post("/analyze", data={"youtube_url": URL})
+        assert _stage_count("gemini_classify") == classify + 1
+        assert _stage_count("gemini_insights") == insights + 1
+
+        quota = _value("vidalyze_quota_errors_total", service="gemini")
+        with patch("app.GEMINI_API_KEY", "key"), \
+             patch("app.analyze_sentiment_gemini_async", side_effect=GeminiQuotaError("429")):
+            data = client.post("/analyze", data={"youtube_url": URL}).get_json()
+        assert "quota" in data["analysis_method"]
+        assert _value("vidalyze_quota_errors_total", service="gemini") == quota + 1
+        assert _value("vidalyze_analyses_total", method=data["analysis_method"]) >= 1
+
+    def test_cache_hits_and_stale_hits_counted(self, client):
+        import app as app_module
+        entry = app_module._encode_cached({"video_title": "V"})
+        stale = entry._replace(created=entry.created - app_module.CACHE_TTL_SECONDS - 1)
+        hits = _value("vidalyze_cache_lookups_total", result="hit")
+        stales = _value("vidalyze_cache_lookups_total", result="stale")
+        with patch("app.save_analysis"), patch("app._schedule_refresh"):
+            with patch("app._get_cached", return_value=entry):
+                client.post("/analyze", data={"youtube_url": URL})
+            with patch("app._get_cached", return_value=stale):
+                client.post("/analyze", data={"youtube_url": URL})
+        assert _value("vidalyze_cache_lookups_total", result="hit") == hits + 1
+        assert _value("vidalyze_cache_lookups_total", result="stale") == stales + 1
+
+
+class TestYouTubeMetrics:
+    def test_each_comment_page_timed(self):
+        from youtube import fetch_youtube_comments
+        service = MagicMock()
+        page = {"items": [{"snippet": {"topLevelComment": {"snippet": {"textDisplay": "c"}}}}] * 100}
+        service.commentThreads().list().execute.side_effect = [
+            {**page, "nextPageToken": "p2"}, {**page, "nextPageToken": None},
+        ]
+        pages = _stage_count("youtube_comments_page")
+        with patch("youtube.YOUTUBE_API_KEY", "k"), patch("youtube.build_youtube_service", return_value=service):
+            comments, _ = fetch_youtube_comments("dQw4w9WgXcQ", max_results=500)
+        assert len(comments) == 200
+        assert _stage_count("youtube_comments_page") == pages + 2
+
+    def test_quota_error_counted(self):
+        from youtube import fetch_youtube_comments
+        service = MagicMock()
+        resp = MagicMock()
+        resp.status = 403
+        err = HttpError(resp=resp, content=b"Quota exceeded")
+        err.error_details = [{"reason": "quotaExceeded", "message": "Quota exceeded"}]
+        service.commentThreads().list().execute.side_effect = err
+        quota = _value("vidalyze_quota_errors_total", service="youtube")
+        with patch("youtube.YOUTUBE_API_KEY", "k"), patch("youtube.build_youtube_service", return_value=service):
+            fetch_youtube_comments("dQw4w9WgXcQ")
+        assert _value("vidalyze_quota_errors_total", service="youtube") == quota + 1
+
+
+class TestMultiprocess:
+    def test_workers_are_summed(self, tmp_path):
+        env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+        worker = textwrap.dedent("""
+            import sys
+            from metrics import CACHE_LOOKUPS, timed
+            for _ in range(int(sys.argv[1])):
+                CACHE_LOOKUPS.labels("hit").inc()
+            with timed("url_parse"):
+                pass
+        """)
+        for hits in (3, 4):
+            subprocess.run([sys.executable, "-c", worker, str(hits)], cwd=ROOT, env=env, check=True)
+
+        scrape = "from metrics import render; print(render()[0].decode())"
+        out = subprocess.run([sys.executable, "-c", scrape], cwd=ROOT, env=env,
+                             check=True, capture_output=True, text=True).stdout
+        assert 'vidalyze_cache_lookups_total{result="hit"} 7.0' in out
+        assert 'vidalyze_stage_seconds_count{stage="url_parse"} 2.0' in out
+
+    def test_gunicorn_config_clears_only_metric_files(self, tmp_path):
+        for name in ("counter_123.db", "histogram_123.db", "summary_123.db", "gauge_livesum_123.db"):
+            (tmp_path / name).write_bytes(b"stale")
+        for name in ("vidalyze.db", "ratelimit.db", "operator-notes.txt"):
+            (tmp_path / name).write_text("keep me")
+        env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+        subprocess.run([sys.executable, "-c", "import runpy; runpy.run_path('gunicorn.conf.py')"],
+                       cwd=ROOT, env=env, check=True)
+        assert sorted(p.name for p in tmp_path.iterdir()) == [
+            "operator-notes.txt", "ratelimit.db", "vidalyze.db"
+        ]
+
+
+# ---------------------------------------------------------------------------
+# Per-request timings and profiling
+# ---------------------------------------------------------------------------
+
+class TestRequestTimings:
+    def test_absent_unless_requested(self, client, cold):
+        assert "timings" not in client.post("/analyze", data={"youtube_url": URL}).get_json()
+
+    def test_cold_analysis_breakdown(self, client, cold):
+        resp = client.post("/analyze", data={"youtube_url": URL}, headers={"X-Debug-Timings": "1"})
+        timings = resp.get_json()["timings"]
+        assert {"url_parse", "youtube_title", "textblob", "aggregation", "sqlite_write"} <= timings["stages"].keys()
+        assert timings["stages"]["sqlite_write"]["count"] == 3
+        assert timings["total_ms"] >= timings["stages"]["textblob"]["ms"]
+        assert resp.headers["Cache-Control"] == "no-store"
+
+    def test_cache_hit_gets_timings_uncompressed(self, client):
+        import app as app_module
+        entry = app_module._encode_cached({"video_title": "V"})
+        with patch("app._get_cached", return_value=entry), patch("app.save_analysis"):
+            resp = client.post("/analyze", data={"youtube_url": URL},
+                               headers={"X-Debug-Timings": "1", "Accept-Encoding": "gzip"})
+        assert "Content-Encoding" not in resp.headers
+        assert "ETag" not in resp.headers
+        data = resp.get_json()
+        assert data["video_title"] == "V"
+        assert "url_parse" in data["timings"]["stages"]
+
+    def test_error_responses_carry_timings(self, client):
+        resp = client.post("/analyze", data={"youtube_url": "not a url"}, headers={"X-Debug-Timings": "1"})
+        assert resp.status_code == 400
+        assert resp.get_json()["timings"]["stages"]["url_parse"]["count"] == 1
+
+
+class TestRequestProfiling:
+    def test_requires_admin_token(self, client):
+        with patch("app.ADMIN_TOKEN", ""):
+            assert client.post("/analyze", data={"youtube_url": URL}, headers={"X-Profile": "1"}).status_code == 404
+        with patch("app.ADMIN_TOKEN", "secret"):
+            resp = client.post("/analyze", data={"youtube_url": URL},
+                               headers={"X-Profile": "1", "X-Admin-Token": "nope"})
+        assert resp.status_code == 403
+
+    def test_writes_profile_under_db_dir(self, client, cold, tmp_path):
+        import pstats
+        with patch("app.ADMIN_TOKEN", "secret"), patch("storage.DB_PATH", tmp_path / "vidalyze.db"):
+            resp = client.post("/analyze", data={"youtube_url": URL},
+                               headers={"X-Profile": "1", "X-Admin-Token": "secret"})
+        assert resp.status_code == 200
+        assert resp.get_json()["video_id"] == "dQw4w9WgXcQ"
+        path = tmp_path / resp.headers["X-Profile-File"]
+        assert path.parent == tmp_path / "profiles"
+        functions = {name for _, _, name in pstats.Stats(str(path)).stats}
+        # Blocking work that normally runs on pool threads is in the profile.
+        assert "analyze_sentiment_fallback" in functions
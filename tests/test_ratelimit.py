@@ -0,0 +1,150 @@
+"""
+Tests for ratelimit.py — the shared SQLite limiter storage — and the
+cost-weighted, per-session /analyze limits in app.py.
+"""
+import os
+import sys
+from unittest.mock import patch
+
+import pytest
+from flask import Flask
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+from limits.storage import storage_from_string
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ratelimit import SQLiteStorage
+
+
+@pytest.fixture
+def uri(tmp_path):
+    return f"sqlite:///{tmp_path / 'ratelimit.db'}"
+
+
+# ---------------------------------------------------------------------------
+# Storage
+# ---------------------------------------------------------------------------
+
+class TestSQLiteStorage:
+    def test_registered_for_sqlite_scheme(self, uri):
+        assert isinstance(storage_from_string(uri), SQLiteStorage)
+
+    def test_incr_accumulates_amounts(self, uri):
+        storage = SQLiteStorage(uri)
+        assert storage.incr("k", 60) == 1
+        assert storage.incr("k", 60, amount=12) == 13
+        assert storage.get("k") == 13
+        assert storage.get("other") == 0
+
+    def test_window_restarts_after_expiry(self, uri):
+        storage = SQLiteStorage(uri)
+        with patch("ratelimit.time.time", return_value=1000.0):
+            storage.incr("k", 60, amount=5)
+            assert storage.get_expiry("k") == 1060.0
+        with patch("ratelimit.time.time", return_value=1061.0):
+            assert storage.get("k") == 0
+            assert storage.incr("k", 60) == 1
+            assert storage.get_expiry("k") == 1121.0
+
+    def test_counters_shared_between_instances(self, uri):
+        worker_a, worker_b = SQLiteStorage(uri), SQLiteStorage(uri)
+        worker_a.incr("k", 60, amount=3)
+        assert worker_b.incr("k", 60, amount=2) == 5
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork()")
+    def test_counters_shared_with_forked_worker(self, uri):
+        storage = SQLiteStorage(uri)
+        storage.incr("k", 60)
+        pid = os.fork()
+        if pid == 0:
+            os._exit(0 if storage.incr("k", 60) == 2 else 1)
+        _, status = os.waitpid(pid, 0)
+        assert os.waitstatus_to_exitcode(status) == 0
+        assert storage.get("k") == 2
+
+    def test_clear_reset_and_check(self, uri):
+        storage = SQLiteStorage(uri)
+        storage.incr("a", 60)
+        storage.incr("b", 60)
+        storage.clear("a")
+        assert storage.get("a") == 0
+        assert storage.reset() == 1
+        assert storage.check()
+
+
+# ---------------------------------------------------------------------------
+# Limits across workers
+# ---------------------------------------------------------------------------
+
+def _worker_app(uri: str) -> Flask:
+    """A stand-in for one gunicorn worker: its own app and Limiter."""
+    worker = Flask(__name__)
+    limiter = Limiter(get_remote_address, app=worker, storage_uri=uri)
+
+    @worker.route("/cold")
+    @limiter.limit("60 per minute", cost=12)
+    def cold():
+        return "ok"
+
+    @worker.route("/hit")
+    @limiter.limit("60 per minute", cost=1)
+    def hit():
+        return "ok"
+
+    return worker
+
+
+class TestSharedLimits:
+    def test_limit_enforced_across_workers(self, uri):
+        clients = [_worker_app(uri).test_client() for _ in range(2)]
+        statuses = [clients[i % 2].get("/cold").status_code for i in range(6)]
+        assert statuses == [200] * 5 + [429]
+
+    def test_cheap_requests_get_more_throughput(self, uri):
+        client = _worker_app(uri).test_client()
+        assert all(client.get("/hit").status_code == 200 for _ in range(60))
+        assert client.get("/hit").status_code == 429
+
+
+# ---------------------------------------------------------------------------
+# /analyze cost and buckets
+# ---------------------------------------------------------------------------
+
+class TestAnalysisCost:
+    URL = "https://youtu.be/dQw4w9WgXcQ"
+
+    def _cost(self, app, data, headers=None):
+        import app as app_module
+        with app.test_request_context("/analyze", method="POST", data=data, headers=headers or {}):
+            return app_module._analysis_cost(), app_module._session_or_ip()
+
+    def test_cold_analysis_costs_more(self, app):
+        import app as app_module
+        with patch.dict(app_module._cache, clear=True), \
+             patch("app.has_stored_result", return_value=False):
+            assert self._cost(app, {"youtube_url": self.URL})[0] == app_module.COLD_ANALYSIS_COST
+
+    def test_shared_result_store_hit_is_cheap(self, app):
+        import app as app_module
+        with patch.dict(app_module._cache, clear=True), \
+             patch("app.has_stored_result", return_value=True) as probe:
+            assert self._cost(app, {"youtube_url": self.URL, "mode": "sample"})[0] == app_module.CACHE_HIT_COST
+        probe.assert_called_once_with("dQw4w9WgXcQ:sample")
+
+    def test_cache_hit_is_cheap(self, app):
+        import app as app_module
+        with patch.dict(app_module._cache, {"dQw4w9WgXcQ": app_module._encode_cached({})}, clear=True), \
+             patch("app.has_stored_result", return_value=False):
+            assert self._cost(app, {"youtube_url": self.URL})[0] == app_module.CACHE_HIT_COST
+            sampled = self._cost(app, {"youtube_url": self.URL, "mode": "sample"})[0]
+        assert sampled == app_module.COLD_ANALYSIS_COST
+
+    def test_rejected_url_is_cheap(self, app):
+        import app as app_module
+        assert self._cost(app, {"youtube_url": "not a url"})[0] == app_module.CACHE_HIT_COST
+
+    def test_session_bucket_falls_back_to_ip(self, app):
+        session = "00000000-0000-4000-8000-000000000001"
+        assert self._cost(app, {}, {"X-Session-Id": session})[1] == f"session:{session}"
+        assert self._cost(app, {})[1] == "ip:127.0.0.1"
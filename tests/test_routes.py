@@ -4,10 +4,14 @@ Flask route integration tests for app.py.
 All external calls (YouTube API, Gemini API, cache) are mocked so tests
 run offline without real credentials.
 """
+import asyncio
 import os
 import sys
+import time
 from unittest.mock import patch
 
+import pytest
+
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 
@@ -87,30 +91,30 @@ class TestAnalyzeSuccess:
             patch("app.generate_insights_fallback", return_value="## Summary\n\nGood video."),
         ]
 
-    def test_returns_200_with_valid_data(self, client, sample_comments, sample_categorized):
-        p = self._base_patches(sample_comments, sample_categorized)
+    def test_returns_200_with_valid_data(self, client, sample_fetched, sample_categorized):
+        p = self._base_patches(sample_fetched, sample_categorized)
         with p[0], p[1], p[2], p[3], p[4], p[5], p[6], p[7]:
             resp = client.post("/analyze", data={"youtube_url": self._URL})
 
         assert resp.status_code == 200
         data = resp.get_json()
         assert data["video_title"] == "Test Video Title"
-        assert data["total_comments"] == len(sample_comments)
+        assert data["total_comments"] == len(sample_fetched)
         assert "overall_sentiment" in data
         assert "comment_categories" in data
         assert "comments_data" in data
         assert "overall_insights" in data
         assert "analysis_method" in data
 
-    def test_analysis_method_fallback_when_no_gemini_key(self, client, sample_comments, sample_categorized):
-        p = self._base_patches(sample_comments, sample_categorized)
+    def test_analysis_method_fallback_when_no_gemini_key(self, client, sample_fetched, sample_categorized):
+        p = self._base_patches(sample_fetched, sample_categorized)
         with p[0], p[1], p[2], p[3], p[4], p[5], p[6], p[7]:
             resp = client.post("/analyze", data={"youtube_url": self._URL})
         data = resp.get_json()
         assert "TextBlob" in data["analysis_method"] or "Fallback" in data["analysis_method"]
 
-    def test_comments_data_has_correct_keys(self, client, sample_comments, sample_categorized):
-        p = self._base_patches(sample_comments, sample_categorized)
+    def test_comments_data_has_correct_keys(self, client, sample_fetched, sample_categorized):
+        p = self._base_patches(sample_fetched, sample_categorized)
         with p[0], p[1], p[2], p[3], p[4], p[5], p[6], p[7]:
             resp = client.post("/analyze", data={"youtube_url": self._URL})
         for item in resp.get_json()["comments_data"]:
@@ -118,15 +122,23 @@ class TestAnalyzeSuccess:
             assert "sentiment" in item
             assert "category" in item
 
-    def test_overall_sentiment_percentages_sum_to_100(self, client, sample_comments, sample_categorized):
-        p = self._base_patches(sample_comments, sample_categorized)
+    def test_overall_sentiment_percentages_sum_to_100(self, client, sample_fetched, sample_categorized):
+        p = self._base_patches(sample_fetched, sample_categorized)
         with p[0], p[1], p[2], p[3], p[4], p[5], p[6], p[7]:
             resp = client.post("/analyze", data={"youtube_url": self._URL})
         overall = resp.get_json()["overall_sentiment"]
         assert abs(sum(overall.values()) - 100.0) < 0.5
 
-    def test_cached_field_false_on_first_request(self, client, sample_comments, sample_categorized):
-        p = self._base_patches(sample_comments, sample_categorized)
+    def test_timeline_bucketed_by_publish_date(self, client, sample_fetched, sample_categorized):
+        p = self._base_patches(sample_fetched, sample_categorized)
+        with p[0], p[1], p[2], p[3], p[4], p[5], p[6], p[7]:
+            resp = client.post("/analyze", data={"youtube_url": self._URL})
+        timeline = resp.get_json()["sentiment_over_time"]
+        assert len(timeline) == len(sample_fetched)          # one comment per day
+        assert timeline[0]["bucket"] < timeline[-1]["bucket"]  # oldest → newest
+
+    def test_cached_field_false_on_first_request(self, client, sample_fetched, sample_categorized):
+        p = self._base_patches(sample_fetched, sample_categorized)
         with p[0], p[1], p[2], p[3], p[4], p[5], p[6], p[7]:
             resp = client.post("/analyze", data={"youtube_url": self._URL})
         assert resp.get_json()["cached"] is False
@@ -166,7 +178,7 @@ class TestAnalyzeErrors:
 # ---------------------------------------------------------------------------
 
 class TestCacheBehaviour:
-    def test_second_request_uses_cache(self, client, sample_comments, sample_categorized):
+    def test_second_request_uses_cache(self, client, sample_fetched, sample_categorized):
         """When _get_cached returns a result, fetch_youtube_comments must NOT be called."""
         url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
         cached_result = {
@@ -176,7 +188,8 @@ class TestCacheBehaviour:
             "youtube_url": url,
         }
 
-        with patch("app._get_cached", return_value=cached_result), \
+        from app import _encode_cached
+        with patch("app._get_cached", return_value=_encode_cached(cached_result)), \
              patch("app.fetch_youtube_comments") as mock_fetch:
             resp = client.post("/analyze", data={"youtube_url": url})
 
@@ -184,7 +197,42 @@ class TestCacheBehaviour:
         assert resp.get_json()["cached"] is True
         mock_fetch.assert_not_called()   # cache hit → no fetch
 
-    def test_different_videos_analyzed_independently(self, client, sample_comments, sample_categorized):
+    def test_cache_hit_served_gzipped_when_accepted(self, client):
+        import gzip
+        import json
+
+        from app import _encode_cached
+        url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+        entry = _encode_cached({"video_title": "Cached Video", "cached": False})
+        with patch("app._get_cached", return_value=entry), patch("app.save_analysis"):
+            resp = client.post("/analyze", data={"youtube_url": url},
+                               headers={"Accept-Encoding": "gzip"})
+
+        assert resp.headers["Content-Encoding"] == "gzip"
+        assert resp.headers["X-Cache"] == "HIT"
+        assert json.loads(gzip.decompress(resp.data))["cached"] is True
+
+    def test_cache_hit_recorded_as_hit(self, client):
+        from app import _encode_cached
+        url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+        entry = _encode_cached({"video_title": "Cached Video"})
+        with patch("app._get_cached", return_value=entry), patch("app.save_analysis") as mock_save:
+            client.post("/analyze", data={"youtube_url": url})
+        assert mock_save.call_args.kwargs == {"cache_hit": True}
+
+    def test_cache_entry_is_not_mutated_by_hits(self, client):
+        from app import _encode_cached
+        url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+        result = {"video_title": "Cached Video", "cached": False}
+        entry = _encode_cached(result)
+        with patch("app._get_cached", return_value=entry), patch("app.save_analysis"):
+            client.post("/analyze", data={"youtube_url": url})
+
+        assert entry.result["cached"] is False
+        with pytest.raises(TypeError):
+            entry.result["cached"] = True
+
+    def test_different_videos_analyzed_independently(self, client, sample_fetched, sample_categorized):
         """Two different video IDs must both return 200 and their own data."""
         url1 = "https://www.youtube.com/watch?v=aaaaaaaaaaa"
         url2 = "https://www.youtube.com/watch?v=bbbbbbbbbbb"
@@ -193,7 +241,7 @@ class TestCacheBehaviour:
             patch("app._get_cached", return_value=None),
             patch("app._set_cached"),
             patch("app.build_youtube_service"),
-            patch("app.fetch_youtube_comments", return_value=(sample_comments, None)),
+            patch("app.fetch_youtube_comments", return_value=(sample_fetched, None)),
             patch("app.GEMINI_API_KEY", ""),
             patch("app.analyze_sentiment_fallback", return_value=sample_categorized),
             patch("app.generate_insights_fallback", return_value="Insights"),
@@ -212,6 +260,346 @@ class TestCacheBehaviour:
         assert r2.get_json()["video_title"] == "Video B"
 
 
+    def test_l1_miss_reads_through_to_result_store(self):
+        import app as app_module
+        stored, created = {"video_title": "Stored"}, time.time() - 60
+        app_module._cache.pop("zzzzzzzzzzz", None)
+        with patch("app.load_result_entry", return_value=(stored, created)) as mock_load:
+            assert app_module._get_cached("zzzzzzzzzzz").result == stored
+            assert app_module._get_cached("zzzzzzzzzzz").created == created
+        mock_load.assert_called_once_with("zzzzzzzzzzz")   # second read served by L1
+        app_module._cache.pop("zzzzzzzzzzz", None)
+
+    def test_set_cached_writes_through(self):
+        import app as app_module
+        with patch("app.save_result") as mock_save:
+            app_module._set_cached("yyyyyyyyyyy", {"video_title": "X"})
+        mock_save.assert_called_once_with("yyyyyyyyyyy", {"video_title": "X"})
+        app_module._cache.pop("yyyyyyyyyyy", None)
+
+    def test_compressed_entry_round_trips(self):
+        from app import _encode_cached
+        comments = [{"comment": f"great video {i}", "sentiment": "Positive"} for i in range(500)]
+        result = {"video_title": "V", "comments_data": comments}
+        plain = _encode_cached(result)
+        with patch("app.CACHE_COMPRESS", True):
+            packed = _encode_cached(result)
+        assert isinstance(packed.comments, bytes)
+        assert packed.result == plain.result == result
+        assert packed.body == plain.body
+        assert packed.size < plain.size / 5
+
+    def test_hit_records_summary_only(self, client):
+        from app import _encode_cached
+        entry = _encode_cached({"video_title": "V", "comments_data": [{"comment": "c"}]})
+        with patch("app._get_cached", return_value=entry), patch("app.save_analysis") as mock_save:
+            client.post("/analyze", data={"youtube_url": "https://youtu.be/dQw4w9WgXcQ"})
+        assert "comments_data" not in mock_save.call_args.args[1]
+
+    def test_stats_require_admin_token(self, client):
+        with patch("app.ADMIN_TOKEN", ""):
+            assert client.get("/cache/stats").status_code == 404
+        with patch("app.ADMIN_TOKEN", "secret"):
+            assert client.get("/cache/stats", headers={"X-Admin-Token": "nope"}).status_code == 403
+            stats = client.get("/cache/stats", headers={"X-Admin-Token": "secret"}).get_json()
+        assert {"bytes", "max_bytes", "hits", "misses", "admissions", "rejections", "evictions"} <= stats.keys()
+
+
+# ---------------------------------------------------------------------------
+# Stale-while-revalidate
+# ---------------------------------------------------------------------------
+
+class TestStaleWhileRevalidate:
+    VIDEO = "dQw4w9WgXcQ"
+    URL = f"https://youtu.be/{VIDEO}"
+
+    def _entry(self, title, age):
+        import app as app_module
+        result = {"video_id": self.VIDEO, "video_title": title, "comments_data": []}
+        return app_module._encode_cached(result, created=time.time() - age)
+
+    def _fresh_result(self):
+        return {"video_id": self.VIDEO, "video_title": "New", "comments_data": [],
+                "overall_insights": "", "sampled": False}
+
+    def _wait_for_refresh(self):
+        import app as app_module
+        deadline = time.time() + 5
+        while app_module._refreshing and time.time() < deadline:
+            time.sleep(0.01)
+
+    def test_fresh_entry_served_without_refresh(self, client):
+        import app as app_module
+        with patch.dict(app_module._cache, {self.VIDEO: self._entry("Old", 10)}, clear=True), \
+             patch("app.save_analysis"), patch("app._run_analysis") as mock_run:
+            resp = client.post("/analyze", data={"youtube_url": self.URL})
+        assert resp.headers["X-Cache"] == "HIT"
+        assert "refreshing" not in resp.get_json()
+        mock_run.assert_not_called()
+
+    def test_stale_entry_served_and_refreshed_once(self, client):
+        import app as app_module
+        calls = []
+
+        async def slow_analysis(video_id, youtube_url, sample_mode):
+            calls.append(video_id)
+            await asyncio.sleep(0.2)
+            return self._fresh_result(), {}
+
+        stale = self._entry("Old", app_module.CACHE_TTL_SECONDS + 1)
+        with patch.dict(app_module._cache, {self.VIDEO: stale}, clear=True), \
+             patch("app.save_analysis"), patch("app.save_result"), \
+             patch("app.load_result_entry", return_value=None), \
+             patch("app.index_search_documents"), patch("app.save_aggregate_state"), \
+             patch("app._run_analysis", side_effect=slow_analysis):
+            responses = [client.post("/analyze", data={"youtube_url": self.URL}) for _ in range(3)]
+            self._wait_for_refresh()
+            after = client.post("/analyze", data={"youtube_url": self.URL})
+
+        for resp in responses:
+            assert resp.headers["X-Cache"] == "STALE"
+            assert resp.get_json()["refreshing"] is True
+            assert resp.get_json()["video_title"] == "Old"
+        assert calls == [self.VIDEO]
+        assert after.headers["X-Cache"] == "HIT"
+        assert after.get_json()["video_title"] == "New"
+
+    def test_failed_refresh_keeps_stale_entry(self, client):
+        import app as app_module
+        stale = self._entry("Old", app_module.CACHE_TTL_SECONDS + 1)
+        failure = app_module.AnalysisError(400, error="No comments found for this video.")
+        with patch.dict(app_module._cache, {self.VIDEO: stale}, clear=True), \
+             patch("app.save_analysis"), patch("app.load_result_entry", return_value=None), \
+             patch("app._run_analysis", side_effect=failure):
+            client.post("/analyze", data={"youtube_url": self.URL})
+            self._wait_for_refresh()
+            assert app_module._cache[self.VIDEO] is stale
+
+    def test_fallback_refresh_keeps_stale_gemini_entry(self, client):
+        import app as app_module
+        result = {"video_id": self.VIDEO, "video_title": "Old", "comments_data": [],
+                  "analysis_method": "Gemini"}
+        stale = app_module._encode_cached(result, created=time.time() - app_module.CACHE_TTL_SECONDS - 1)
+        fallback = {**self._fresh_result(), "analysis_method": "TextBlob (Gemini quota exceeded)"}
+        with patch.dict(app_module._cache, {self.VIDEO: stale}, clear=True), \
+             patch("app.save_analysis"), patch("app.load_result_entry", return_value=None), \
+             patch("app._run_analysis", return_value=(fallback, {})), \
+             patch("app._refresh_persist") as persist:
+            client.post("/analyze", data={"youtube_url": self.URL})
+            self._wait_for_refresh()
+            assert app_module._cache[self.VIDEO] is stale
+        persist.assert_not_called()
+
+    def test_refresh_skipped_while_another_worker_holds_the_claim(self, client):
+        import app as app_module
+        import storage
+        stale = self._entry("Old", app_module.CACHE_TTL_SECONDS + 1)
+        assert storage.claim_refresh(self.VIDEO, 600)          # "another worker"
+        try:
+            with patch.dict(app_module._cache, {self.VIDEO: stale}, clear=True), \
+                 patch("app.save_analysis"), patch("app._run_analysis") as mock_run:
+                resp = client.post("/analyze", data={"youtube_url": self.URL})
+                self._wait_for_refresh()
+        finally:
+            storage.release_refresh(self.VIDEO)
+        assert resp.headers["X-Cache"] == "STALE"
+        mock_run.assert_not_called()
+
+    def test_refresh_adopts_newer_copy_from_another_worker(self, client):
+        import app as app_module
+        stale = self._entry("Old", app_module.CACHE_TTL_SECONDS + 1)
+        newer = (self._fresh_result(), time.time() - 5)
+        with patch.dict(app_module._cache, {self.VIDEO: stale}, clear=True), \
+             patch("app.save_analysis"), patch("app.load_result_entry", return_value=newer), \
+             patch("app._run_analysis") as mock_run:
+            client.post("/analyze", data={"youtube_url": self.URL})
+            self._wait_for_refresh()
+            assert app_module._cache[self.VIDEO].result["video_title"] == "New"
+        mock_run.assert_not_called()
+
+    def test_entry_past_hard_ttl_is_a_miss(self):
+        import app as app_module
+        expired = self._entry("Old", app_module.RESULT_STORE_TTL_SECONDS + 1)
+        with patch.dict(app_module._cache, {self.VIDEO: expired}, clear=True), \
+             patch("app.load_result_entry", return_value=None):
+            assert app_module._get_cached(self.VIDEO) is None
+
+
+# ---------------------------------------------------------------------------
+# GET /analysis/<video_id> and conditional requests
+# ---------------------------------------------------------------------------
+
+class TestConditionalRequests:
+    URL = "/analysis/dQw4w9WgXcQ"
+
+    @staticmethod
+    def _entry():
+        from app import _encode_cached
+        return _encode_cached({"video_title": "Cached Video", "comments_data": []})
+
+    def test_get_analysis_returns_cached_body_with_etag(self, client):
+        with patch("app._get_cached", return_value=self._entry()):
+            resp = client.get(self.URL)
+        assert resp.status_code == 200
+        assert resp.get_json()["video_title"] == "Cached Video"
+        assert resp.headers["ETag"]
+        assert "public" in resp.headers["Cache-Control"]
+
+    def test_matching_if_none_match_returns_304(self, client):
+        entry = self._entry()
+        with patch("app._get_cached", return_value=entry):
+            etag = client.get(self.URL).headers["ETag"]
+            resp = client.get(self.URL, headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+        assert resp.data == b""
+
+    def test_gzip_variant_has_distinct_etag(self, client):
+        entry = self._entry()
+        with patch("app._get_cached", return_value=entry):
+            plain = client.get(self.URL).headers["ETag"]
+            gz = client.get(self.URL, headers={"Accept-Encoding": "gzip"}).headers["ETag"]
+        assert plain != gz
+
+    def test_get_analysis_does_not_record_history(self, client):
+        with patch("app._get_cached", return_value=self._entry()), \
+             patch("app.save_analysis") as mock_save:
+            client.get(self.URL)
+        mock_save.assert_not_called()
+
+    def test_missing_analysis_returns_404(self, client):
+        with patch("app._get_cached", return_value=None):
+            assert client.get(self.URL).status_code == 404
+
+    def test_history_304_skips_query(self, client):
+        with patch("app.get_history_version", return_value="3:2024-01-01:9"), \
+             patch("app.get_history", return_value=[]) as mock_history:
+            etag = client.get("/history").headers["ETag"]
+            resp = client.get("/history", headers={"If-None-Match": etag})
+        assert resp.status_code == 304
+        assert mock_history.call_count == 1
+        assert resp.headers["Cache-Control"] == "private, no-cache"
+
+    def test_history_etag_changes_with_version(self, client):
+        with patch("app.get_history", return_value=[]):
+            with patch("app.get_history_version", return_value="1:a:1"):
+                first = client.get("/history").headers["ETag"]
+            with patch("app.get_history_version", return_value="2:b:2"):
+                second = client.get("/history").headers["ETag"]
+        assert first != second
+
+
+# ---------------------------------------------------------------------------
+# GET /analysis/<video_id>/comments
+# ---------------------------------------------------------------------------
+
+class TestAnalysisComments:
+    URL = "/analysis/dQw4w9WgXcQ/comments"
+
+    @staticmethod
+    def _entry(n=120):
+        from app import _encode_cached
+        comments = [
+            {"comment": f"c{i}", "sentiment": "Positive" if i % 2 else "Negative", "category": "Other"}
+            for i in range(n)
+        ]
+        return _encode_cached({"video_title": "V", "comments_data": comments})
+
+    def test_analyze_response_carries_first_page_only(self, client, sample_fetched):
+        many = [{"comment": f"c{i}", "sentiment": "Positive", "category": "Positive"} for i in range(120)]
+        fetched = sample_fetched * (120 // len(sample_fetched) + 1)
+        with patch("app._get_cached", return_value=None), patch("app._set_cached"), \
+             patch("app.build_youtube_service"), patch("app.fetch_video_title", return_value="V"), \
+             patch("app.fetch_youtube_comments", return_value=(fetched[:120], None)), \
+             patch("app.GEMINI_API_KEY", ""), \
+             patch("app.analyze_sentiment_fallback", return_value=many), \
+             patch("app.generate_insights_fallback", return_value="ok"):
+            data = client.post("/analyze", data={"youtube_url": "https://youtu.be/dQw4w9WgXcQ"}).get_json()
+        assert len(data["comments_data"]) == 50
+        assert data["comments_total"] == 120
+        assert data["comments_next_cursor"] == "50"
+        assert data["video_id"] == "dQw4w9WgXcQ"
+
+    def test_pages_follow_cursor_to_the_end(self, client):
+        seen, cursor = [], "0"
+        with patch("app._get_cached", return_value=self._entry()):
+            while cursor is not None:
+                page = client.get(f"{self.URL}?cursor={cursor}").get_json()
+                seen.extend(c["comment"] for c in page["comments"])
+                cursor = page["next_cursor"]
+        assert seen == [f"c{i}" for i in range(120)]
+
+    def test_filters_server_side(self, client):
+        with patch("app._get_cached", return_value=self._entry()):
+            page = client.get(f"{self.URL}?sentiment=Positive&limit=10").get_json()
+        assert page["total"] == 60
+        assert all(c["sentiment"] == "Positive" for c in page["comments"])
+        assert len(page["comments"]) == 10
+
+    def test_sample_mode_uses_sample_key(self, client):
+        with patch("app._get_cached", return_value=self._entry()) as mock_get:
+            client.get(f"{self.URL}?mode=sample")
+        mock_get.assert_called_once_with("dQw4w9WgXcQ:sample")
+
+    def test_unknown_analysis_returns_404(self, client):
+        with patch("app._get_cached", return_value=None):
+            assert client.get(self.URL).status_code == 404
+
+    def test_bad_cursor_returns_400(self, client):
+        assert client.get(f"{self.URL}?cursor=abc").status_code == 400
+
+
+# ---------------------------------------------------------------------------
+# GET /videos/<video_id>/trend
+# ---------------------------------------------------------------------------
+
+class TestVideoTrend:
+    def test_returns_trend_for_video(self, client):
+        points = [{"day": "2024-01-01", "analyses": 2, "total_comments": 40, "Positive": 50.0}]
+        with patch("app.get_sentiment_trend", return_value=points) as mock_trend:
+            resp = client.get("/videos/dQw4w9WgXcQ/trend")
+        assert resp.status_code == 200
+        assert resp.get_json() == {"video_id": "dQw4w9WgXcQ", "trend": points}
+        mock_trend.assert_called_once_with("dQw4w9WgXcQ", None)
+
+    def test_days_forwarded(self, client):
+        with patch("app.get_sentiment_trend", return_value=[]) as mock_trend:
+            client.get("/videos/dQw4w9WgXcQ/trend?days=7")
+        mock_trend.assert_called_once_with("dQw4w9WgXcQ", 7)
+
+    def test_invalid_video_id_rejected(self, client):
+        resp = client.get("/videos/not-valid/trend")
+        assert resp.status_code == 400
+
+    def test_non_positive_days_rejected(self, client):
+        resp = client.get("/videos/dQw4w9WgXcQ/trend?days=0")
+        assert resp.status_code == 400
+
+
+# ---------------------------------------------------------------------------
+# GET /search
+# ---------------------------------------------------------------------------
+
+class TestSearchRoute:
+    def test_requires_query(self, client):
+        assert client.get("/search").status_code == 400
+
+    def test_returns_page_with_has_more(self, client):
+        hits = [{"video_id": "dQw4w9WgXcQ", "snippet": "x"}] * 3
+        with patch("app.search_documents", return_value=hits) as mock_search:
+            resp = client.get("/search?q=audio&limit=2&page=2")
+        body = resp.get_json()
+        assert resp.status_code == 200
+        assert len(body["results"]) == 2
+        assert body["has_more"] is True
+        mock_search.assert_called_once_with("audio", limit=3, offset=2, video_id="", session_id="")
+
+    def test_deep_page_rejected(self, client):
+        assert client.get("/search?q=audio&page=100000").status_code == 400
+
+    def test_invalid_video_filter_rejected(self, client):
+        assert client.get("/search?q=audio&video_id=bad").status_code == 400
+
+
 # ---------------------------------------------------------------------------
 # Error handlers
 # ---------------------------------------------------------------------------
@@ -0,0 +1,106 @@
+"""
+Tests for sampling.py — stratified sampling and confidence intervals — and
+the mode=sample path through /analyze.
+"""
+import os
+import sys
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sampling import sentiment_confidence_intervals, stratified_sample, wilson_interval
+
+
+class TestStratifiedSample:
+    def test_returns_requested_size(self):
+        assert len(stratified_sample(10_000, 500, seed=1)) == 500
+
+    def test_indices_unique_sorted_and_in_range(self):
+        idx = stratified_sample(1_234, 200, seed=2)
+        assert idx == sorted(set(idx))
+        assert 0 <= idx[0] and idx[-1] < 1_234
+
+    def test_every_stratum_represented_proportionally(self):
+        idx = stratified_sample(10_000, 500, stratum_size=100, seed=3)
+        per_page = [0] * 100
+        for i in idx:
+            per_page[i // 100] += 1
+        assert all(n == 5 for n in per_page)
+
+    def test_small_input_returns_everything(self):
+        assert stratified_sample(40, 500) == list(range(40))
+
+    def test_seed_is_reproducible(self):
+        assert stratified_sample(5_000, 300, seed=9) == stratified_sample(5_000, 300, seed=9)
+
+
+class TestConfidenceIntervals:
+    def test_interval_contains_point_estimate(self):
+        low, high = wilson_interval(60, 200)
+        assert low < 0.3 < high
+
+    def test_interval_narrows_with_sample_size(self):
+        small = wilson_interval(30, 100)
+        large = wilson_interval(300, 1000)
+        assert (large[1] - large[0]) < (small[1] - small[0])
+
+    def test_full_census_has_zero_width(self):
+        low, high = wilson_interval(30, 100, population=100)
+        assert abs(high - low) < 1e-9
+
+    def test_intervals_keyed_by_sentiment_in_percent(self):
+        ci = sentiment_confidence_intervals({"Positive": 300, "Negative": 200}, 500, 100_000)
+        assert set(ci) == {"Positive", "Negative"}
+        assert ci["Positive"][0] < 60.0 < ci["Positive"][1]
+
+
+class TestAnalyzeSampleMode:
+    _URL = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
+
+    def _post(self, client, comments, mode="sample"):
+        def classify(texts):
+            return [{"comment": t, "sentiment": "Positive", "category": "Positive"} for t in texts]
+
+        fetched = [{"comment": c, "published_at": "2024-01-01T00:00:00Z"} for c in comments]
+
+        with patch("app._get_cached", return_value=None), \
+             patch("app._set_cached"), \
+             patch("app.save_analysis"), \
+             patch("app.save_aggregate_state"), \
+             patch("app.build_youtube_service"), \
+             patch("app.fetch_video_title", return_value="Big Video"), \
+             patch("app.fetch_youtube_comments", return_value=(fetched, None)) as mock_fetch, \
+             patch("app.GEMINI_API_KEY", ""), \
+             patch("app.SAMPLE_SIZE", 50), \
+             patch("app.analyze_sentiment_fallback", side_effect=classify) as mock_classify, \
+             patch("app.generate_insights_fallback", return_value="Insights"):
+            resp = client.post("/analyze", data={"youtube_url": self._URL, "mode": mode})
+        return resp, mock_fetch, mock_classify
+
+    def test_sampled_response_is_marked(self, client):
+        comments = [f"comment number {i}" for i in range(1_000)]
+        resp, mock_fetch, mock_classify = self._post(client, comments)
+        data = resp.get_json()
+        assert resp.status_code == 200
+        assert data["sampled"] is True
+        assert data["sample_size"] == 50
+        assert data["total_comments"] == 1_000
+        assert "Positive" in data["confidence_intervals"]
+        assert len(mock_classify.call_args.args[0]) == 50
+
+    def test_sample_mode_fetches_more_comments(self, client):
+        from config import SAMPLE_MAX_COMMENTS
+        _, mock_fetch, _ = self._post(client, ["a comment"] * 10)
+        assert mock_fetch.call_args.args[1] == SAMPLE_MAX_COMMENTS
+
+    def test_small_video_in_sample_mode_is_not_sampled(self, client):
+        resp, _, _ = self._post(client, [f"c{i}" for i in range(20)])
+        data = resp.get_json()
+        assert data["sampled"] is False
+        assert data["mode"] == "sample"             # still cached under <id>:sample
+        assert "confidence_intervals" not in data
+
+    def test_default_mode_is_not_sampled(self, client):
+        resp, _, _ = self._post(client, [f"c{i}" for i in range(20)], mode="")
+        assert resp.get_json()["sampled"] is False
+        assert resp.get_json()["mode"] == "full"
@@ -4,15 +4,28 @@ fallback analysis pipeline, and stats computation.
 """
 import os
 import sys
+from unittest.mock import patch
+
+import pytest
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from sentiment import (
     analyze_sentiment_fallback,
+    bucket_sentiment_counts,
+    build_aggregate_state,
     categorize_comment,
+    choose_timeline_resolution,
+    compute_sentiment_timeline,
     compute_stats,
+    compute_word_frequencies,
     generate_insights_fallback,
     get_sentiment_textblob,
+    merge_aggregate_states,
+    stats_from_state,
+    timeline_from_state,
+    update_aggregate_state,
+    word_frequencies_from_state,
 )
 
 # ---------------------------------------------------------------------------
@@ -199,3 +212,166 @@ class TestComputeStats:
         s, c = compute_stats(sample_categorized)
         assert isinstance(s, dict)
         assert isinstance(c, dict)
+
+
+# ---------------------------------------------------------------------------
+# Mergeable aggregate state
+# ---------------------------------------------------------------------------
+
+def _letters(n: int) -> str:
+    """n spelled in letters, since the tokenizer drops digits."""
+    return "abcdefghij"[n // 10] + "abcdefghij"[n % 10]
+
+
+class TestAggregateState:
+    def test_views_match_one_shot_functions(self, sample_categorized):
+        state = build_aggregate_state(sample_categorized, chunk_size=3)
+        assert stats_from_state(state) == compute_stats(sample_categorized)
+        assert word_frequencies_from_state(state) == compute_word_frequencies(sample_categorized)
+        assert timeline_from_state(state) == compute_sentiment_timeline(sample_categorized, chunk_size=3)
+
+    def test_merge_equals_single_pass(self, sample_categorized):
+        # Newest-first: the first 4 items are the newer shard.
+        older, newer = sample_categorized[4:], sample_categorized[:4]
+        merged = merge_aggregate_states(build_aggregate_state(older), build_aggregate_state(newer))
+        whole = build_aggregate_state(sample_categorized)
+        assert merged["total"] == whole["total"] == len(sample_categorized)
+        assert stats_from_state(merged) == stats_from_state(whole)
+        assert merged["words"] == whole["words"]
+
+    def test_merge_does_not_mutate_inputs(self, sample_categorized):
+        a = build_aggregate_state(sample_categorized[:5])
+        b = build_aggregate_state(sample_categorized[5:])
+        a_total, b_words = a["total"], dict(b["words"])
+        merge_aggregate_states(a, b)
+        assert a["total"] == a_total
+        assert b["words"] == b_words
+
+    def test_incremental_update_appends_timeline(self):
+        state = build_aggregate_state(
+            [{"comment": "x", "sentiment": "Positive", "category": "Positive"}] * 20
+        )
+        update_aggregate_state(
+            state, [{"comment": "y", "sentiment": "Negative", "category": "Negative"}] * 5
+        )
+        timeline = timeline_from_state(state)
+        assert state["total"] == 25
+        assert timeline[0]["Positive"] == 100.0
+        assert timeline[-1]["Negative"] == 100.0
+
+    def test_state_is_json_serialisable(self, sample_categorized):
+        import json
+        state = build_aggregate_state(sample_categorized)
+        assert json.loads(json.dumps(state)) == state
+
+    def test_words_switch_to_sketch_past_exact_threshold(self):
+        import json
+        comments = [
+            {"comment": f"helpful tutorial word{_letters(i)}", "sentiment": "Positive", "category": "Positive"}
+            for i in range(30)
+        ]
+        with patch("sentiment.WORD_SKETCH_EXACT_MAX_COMMENTS", 10), \
+             patch("sentiment.WORD_SKETCH_EPSILON", 0.25):
+            state = build_aggregate_state(comments[:8])
+            assert state["word_sketch"] is None
+            update_aggregate_state(state, comments[8:])
+        assert state["words"] == {}
+        assert len(state["word_sketch"]["counts"]) <= 4
+        assert json.loads(json.dumps(state)) == state
+        top = word_frequencies_from_state(state, top_n=2)
+        assert top["helpful"] >= 30 and top["tutorial"] >= 30
+
+    def test_merge_stays_bounded_once_past_threshold(self):
+        def shard(prefix):
+            return build_aggregate_state([
+                {"comment": f"helpful {prefix}{_letters(i)}", "sentiment": "Positive", "category": "Positive"}
+                for i in range(8)
+            ])
+        with patch("sentiment.WORD_SKETCH_EXACT_MAX_COMMENTS", 10), \
+             patch("sentiment.WORD_SKETCH_EPSILON", 0.25):
+            a, b = shard("alpha"), shard("beta")
+            merged = merge_aggregate_states(a, b)
+            merged = merge_aggregate_states(merged, shard("gamma"))
+        assert a["word_sketch"] is None and len(a["words"]) == 9
+        assert merged["words"] == {}
+        assert len(merged["word_sketch"]["counts"]) <= 4
+        assert word_frequencies_from_state(merged, top_n=1) == {"helpful": 24}
+
+
+# ---------------------------------------------------------------------------
+# Time-bucketed timeline
+# ---------------------------------------------------------------------------
+
+def _timed(stamp: str, sentiment: str) -> dict:
+    return {"comment": "c", "sentiment": sentiment, "category": sentiment, "published_at": stamp}
+
+
+class TestTimeBucketedTimeline:
+    _COMMENTS = [  # newest first, as fetched
+        _timed("2024-03-02T18:30:00Z", "Negative"),
+        _timed("2024-03-02T09:15:00Z", "Positive"),
+        _timed("2024-03-01T23:59:59Z", "Positive"),
+        _timed("2024-03-01T00:00:00Z", "Neutral"),
+    ]
+
+    def test_day_buckets_follow_publish_time(self):
+        rows = compute_sentiment_timeline(self._COMMENTS, resolution="day")
+        assert [r["bucket"] for r in rows] == ["2024-03-01T00:00:00Z", "2024-03-02T00:00:00Z"]
+        assert [r["count"] for r in rows] == [2, 2]
+        assert rows[0]["Positive"] == 50.0 and rows[0]["Neutral"] == 50.0
+        assert rows[1]["Negative"] == 50.0
+
+    def test_hour_buckets(self):
+        rows = compute_sentiment_timeline(self._COMMENTS, resolution="hour")
+        assert len(rows) == 4
+        assert rows[-1]["bucket"] == "2024-03-02T18:00:00Z"
+
+    def test_week_buckets_start_on_monday(self):
+        rows = compute_sentiment_timeline(self._COMMENTS, resolution="week")
+        assert [r["bucket"] for r in rows] == ["2024-02-26T00:00:00Z"]   # a Monday
+        assert rows[0]["count"] == 4
+
+    def test_comments_without_timestamp_are_skipped(self):
+        comments = self._COMMENTS + [{"comment": "x", "sentiment": "Mixed", "category": "Mixed"}]
+        starts, counts = bucket_sentiment_counts(comments, "day")
+        assert int(counts.sum()) == 4
+
+    def test_auto_resolution_follows_the_span(self):
+        month = [_timed(f"2024-03-{d:02d}T12:00:00Z", "Positive") for d in (1, 30)]
+        years = [_timed("2022-01-01T00:00:00Z", "Positive"), _timed("2024-01-01T00:00:00Z", "Neutral")]
+        assert choose_timeline_resolution(self._COMMENTS, "auto") == "hour"     # ~42 hours
+        assert choose_timeline_resolution(month, "auto") == "day"
+        assert choose_timeline_resolution(years, "auto") == "week"
+        assert choose_timeline_resolution([], "auto") == "hour"
+        assert choose_timeline_resolution(years, "day") == "day"                # explicit wins
+
+    def test_auto_resolution_is_fixed_in_the_state(self):
+        state = build_aggregate_state(self._COMMENTS, resolution="auto")
+        assert state["resolution"] == "hour"
+        assert timeline_from_state(state) == compute_sentiment_timeline(self._COMMENTS, resolution="auto")
+
+    def test_unknown_resolution_rejected(self):
+        with pytest.raises(ValueError):
+            compute_sentiment_timeline(self._COMMENTS, resolution="fortnight")
+
+    def test_bucketed_states_merge_exactly(self):
+        a = build_aggregate_state(self._COMMENTS[2:], resolution="day")
+        b = build_aggregate_state(self._COMMENTS[:2], resolution="day")
+        merged = merge_aggregate_states(a, b)
+        assert timeline_from_state(merged) == compute_sentiment_timeline(self._COMMENTS, resolution="day")
+
+    def test_mismatched_resolutions_cannot_merge(self):
+        with pytest.raises(ValueError):
+            merge_aggregate_states(
+                build_aggregate_state(self._COMMENTS, resolution="day"),
+                build_aggregate_state(self._COMMENTS, resolution="hour"),
+            )
+
+    def test_scales_to_100k_comments(self):
+        comments = [
+            _timed(f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}T{i % 24:02d}:00:00Z",
+                   ("Positive", "Neutral", "Negative", "Mixed")[i % 4])
+            for i in range(100_000)
+        ]
+        rows = compute_sentiment_timeline(comments, resolution="day")
+        assert sum(r["count"] for r in rows) == 100_000
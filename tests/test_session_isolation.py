@@ -174,6 +174,36 @@ class TestGetHistorySessionIsolation:
 # 2. Migration — existing DB without session_id
 # ═══════════════════════════════════════════════════════════════════════════════
 
+class TestSearchSessionIsolation:
+    def test_search_sees_only_own_session_videos(self, tmp_db):
+        """Another session's indexed comments and titles must not surface."""
+        from storage import index_search_documents, save_analysis, search_documents
+        comment = [{"comment": "audio was too quiet", "sentiment": "Negative", "category": "Complaint"}]
+        with patch("storage.DB_PATH", tmp_db):
+            save_analysis("vid0000000a", {**_SAMPLE, "video_title": "A Video"}, session_id=SID_A)
+            save_analysis("vid0000000b", {**_SAMPLE, "video_title": "B Video"}, session_id=SID_B)
+            save_analysis("vid0000000b", {**_SAMPLE, "video_title": "B Renamed"}, session_id=SID_A)
+            index_search_documents("vid0000000a", comment)
+            index_search_documents("vid0000000b", comment)
+            index_search_documents("vid0000000c", comment)      # nobody's analysis
+            result_a = search_documents("audio", session_id=SID_A)
+            result_b = search_documents("audio", session_id=SID_B)
+            anonymous = search_documents("audio", session_id="")
+
+        assert {(r["video_id"], r["video_title"]) for r in result_a} == {
+            ("vid0000000a", "A Video"), ("vid0000000b", "B Renamed"),
+        }
+        assert [(r["video_id"], r["video_title"]) for r in result_b] == [("vid0000000b", "B Video")]
+        assert anonymous == []
+
+    def test_search_route_forwards_session_id(self, client):
+        with patch("app.search_documents", return_value=[]) as mock_search:
+            client.get("/search?q=audio", headers={"X-Session-Id": SID_A})
+            client.get("/search?q=audio")
+        assert mock_search.call_args_list[0].kwargs["session_id"] == SID_A
+        assert mock_search.call_args_list[1].kwargs["session_id"] == ""
+
+
 class TestMigration:
     def test_adds_session_id_column_to_legacy_db(self, legacy_db):
         """init_db on an old schema must add the session_id column."""
@@ -265,7 +295,7 @@ class TestSessionIdValidation:
         """A well-formed lowercase UUID in the header must reach get_history."""
         with patch("app.get_history", return_value=[]) as mock_gh:
             client.get("/history", headers={"X-Session-Id": SID_A})
-        mock_gh.assert_called_once_with(limit=20, session_id=SID_A)
+        mock_gh.assert_called_once_with(limit=20, session_id=SID_A, before=None)
 
     def test_valid_uppercase_uuid_accepted(self, client):
         """UUID matching the pattern case-insensitively must be accepted."""
@@ -279,31 +309,31 @@ class TestSessionIdValidation:
         """No X-Session-Id header → session_id='' forwarded to storage."""
         with patch("app.get_history", return_value=[]) as mock_gh:
             client.get("/history")
-        mock_gh.assert_called_once_with(limit=20, session_id="")
+        mock_gh.assert_called_once_with(limit=20, session_id="", before=None)
 
     def test_garbage_string_rejected(self, client):
         """A non-UUID string must be sanitised to '' before reaching storage."""
         with patch("app.get_history", return_value=[]) as mock_gh:
             client.get("/history", headers={"X-Session-Id": "not-a-uuid"})
-        mock_gh.assert_called_once_with(limit=20, session_id="")
+        mock_gh.assert_called_once_with(limit=20, session_id="", before=None)
 
     def test_sql_injection_rejected(self, client):
         """SQL injection attempt in the header must be sanitised to ''."""
         payload = "' OR '1'='1"
         with patch("app.get_history", return_value=[]) as mock_gh:
             client.get("/history", headers={"X-Session-Id": payload})
-        mock_gh.assert_called_once_with(limit=20, session_id="")
+        mock_gh.assert_called_once_with(limit=20, session_id="", before=None)
 
     def test_too_short_string_rejected(self, client):
         with patch("app.get_history", return_value=[]) as mock_gh:
             client.get("/history", headers={"X-Session-Id": "1234"})
-        mock_gh.assert_called_once_with(limit=20, session_id="")
+        mock_gh.assert_called_once_with(limit=20, session_id="", before=None)
 
     def test_uuid_with_extra_chars_rejected(self, client):
         """UUID padded with extra characters must be rejected."""
         with patch("app.get_history", return_value=[]) as mock_gh:
             client.get("/history", headers={"X-Session-Id": SID_A + "EXTRA"})
-        mock_gh.assert_called_once_with(limit=20, session_id="")
+        mock_gh.assert_called_once_with(limit=20, session_id="", before=None)
 
 
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -325,14 +355,14 @@ class TestHistoryRoute:
         """The exact UUID from the header must be forwarded to get_history."""
         with patch("app.get_history", return_value=[]) as mock_gh:
             client.get("/history", headers={"X-Session-Id": SID_B})
-        mock_gh.assert_called_once_with(limit=20, session_id=SID_B)
+        mock_gh.assert_called_once_with(limit=20, session_id=SID_B, before=None)
 
     def test_two_clients_see_different_histories(self, client):
         """Two separate session IDs must receive their own filtered records."""
         records_a = [{"video_title": "A Video", "video_id": "aaa", "created_at": "2024-01-02"}]
         records_b = [{"video_title": "B Video", "video_id": "bbb", "created_at": "2024-01-01"}]
 
-        def mock_get_history(limit, session_id):
+        def mock_get_history(limit, session_id, before=None):
             return records_a if session_id == SID_A else records_b
 
         with patch("app.get_history", side_effect=mock_get_history):
@@ -343,6 +373,28 @@ class TestHistoryRoute:
         assert resp_b.get_json()[0]["video_title"] == "B Video"
 
 
+    def test_full_page_sets_next_cursor(self, client):
+        records = [{"id": 9 - i, "created_at": "2024-01-01T00:00:00+00:00"} for i in range(3)]
+        with patch("app.get_history", return_value=records):
+            resp = client.get("/history?limit=3", headers={"X-Session-Id": SID_A})
+        assert resp.headers["X-Next-Cursor"]
+
+    def test_short_page_has_no_cursor(self, client):
+        with patch("app.get_history", return_value=[]):
+            resp = client.get("/history", headers={"X-Session-Id": SID_A})
+        assert "X-Next-Cursor" not in resp.headers
+
+    def test_before_and_limit_forwarded(self, client):
+        with patch("app.get_history", return_value=[]) as mock_gh:
+            client.get("/history?before=abc&limit=500", headers={"X-Session-Id": SID_A})
+        mock_gh.assert_called_once_with(limit=100, session_id=SID_A, before="abc")
+
+    def test_invalid_cursor_returns_400(self, client):
+        with patch("app.get_history", side_effect=ValueError("bad")):
+            resp = client.get("/history?before=zzz", headers={"X-Session-Id": SID_A})
+        assert resp.status_code == 400
+
+
 # ═══════════════════════════════════════════════════════════════════════════════
 # 5. app.py — /analyze saves to correct session
 # ═══════════════════════════════════════════════════════════════════════════════
@@ -350,21 +402,21 @@ class TestHistoryRoute:
 class TestAnalyzeSessionId:
     _URL = "https://www.youtube.com/watch?v=dQw4w9WgXcQ"
 
-    def _analysis_patches(self, sample_comments, sample_categorized):
+    def _analysis_patches(self, sample_fetched, sample_categorized):
         return [
             patch("app._get_cached", return_value=None),
             patch("app._set_cached"),
             patch("app.build_youtube_service"),
             patch("app.fetch_video_title", return_value="Test Video"),
-            patch("app.fetch_youtube_comments", return_value=(sample_comments, None)),
+            patch("app.fetch_youtube_comments", return_value=(sample_fetched, None)),
             patch("app.GEMINI_API_KEY", ""),
             patch("app.analyze_sentiment_fallback", return_value=sample_categorized),
             patch("app.generate_insights_fallback", return_value="Good."),
         ]
 
-    def test_session_id_passed_to_save_analysis(self, client, sample_comments, sample_categorized):
+    def test_session_id_passed_to_save_analysis(self, client, sample_fetched, sample_categorized):
         """save_analysis must receive the exact session_id from the header."""
-        p = self._analysis_patches(sample_comments, sample_categorized)
+        p = self._analysis_patches(sample_fetched, sample_categorized)
         with p[0], p[1], p[2], p[3], p[4], p[5], p[6], p[7], \
              patch("app.save_analysis") as mock_save:
             client.post("/analyze",
@@ -374,9 +426,9 @@ class TestAnalyzeSessionId:
         _, _, sid_arg = mock_save.call_args.args
         assert sid_arg == SID_A
 
-    def test_invalid_header_saves_with_empty_session_id(self, client, sample_comments, sample_categorized):
+    def test_invalid_header_saves_with_empty_session_id(self, client, sample_fetched, sample_categorized):
         """An invalid X-Session-Id must be sanitised to '' before save_analysis."""
-        p = self._analysis_patches(sample_comments, sample_categorized)
+        p = self._analysis_patches(sample_fetched, sample_categorized)
         with p[0], p[1], p[2], p[3], p[4], p[5], p[6], p[7], \
              patch("app.save_analysis") as mock_save:
             client.post("/analyze",
@@ -386,9 +438,9 @@ class TestAnalyzeSessionId:
         _, _, sid_arg = mock_save.call_args.args
         assert sid_arg == ""
 
-    def test_no_header_saves_with_empty_session_id(self, client, sample_comments, sample_categorized):
+    def test_no_header_saves_with_empty_session_id(self, client, sample_fetched, sample_categorized):
         """Missing X-Session-Id header must result in session_id='' in save."""
-        p = self._analysis_patches(sample_comments, sample_categorized)
+        p = self._analysis_patches(sample_fetched, sample_categorized)
         with p[0], p[1], p[2], p[3], p[4], p[5], p[6], p[7], \
              patch("app.save_analysis") as mock_save:
             client.post("/analyze", data={"youtube_url": self._URL})
@@ -406,7 +458,8 @@ class TestAnalyzeSessionId:
             "comments_data": [], "overall_insights": "Great.",
             "analysis_method": "Gemini",
         }
-        with patch("app._get_cached", return_value=cached_data), \
+        from app import _encode_cached
+        with patch("app._get_cached", return_value=_encode_cached(cached_data)), \
              patch("app.save_analysis") as mock_save:
             client.post("/analyze",
                         data={"youtube_url": self._URL},
@@ -424,7 +477,8 @@ class TestAnalyzeSessionId:
             "comments_data": [], "overall_insights": "Great.",
             "analysis_method": "Gemini",
         }
-        with patch("app._get_cached", return_value=cached_data), \
+        from app import _encode_cached
+        with patch("app._get_cached", return_value=_encode_cached(cached_data)), \
              patch("app.save_analysis") as mock_save:
             client.post("/analyze",
                         data={"youtube_url": self._URL},
@@ -433,9 +487,9 @@ class TestAnalyzeSessionId:
         _, _, sid_arg = mock_save.call_args.args
         assert sid_arg == SID_B
 
-    def test_two_sessions_analyzing_same_video_both_saved(self, client, sample_comments, sample_categorized):
+    def test_two_sessions_analyzing_same_video_both_saved(self, client, sample_fetched, sample_categorized):
         """Two users hitting the same video must each get a save_analysis call."""
-        p = self._analysis_patches(sample_comments, sample_categorized)
+        p = self._analysis_patches(sample_fetched, sample_categorized)
         saved_sessions = []
 
         def capture_save(video_id, data, session_id=""):
@@ -0,0 +1,127 @@
+"""
+Tests for sketch.py — Space-Saving heavy-hitter summary and the TinyLFU frequency sketch.
+"""
+import os
+import random
+import sys
+from collections import Counter
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sentiment import compute_word_frequencies
+from sketch import FrequencySketch, SpaceSaving
+
+
+def _zipf_stream(n: int, vocab: int = 5000, seed: int = 7) -> list[str]:
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(vocab)]
+    return rng.choices([f"w{i}" for i in range(vocab)], weights=weights, k=n)
+
+
+class TestSpaceSaving:
+    def test_exact_below_capacity(self):
+        sketch = SpaceSaving(10)
+        sketch.update(["a", "b", "a", "c", "a", "b"])
+        assert sketch.top(3) == [("a", 3), ("b", 2), ("c", 1)]
+        assert sketch.error_bound == 0
+
+    def test_memory_bounded_by_capacity(self):
+        sketch = SpaceSaving(50)
+        sketch.update(_zipf_stream(20_000))
+        assert len(sketch) == 50
+        assert len(sketch._heap) <= 4 * 50
+
+    def test_overestimate_within_error_bound(self):
+        stream = _zipf_stream(20_000)
+        exact = Counter(stream)
+        sketch = SpaceSaving.for_error(0.01)
+        sketch.update(stream)
+        assert sketch.error_bound <= len(stream) * 0.01
+        for item, estimate in sketch.top(20):
+            assert exact[item] <= estimate <= exact[item] + sketch.error_bound
+            assert sketch.guaranteed(item) <= exact[item]
+
+    def test_heavy_hitters_found(self):
+        stream = _zipf_stream(20_000)
+        sketch = SpaceSaving.for_error(0.01)
+        sketch.update(stream)
+        exact_top = {w for w, _ in Counter(stream).most_common(5)}
+        assert exact_top <= {w for w, _ in sketch.top(10)}
+
+    def test_merge_matches_single_stream_heavy_hitters(self):
+        stream = _zipf_stream(20_000)
+        a, b = SpaceSaving(200), SpaceSaving(200)
+        a.update(stream[:10_000])
+        b.update(stream[10_000:])
+        merged = a.merge(b)
+        assert merged.total == len(stream)
+        assert len(merged) <= 200
+        exact = Counter(stream)
+        for item, estimate in merged.top(5):
+            assert estimate >= exact[item]
+
+    def test_round_trip_dict(self):
+        sketch = SpaceSaving(5)
+        sketch.update(_zipf_stream(500))
+        restored = SpaceSaving.from_dict(sketch.to_dict())
+        assert restored.top(5) == sketch.top(5)
+        restored.add("new-item")   # heap must be usable after restore
+
+    def test_invalid_parameters(self):
+        with pytest.raises(ValueError):
+            SpaceSaving(0)
+        with pytest.raises(ValueError):
+            SpaceSaving.for_error(1.5)
+
+
+class TestWordFrequencySketchMode:
+    def test_sketch_mode_agrees_with_exact_on_top_words(self):
+        # The tokenizer keeps only letters, so spell the vocabulary out in letters.
+        def lettered(token: str) -> str:
+            return "word" + "".join(chr(ord("a") + int(d)) for d in token[1:])
+
+        comments = [{"comment": " ".join(lettered(t) for t in _zipf_stream(8, vocab=300, seed=i))}
+                    for i in range(400)]
+        exact = compute_word_frequencies(comments, top_n=10)
+        approx = compute_word_frequencies(comments, top_n=10, epsilon=0.01, exact_max_comments=0)
+        assert list(exact)[:3] == list(approx)[:3]
+
+
+class TestFrequencySketch:
+    def test_counts_small_streams_exactly(self):
+        sketch = FrequencySketch(64)
+        for item in ["a", "b", "a", "a"]:
+            sketch.increment(item)
+        assert sketch.estimate("a") == 3
+        assert sketch.estimate("b") == 1
+        assert sketch.estimate("never") == 0
+
+    def test_counters_saturate(self):
+        sketch = FrequencySketch(64)
+        for _ in range(100):
+            sketch.increment("a")
+        assert sketch.estimate("a") == FrequencySketch.MAX_COUNT
+
+    def test_ageing_halves_counts(self):
+        sketch = FrequencySketch(64, sample_size=10)
+        for _ in range(8):
+            sketch.increment("a")
+        sketch.increment("b")
+        sketch.increment("b")   # the 10th addition triggers a reset
+        assert sketch.estimate("a") == 4
+        assert sketch.estimate("b") == 1
+        assert sketch.additions == 5
+
+    def test_never_underestimates(self):
+        sketch = FrequencySketch(256)
+        exact = Counter(_zipf_stream(2_000, vocab=500))
+        for item, count in exact.items():
+            for _ in range(count):
+                sketch.increment(item)
+        assert all(sketch.estimate(item) >= min(count, 15) for item, count in exact.items())
+
+    def test_invalid_width(self):
+        with pytest.raises(ValueError):
+            FrequencySketch(0)
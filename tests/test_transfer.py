@@ -0,0 +1,221 @@
+"""
+Tests for transfer.py — NDJSON/CSV encoding — plus the streaming export and
+import through storage.py, the admin-guarded /export and /import routes,
+and cli.py.
+"""
+import io
+import json
+import os
+import sys
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from transfer import decode_csv, decode_ndjson, encode_csv, encode_ndjson
+
+ANALYSIS = {
+    "type": "analysis", "video_id": "dQw4w9WgXcQ", "video_title": "A, \"quoted\" title",
+    "youtube_url": "https://www.youtube.com/watch?v=dQw4w9WgXcQ", "analysis_method": "TextBlob",
+    "total_comments": 10,
+    "overall_sentiment": {"Positive": 70.0, "Neutral": 10.0, "Negative": 20.0, "Mixed": 0.0},
+    "comment_categories": {"Positive": 7, "Help": 3}, "overall_insights": "Line one\nline two",
+    "session_id": "s1", "created_at": "2024-01-02T03:04:05+00:00", "hit_count": 2,
+    "cache_hit": 0,
+}
+COMMENT = {
+    "type": "comment", "video_id": "dQw4w9WgXcQ", "source": "comment",
+    "sentiment": "Negative", "category": "Complaint", "text": "Audio was bad",
+}
+
+
+@pytest.fixture
+def tmp_db(tmp_path):
+    db_file = tmp_path / "test_vidalyze.db"
+    with patch("storage.DB_PATH", db_file):
+        import storage
+        storage.init_db()
+        yield db_file
+
+
+# ---------------------------------------------------------------------------
+# Formats
+# ---------------------------------------------------------------------------
+
+class TestFormats:
+    def test_ndjson_round_trip(self):
+        lines = list(encode_ndjson([ANALYSIS, COMMENT]))
+        assert all(line.endswith("\n") and line.count("\n") == 1 for line in lines)
+        assert list(decode_ndjson(lines)) == [ANALYSIS, COMMENT]
+
+    def test_csv_round_trip_with_quotes_and_newlines(self):
+        text = "".join(encode_csv([ANALYSIS], "analysis"))
+        assert list(decode_csv(io.StringIO(text, newline=""), "analysis")) == [ANALYSIS]
+
+    def test_ndjson_rejects_bad_line(self):
+        with pytest.raises(ValueError, match="Line 2"):
+            list(decode_ndjson(['{"type": "comment"}\n', "{not json\n"]))
+
+    def test_ndjson_rejects_unknown_type(self):
+        with pytest.raises(ValueError):
+            list(decode_ndjson(['{"type": "other"}\n']))
+
+    def test_csv_without_newer_columns_still_decodes(self):
+        text = "".join(encode_csv([ANALYSIS], "analysis"))
+        header, row = text.split("\r\n", 1)
+        old = header.removesuffix(",cache_hit") + "\r\n" + row.replace(",0\r\n", "\r\n")
+        record = next(decode_csv(io.StringIO(old, newline=""), "analysis"))
+        assert "cache_hit" not in record
+        assert record["hit_count"] == 2
+
+    def test_csv_requires_columns(self):
+        with pytest.raises(ValueError, match="missing columns"):
+            list(decode_csv(["video_id\n", "abc\n"], "analysis"))
+
+    def test_encoders_are_lazy(self):
+        def endless():
+            while True:
+                yield COMMENT
+        lines = encode_ndjson(endless())
+        assert next(lines) and next(lines)
+
+
+# ---------------------------------------------------------------------------
+# Storage export / import
+# ---------------------------------------------------------------------------
+
+class TestStorageTransfer:
+    def test_export_import_round_trip(self, tmp_db, tmp_path):
+        import storage
+        with patch("storage.DB_PATH", tmp_db):
+            storage.import_records([ANALYSIS, COMMENT])
+            exported = list(storage.iter_analyses(batch_size=1)) + list(storage.iter_comments())
+        assert exported == [ANALYSIS, COMMENT]
+
+        other_db = tmp_path / "other.db"
+        with patch("storage.DB_PATH", other_db):
+            storage.init_db()
+            counts = storage.import_records(exported)
+            assert counts == {"analyses": 1, "comments": 1, "skipped": 0}
+            assert storage.get_history()[0]["comment_categories"] == {"Positive": 7, "Help": 3}
+            assert storage.get_sentiment_trend("dQw4w9WgXcQ")[0]["analyses"] == 1
+            assert len(storage.search_documents("audio")) == 1
+
+    def test_reimport_skips_duplicates(self, tmp_db):
+        import storage
+        with patch("storage.DB_PATH", tmp_db):
+            storage.import_records([ANALYSIS])
+            counts = storage.import_records([ANALYSIS])
+            assert counts["skipped"] == 1
+            assert storage.get_record_count() == 1
+
+    def test_reimport_skips_indexed_comments(self, tmp_db):
+        import storage
+        with patch("storage.DB_PATH", tmp_db):
+            first = storage.import_records([COMMENT, COMMENT])     # two identical comments
+            second = storage.import_records([COMMENT])
+            hits = storage.search_documents("audio")
+        assert first["comments"] == 2
+        assert second == {"analyses": 0, "comments": 0, "skipped": 1}
+        assert len(hits) == 2
+
+    def test_cache_hit_rows_stay_out_of_rollups(self, tmp_db, tmp_path):
+        import storage
+        with patch("storage.DB_PATH", tmp_db):
+            storage.save_analysis("dQw4w9WgXcQ", ANALYSIS, "s1")
+            storage.save_analysis("dQw4w9WgXcQ", ANALYSIS, "s2", cache_hit=True)
+            exported = list(storage.iter_analyses())
+        assert [r["cache_hit"] for r in exported] == [0, 1]
+
+        other_db = tmp_path / "other.db"
+        with patch("storage.DB_PATH", other_db):
+            storage.init_db()
+            storage.import_records(exported)
+            assert storage.get_record_count() == 2
+            assert storage.get_sentiment_trend("dQw4w9WgXcQ")[0]["analyses"] == 1
+
+    def test_export_pages_through_batches(self, tmp_db):
+        import storage
+        records = [{**ANALYSIS, "created_at": f"2024-01-{d:02d}T00:00:00+00:00"} for d in range(1, 8)]
+        with patch("storage.DB_PATH", tmp_db):
+            storage.import_records(records, batch_size=3)
+            exported = list(storage.iter_analyses(batch_size=2))
+        assert [r["created_at"] for r in exported] == [r["created_at"] for r in records]
+
+    def test_bad_record_keeps_committed_batches(self, tmp_db):
+        import storage
+        bad = {**ANALYSIS, "created_at": "not a date"}
+        good = [{**ANALYSIS, "created_at": f"2024-01-{d:02d}T00:00:00+00:00"} for d in range(1, 3)]
+        with patch("storage.DB_PATH", tmp_db):
+            with pytest.raises(ValueError):
+                storage.import_records([*good, bad], batch_size=2)
+            assert storage.get_record_count() == 2
+
+
+# ---------------------------------------------------------------------------
+# /export and /import routes
+# ---------------------------------------------------------------------------
+
+class TestTransferRoutes:
+    TOKEN = "s3cret"
+
+    def test_disabled_without_admin_token(self, client):
+        with patch("app.ADMIN_TOKEN", ""):
+            assert client.get("/export").status_code == 404
+
+    def test_wrong_token_rejected(self, client):
+        with patch("app.ADMIN_TOKEN", self.TOKEN):
+            resp = client.get("/export", headers={"X-Admin-Token": "nope"})
+        assert resp.status_code == 403
+
+    def test_export_streams_ndjson(self, client):
+        with patch("app.ADMIN_TOKEN", self.TOKEN), \
+             patch("app.iter_analyses", return_value=iter([ANALYSIS])), \
+             patch("app.iter_comments", return_value=iter([COMMENT])):
+            resp = client.get("/export", headers={"X-Admin-Token": self.TOKEN})
+            assert resp.is_streamed
+            lines = resp.get_data(as_text=True).splitlines()
+        assert resp.mimetype == "application/x-ndjson"
+        assert [json.loads(line) for line in lines] == [ANALYSIS, COMMENT]
+
+    def test_export_csv_single_type(self, client):
+        with patch("app.ADMIN_TOKEN", self.TOKEN), \
+             patch("app.iter_analyses", return_value=iter([ANALYSIS])), \
+             patch("app.iter_comments") as mock_comments:
+            resp = client.get("/export?format=csv", headers={"X-Admin-Token": self.TOKEN})
+            body = resp.get_data(as_text=True)
+        assert body.startswith("video_id,")
+        mock_comments.assert_not_called()
+
+    def test_import_ndjson(self, client):
+        payload = "".join(encode_ndjson([ANALYSIS, COMMENT]))
+        with patch("app.ADMIN_TOKEN", self.TOKEN), \
+             patch("app.import_records", side_effect=lambda records: {"n": len(list(records))}):
+            resp = client.post("/import", data=payload, headers={"X-Admin-Token": self.TOKEN})
+        assert resp.get_json() == {"n": 2}
+
+    def test_import_bad_payload_returns_400(self, client):
+        with patch("app.ADMIN_TOKEN", self.TOKEN), \
+             patch("app.import_records", side_effect=lambda records: list(records)):
+            resp = client.post("/import", data="{broken\n", headers={"X-Admin-Token": self.TOKEN})
+        assert resp.status_code == 400
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+class TestCli:
+    def test_export_then_import(self, tmp_db, tmp_path, capsys):
+        import cli
+        import storage
+        out_file = tmp_path / "history.csv"
+        with patch("storage.DB_PATH", tmp_db):
+            storage.import_records([ANALYSIS])
+            assert cli.main(["export", str(out_file), "--format", "csv", "--type", "analysis"]) == 0
+
+        with patch("storage.DB_PATH", tmp_path / "fresh.db"):
+            assert cli.main(["import", str(out_file), "--format", "csv", "--type", "analysis"]) == 0
+            assert storage.get_record_count() == 1
+        assert "Imported 1 analyses" in capsys.readouterr().out
@@ -0,0 +1,188 @@
+"""
+Tests for cache warming — target selection, bounded concurrency, the quota
+budget and the once-per-day claim shared by workers (app.py, storage.py,
+cli.py warm).
+"""
+import asyncio
+import os
+import sys
+import time
+from unittest.mock import patch
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def tmp_db(tmp_path, app):
+    db_file = tmp_path / "test_vidalyze.db"
+    with patch("storage.DB_PATH", db_file):
+        import storage
+        storage.init_db()
+        yield db_file
+
+
+def _result(video_id: str, method: str = "Gemini") -> dict:
+    return {
+        "video_id": video_id, "youtube_url": f"https://youtu.be/{video_id}",
+        "video_title": video_id, "comments_data": [], "overall_insights": "",
+        "analysis_method": method, "sampled": False,
+    }
+
+
+def _ids(n: int) -> list[tuple[str, str]]:
+    return [(f"vid{i:08d}", f"https://youtu.be/vid{i:08d}") for i in range(n)]
+
+
+# ---------------------------------------------------------------------------
+# Target selection
+# ---------------------------------------------------------------------------
+
+class TestWarmupTargets:
+    def test_watchlist_then_popular_videos(self, tmp_db, tmp_path):
+        import app as app_module
+        import storage
+        watchlist = tmp_path / "watch.txt"
+        watchlist.write_text(
+            "# morning list\n"
+            "https://www.youtube.com/watch?v=aaaaaaaaaaa\n"
+            "bbbbbbbbbbb   # bare id\n"
+            "\n"
+            "not a video\n"
+        )
+        with patch("storage.DB_PATH", tmp_db):
+            for n, video_id in enumerate(["ccccccccccc", "aaaaaaaaaaa", "ccccccccccc"]):
+                storage.save_analysis(video_id, {"youtube_url": f"https://youtu.be/{video_id}"},
+                                      session_id=f"00000000-0000-4000-8000-{n:012d}")
+            targets = app_module.warmup_targets(str(watchlist), top_n=5)
+
+        assert [video_id for video_id, _ in targets] == ["aaaaaaaaaaa", "bbbbbbbbbbb", "ccccccccccc"]
+        assert targets[1][1] == "https://www.youtube.com/watch?v=bbbbbbbbbbb"
+        assert targets[2][1] == "https://youtu.be/ccccccccccc"
+
+    def test_popular_videos_ranked_by_requests(self, tmp_db):
+        import storage
+        with patch("storage.DB_PATH", tmp_db):
+            storage.save_analysis("ccccccccccc", {})
+            for _ in range(3):
+                storage.save_analysis("ddddddddddd", {}, cache_hit=True)
+            popular = storage.get_popular_videos(limit=1, since_days=7)
+        assert popular == [{"video_id": "ddddddddddd", "youtube_url": "", "requests": 3}]
+
+    def test_missing_watchlist_is_logged_not_raised(self, tmp_db, tmp_path):
+        import app as app_module
+        with patch("storage.DB_PATH", tmp_db):
+            assert app_module.warmup_targets(str(tmp_path / "missing.txt"), top_n=0) == []
+
+
+# ---------------------------------------------------------------------------
+# Runs
+# ---------------------------------------------------------------------------
+
+class TestWarmCache:
+    def test_concurrency_is_bounded(self, app):
+        import app as app_module
+        running, peak = 0, 0
+
+        async def analysis(video_id, youtube_url, sample_mode):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return _result(video_id), {}
+
+        with patch("app.load_result_entry", return_value=None), \
+             patch("app._run_analysis", side_effect=analysis), patch("app._refresh_persist") as persist:
+            counts = asyncio.run(app_module.warm_cache(_ids(10), concurrency=3, quota_units=10_000))
+
+        assert counts["warmed"] == 10
+        assert peak == 3
+        assert {c.args[0] for c in persist.call_args_list} == {video_id for video_id, _ in _ids(10)}
+
+    def test_quota_budget_limits_the_run(self, app):
+        import app as app_module
+        budget = app_module._ANALYSIS_QUOTA_UNITS * 2 + 1
+        with patch("app.load_result_entry", return_value=None), \
+             patch("app._run_analysis", side_effect=lambda v, u, sample_mode: (_result(v), {})), \
+             patch("app._refresh_persist"):
+            counts = asyncio.run(app_module.warm_cache(_ids(5), concurrency=1, quota_units=budget))
+        assert counts == {"warmed": 2, "fresh": 0, "failed": 0, "over_budget": 3}
+
+    def test_fresh_results_skipped_for_free(self, app):
+        import app as app_module
+        with patch("app.load_result_entry", return_value=({}, time.time() - 60)), \
+             patch("app._run_analysis") as run:
+            counts = asyncio.run(app_module.warm_cache(_ids(3), quota_units=0))
+        assert counts["fresh"] == 3
+        run.assert_not_called()
+
+    def test_gemini_quota_error_halts_without_caching(self, app):
+        import app as app_module
+        quota = "TextBlob Fallback (Gemini quota exceeded — see README)"
+        with patch("app.load_result_entry", return_value=None), \
+             patch("app._run_analysis", side_effect=lambda v, u, sample_mode: (_result(v, quota), {})), \
+             patch("app._refresh_persist") as persist:
+            counts = asyncio.run(app_module.warm_cache(_ids(4), concurrency=1, quota_units=10_000))
+        assert counts == {"warmed": 0, "fresh": 0, "failed": 1, "over_budget": 3}
+        persist.assert_not_called()
+
+    def test_failures_are_counted(self, app):
+        import app as app_module
+        error = app_module.AnalysisError(400, error="No comments found for this video.")
+        with patch("app.load_result_entry", return_value=None), \
+             patch("app._run_analysis", side_effect=error):
+            counts = asyncio.run(app_module.warm_cache(_ids(2), quota_units=10_000))
+        assert counts["failed"] == 2
+
+    def test_warmed_result_served_as_cache_hit(self, tmp_db, client, sample_fetched):
+        import app as app_module
+        app_module._cache.pop("dQw4w9WgXcQ", None)
+        with patch("storage.DB_PATH", tmp_db), \
+             patch("app.build_youtube_service"), patch("app.fetch_video_title", return_value="Warm"), \
+             patch("app.fetch_youtube_comments", return_value=(sample_fetched, None)), \
+             patch("app.GEMINI_API_KEY", ""):
+            counts = asyncio.run(app_module.warm_cache([("dQw4w9WgXcQ", "https://youtu.be/dQw4w9WgXcQ")]))
+            app_module._cache.pop("dQw4w9WgXcQ", None)   # another worker: L1 empty, L2 warm
+            with patch("app.fetch_youtube_comments") as fetch:
+                resp = client.post("/analyze", data={"youtube_url": "https://youtu.be/dQw4w9WgXcQ"})
+            trend = app_module.get_sentiment_trend("dQw4w9WgXcQ")
+        assert counts["warmed"] == 1
+        assert trend[0]["analyses"] == 1              # the warm-up, not the hit
+        assert resp.headers["X-Cache"] == "HIT"
+        assert resp.get_json()["video_title"] == "Warm"
+        fetch.assert_not_called()
+        app_module._cache.pop("dQw4w9WgXcQ", None)
+
+
+# ---------------------------------------------------------------------------
+# Scheduling
+# ---------------------------------------------------------------------------
+
+class TestSchedule:
+    def test_slot_claimed_once(self, tmp_db):
+        import storage
+        with patch("storage.DB_PATH", tmp_db):
+            assert storage.claim_warmup_slot("2026-01-01")
+            assert not storage.claim_warmup_slot("2026-01-01")
+            assert storage.claim_warmup_slot("2026-01-02")
+
+    def test_seconds_until_hour(self, app):
+        from app import _seconds_until_hour
+        midnight = 1_700_006_400.0   # 2023-11-15 00:00 UTC
+        assert _seconds_until_hour(5, midnight) == 5 * 3600
+        assert _seconds_until_hour(5, midnight + 6 * 3600) == 23 * 3600
+        assert _seconds_until_hour(0, midnight) == 86400
+
+    def test_disabled_by_default(self, app):
+        import app as app_module
+        assert app_module.start_warmer() is None
+
+    def test_cli_warm(self, app, capsys):
+        import cli
+        with patch("app.warmup_targets", return_value=_ids(2)) as targets, \
+             patch("app.warm_cache", return_value={"warmed": 2, "fresh": 0, "failed": 0, "over_budget": 0}):
+            assert cli.main(["warm", "--top", "5", "--budget", "60"]) == 0
+        assert targets.call_args.args[1] == 5
+        assert "Warmed 2 of 2 videos" in capsys.readouterr().out
@@ -107,7 +107,12 @@ class TestFetchYoutubeComments:
             comments, error = fetch_youtube_comments("dQw4w9WgXcQ")
         assert error is None
         assert len(comments) == 5
-        assert all(isinstance(c, str) for c in comments)
+        assert all(isinstance(c["comment"], str) for c in comments)
+
+    def test_keeps_published_at_for_each_comment(self, mock_youtube_service):
+        with _KEY_PATCH, patch("youtube.build_youtube_service", return_value=mock_youtube_service):
+            comments, _ = fetch_youtube_comments("dQw4w9WgXcQ")
+        assert comments[0] == {"comment": "Comment 0", "published_at": "2024-01-05T12:00:00Z"}
 
     def test_returns_error_for_empty_video_id(self):
         with _KEY_PATCH:
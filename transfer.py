@@ -0,0 +1,98 @@
+"""
+Streaming export/import formats for Vidalyze history.
+
+NDJSON — one JSON object per line, tagged with "type": "analysis" or
+         "comment", so a single file can carry both.
+CSV    — one record type per file; dict-valued fields (sentiment shares,
+         category counts) are JSON-encoded inside their cell.
+
+Every function works record by record on iterators, so memory stays
+constant however large the database is.
+"""
+
+import csv
+import io
+import json
+from collections.abc import Iterable, Iterator
+
+FORMATS = ("ndjson", "csv")
+RECORD_TYPES = ("analysis", "comment")
+
+ANALYSIS_FIELDS = (
+    "video_id", "video_title", "youtube_url", "analysis_method", "total_comments",
+    "overall_sentiment", "comment_categories", "overall_insights",
+    "session_id", "created_at", "hit_count", "cache_hit",
+)
+COMMENT_FIELDS = ("video_id", "source", "sentiment", "category", "text")
+
+_FIELDS   = {"analysis": ANALYSIS_FIELDS, "comment": COMMENT_FIELDS}
+_JSON_CSV = {"overall_sentiment", "comment_categories"}
+_INT_CSV  = {"total_comments", "hit_count", "cache_hit"}
+# Columns added after the first export format; older files may lack them.
+_OPTIONAL_CSV = {"cache_hit"}
+
+MIMETYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def encode_ndjson(records: Iterable[dict]) -> Iterator[str]:
+    """Yields one newline-terminated JSON line per record."""
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def encode_csv(records: Iterable[dict], record_type: str) -> Iterator[str]:
+    """Yields a header line, then one CSV line per record of record_type."""
+    fields = _FIELDS[record_type]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def line(values) -> str:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(values)
+        return buffer.getvalue()
+
+    yield line(fields)
+    for record in records:
+        yield line(
+            json.dumps(record[f]) if f in _JSON_CSV else record.get(f, "")
+            for f in fields
+        )
+
+
+def decode_ndjson(lines: Iterable[str]) -> Iterator[dict]:
+    """Parses NDJSON lines. Raises ValueError naming the first malformed line."""
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Line {number} is not valid JSON.") from e
+        if not isinstance(record, dict) or record.get("type") not in RECORD_TYPES:
+            raise ValueError(f"Line {number} has no valid \"type\" field.")
+        yield record
+
+
+def decode_csv(lines: Iterable[str], record_type: str) -> Iterator[dict]:
+    """Parses CSV written by encode_csv back into records of record_type."""
+    reader = csv.DictReader(lines)
+    present = set(reader.fieldnames or ())
+    missing = set(_FIELDS[record_type]) - present - _OPTIONAL_CSV
+    if missing:
+        raise ValueError(f"CSV is missing columns: {', '.join(sorted(missing))}.")
+    for number, row in enumerate(reader, start=2):
+        try:
+            record = {"type": record_type}
+            for field in _FIELDS[record_type]:
+                if field not in present:
+                    continue
+                value = row[field]
+                if field in _JSON_CSV:
+                    value = json.loads(value or "{}")
+                elif field in _INT_CSV:
+                    value = int(value or 0)
+                record[field] = value
+        except ValueError as e:
+            raise ValueError(f"Row {number} is malformed.") from e
+        yield record
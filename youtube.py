@@ -1,5 +1,6 @@
 import logging
 import re
+import threading
 from urllib.parse import urlparse
 
 from googleapiclient.discovery import build
@@ -11,6 +12,7 @@ from config import (
     YOUTUBE_API_SERVICE_NAME,
     YOUTUBE_API_VERSION,
 )
+from metrics import QUOTA_ERRORS, timed
 
 logger = logging.getLogger(__name__)
 
@@ -46,11 +48,31 @@ def get_video_id(url: str) -> str | None:
     return None
 
 
+# A service object wraps one httplib2.Http, which is not thread-safe, and
+# building one re-parses the discovery document — so each thread builds
+# its own once and reuses it.
+_local = threading.local()
+
+
 def build_youtube_service():
-    """Builds and returns an authenticated YouTube API service client."""
+    """
+    Returns this thread's authenticated YouTube API service client, building
+    it on first use. Never hand the result to another thread.
+    """
     if not YOUTUBE_API_KEY:
         raise ValueError("YOUTUBE_API_KEY is not set in environment variables.")
-    return build(YOUTUBE_API_SERVICE_NAME, YOUTUBE_API_VERSION, developerKey=YOUTUBE_API_KEY)
+    service = getattr(_local, "service", None)
+    if service is None:
+        service = _local.service = build(
+            YOUTUBE_API_SERVICE_NAME, YOUTUBE_API_VERSION, developerKey=YOUTUBE_API_KEY
+        )
+    return service
+
+
+def reset_after_fork() -> None:
+    """Drops clients (and their sockets) inherited from the parent process."""
+    global _local
+    _local = threading.local()
 
 
 def fetch_video_title(youtube_service, video_id: str) -> str:
@@ -69,10 +91,13 @@ def fetch_video_title(youtube_service, video_id: str) -> str:
         return "Title Unavailable"
 
 
-def fetch_youtube_comments(video_id: str, max_results: int = MAX_COMMENTS) -> tuple[list[str], str | None]:
+def fetch_youtube_comments(video_id: str, max_results: int = MAX_COMMENTS) -> tuple[list[dict], str | None]:
     """
     Fetches up to max_results top-level comments for the given video.
 
+    Each comment is {"comment": text, "published_at": ISO-8601 UTC timestamp},
+    newest first, so the sentiment timeline can use real publish times.
+
     Returns:
         (comments, None)  on success
         ([], error_msg)   on failure
@@ -89,7 +114,7 @@ def fetch_youtube_comments(video_id: str, max_results: int = MAX_COMMENTS) -> tu
     except Exception as e:
         return [], f"Failed to initialize YouTube service: {e}"
 
-    comments: list[str] = []
+    comments: list[dict] = []
     next_page_token = None
     logger.info("Fetching comments for video %s (max %d)...", video_id, max_results)
 
@@ -102,11 +127,15 @@ def fetch_youtube_comments(video_id: str, max_results: int = MAX_COMMENTS) -> tu
                 maxResults=min(max_results - len(comments), 100),
                 pageToken=next_page_token,
             )
-            response = api_request.execute()
+            with timed("youtube_comments_page"):
+                response = api_request.execute()
 
             for item in response.get("items", []):
-                text = item["snippet"]["topLevelComment"]["snippet"]["textDisplay"]
-                comments.append(text)
+                snippet = item["snippet"]["topLevelComment"]["snippet"]
+                comments.append({
+                    "comment":      snippet["textDisplay"],
+                    "published_at": snippet.get("publishedAt", ""),
+                })
                 if len(comments) >= max_results:
                     break
 
@@ -126,6 +155,7 @@ def fetch_youtube_comments(video_id: str, max_results: int = MAX_COMMENTS) -> tu
             if reason == "commentsDisabled":
                 return [], "Comments are disabled for this video by the creator."
             if reason == "quotaExceeded" or "dailyLimitExceeded" in message:
+                QUOTA_ERRORS.labels("youtube").inc()
                 return [], "YouTube API quota exceeded. Please try again later."
             return [], f"YouTube access denied (403): {message or 'Unknown reason.'}"
         if e.resp.status == 404: